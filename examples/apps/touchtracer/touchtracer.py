@@ -31,7 +31,8 @@ class TouchTracer(MTWidget):
 
     def on_touch_down(self, touch):
         color = get_random_color()
-        self.touchPositions[touch.id] = [(touch.id,color,touch.x,touch.y)]
+        self.touchPositions[touch.id] = [touch.id, color, (touch.x, touch.y),
+                                         PaintStroke((touch.x, touch.y))]
 
 
     def on_touch_up(self, touch):
@@ -42,11 +43,11 @@ class TouchTracer(MTWidget):
     def on_touch_move(self, touch):
         if touch.id in self.touchPositions:
             # don't append same position on the line
-            if len(self.touchPositions[touch.id]) > 1:
-                pos = self.touchPositions[touch.id][-1]
-                if int(pos[0]) == int(touch.x) and int(pos[1]) == int(touch.y):
-                    return
-            self.touchPositions[touch.id].append((touch.x,touch.y))
+            pos = self.touchPositions[touch.id][2]
+            if int(pos[0]) == int(touch.x) and int(pos[1]) == int(touch.y):
+                return
+            self.touchPositions[touch.id][2] = (touch.x, touch.y)
+            self.touchPositions[touch.id][3].append(touch.x, touch.y)
 
 
     def draw(self):
@@ -55,16 +56,11 @@ class TouchTracer(MTWidget):
         set_color(.1, .1, .1)
         drawRectangle(size=w.size)
         for p in self.touchPositions:
-            lines = []
-            touchID,color,x,y = self.touchPositions[p][0]
+            touchID, color, pos, stroke = self.touchPositions[p]
             set_color(*color)
-            lines += [x, y]
-            for pos in self.touchPositions[p][1:]:
-                lines += pos
-            if len(lines) > 2:
-                paintLine(lines)
-            x, y = lines[-2:]
-            drawCrossLabel(x, y, touchID)
+            # only the new segments are computed, in append()
+            stroke.draw()
+            drawCrossLabel(pos[0], pos[1], touchID)
 
 def pymt_plugin_activate(w, ctx):
     ctx.c = TouchTracer()
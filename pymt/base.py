@@ -19,6 +19,7 @@ import weakref
 from logger import pymt_logger
 from exceptions import pymt_exception_manager, ExceptionManager
 from clock import getClock
+from profiler import getProfiler
 from input import *
 from utils import deprecated
 
@@ -67,6 +68,7 @@ class TouchEventLoop(object):
         super(TouchEventLoop, self).__init__()
         self.quit = False
         self.input_events = []
+        self.input_index = {}
         self.postproc_modules = []
         self.status = 'idle'
 
@@ -175,30 +177,44 @@ class TouchEventLoop(object):
         touch.grab_state = False
 
     def _dispatch_input(self, type, touch):
-        ev = (type, touch)
-        # remove the save event for the touch if exist
-        if ev in self.input_events:
-            self.input_events.remove(ev)
-        self.input_events.append(ev)
+        # events are coalesced per touch: if the last queued event of the
+        # touch have the same type, it's replaced by the new one. The
+        # positions of coalesced move are kept in touch.history.
+        input_events = self.input_events
+        last = self.input_index.get(touch)
+        if last is not None and input_events[last][0] == type:
+            input_events[last] = None
+            if type == 'move':
+                touch.history.append((touch.sx, touch.sy, touch.sz))
+        elif type == 'move':
+            touch.history = [(touch.sx, touch.sy, touch.sz)]
+        self.input_index[touch] = len(input_events)
+        input_events.append((type, touch))
 
     def dispatch_input(self):
         '''Called by idle() to read events from input providers,
-        pass event to postproc, and dispatch final events'''
+        pass event to postproc, and dispatch final events.
+        Return the number of dispatched events.'''
         global pymt_providers
 
         # first, aquire input events
         for provider in pymt_providers:
             provider.update(dispatch_fn=self._dispatch_input)
 
+        # remove coalesced events
+        events = [x for x in self.input_events if x is not None]
+        self.input_events = []
+        self.input_index = {}
+
         # execute post-processing modules
         for mod in self.postproc_modules:
-            self.input_events = mod.process(events=self.input_events)
+            events = mod.process(events=events)
 
         # real dispatch input
-        for type, touch in self.input_events:
+        for type, touch in events:
             self.post_dispatch_input(type=type, touch=touch)
 
-        self.input_events = []
+        return len(events)
 
     def idle(self):
         '''This function is called every frames. By default :
@@ -206,6 +222,10 @@ class TouchEventLoop(object):
         * read all input and dispatch event
         * dispatch on_update + on_draw + on_flip on window
         '''
+        profiler = getProfiler()
+        if profiler is not None:
+            return self._profiled_idle(profiler)
+
         # update dt
         global frame_dt
         frame_dt = getClock().tick()
@@ -226,6 +246,33 @@ class TouchEventLoop(object):
 
         return self.quit
 
+    def _profiled_idle(self, profiler):
+        # same as idle(), with the measure of each phase
+        global frame_dt
+        profiler.begin_frame()
+        frame_dt = getClock().tick()
+        profiler.phase('clock')
+
+        profiler.count('input_events', self.dispatch_input())
+        profiler.phase('input')
+
+        if pymt_window:
+            pymt_window.dispatch_events()
+            profiler.phase('events')
+            pymt_window.dispatch_event('on_update')
+            profiler.phase('update')
+            pymt_window.dispatch_event('on_draw')
+            profiler.phase('draw')
+            pymt_window.dispatch_event('on_flip')
+            profiler.phase('flip')
+        profiler.end_frame()
+
+        if len(pymt_event_listeners) == 0:
+            self.exit()
+            return False
+
+        return self.quit
+
     def run(self):
         '''Main loop'''
         while not self.quit:
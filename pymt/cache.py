@@ -15,6 +15,28 @@ How to use the cache ::
 
 If the instance is NULL, the cache may have trash it, because you've
 not used the label since 5 seconds, and you've reach the limit.
+
+Objects are kept in a LRU order : when the limit is reached, the least
+recently used object is removed from the cache. A category can also have a
+size budget, in bytes (or any unit you want) ::
+
+    def texture_size(image):
+        return image.width * image.height * 4
+
+    # keep at most 64Mb of images
+    Cache.register('myimages', size_limit=64 * 1024 * 1024,
+                   sizeof=texture_size)
+
+If you need to release resources when an object leave the cache, you can
+set an eviction callback. It will be called with the key and the object ::
+
+    def release(key, obj):
+        obj.release()
+
+    Cache.register('mycache', limit=10, on_evict=release)
+
+Hits, misses and evictions are counted for each category, use
+:func:`Cache.get_stats` to read them.
 '''
 
 __all__ = ('Cache', )
@@ -22,14 +44,49 @@ __all__ = ('Cache', )
 from pymt.logger import pymt_logger
 from pymt.clock import getClock
 
+class _CacheEntry(object):
+    '''(internal) An object stored in the cache. Entries of a category are
+    linked together in a circular list, from the least recently used to the
+    most recently used.'''
+
+    __slots__ = ('key', 'object', 'timeout', 'lastaccess', 'timestamp', 'size',
+                 'prev', 'next')
+
+    def __init__(self, key=None, obj=None, timeout=None, timestamp=None,
+                 size=0):
+        self.key = key
+        self.object = obj
+        self.timeout = timeout
+        self.lastaccess = timestamp
+        self.timestamp = timestamp
+        self.size = size
+        self.prev = self.next = None
+
+    def unlink(self):
+        self.prev.next = self.next
+        self.next.prev = self.prev
+        # don't keep a reference cycle, the object must be released as soon
+        # as it leave the cache
+        self.prev = self.next = None
+
+    def link_before(self, entry):
+        self.prev = entry.prev
+        self.next = entry
+        entry.prev.next = self
+        entry.prev = self
+
+
 class Cache:
     '''Cache, a manager to cache object'''
 
     _categories = {}
     _objects = {}
+    _lru = {}
+    _purge_interval = 1
 
     @staticmethod
-    def register(category, limit=None, timeout=None):
+    def register(category, limit=None, timeout=None, size_limit=None,
+                 sizeof=None, on_evict=None):
         '''Register a new category in cache, with limit
 
         :Parameters:
@@ -41,17 +98,37 @@ class Cache:
             `timeout` : double (optionnal)
                 Time to delete the object when it's not used.
                 if None, no timeout is applied.
+            `size_limit` : int (optionnal)
+                Maximum size of all the objects in the cache.
+                If None, no size limit is applied.
+            `sizeof` : callable (optionnal)
+                Function called with the object to get his size, when no size
+                is passed to :func:`Cache.append`.
+            `on_evict` : callable (optionnal)
+                Function called with (key, object) when an object leave the
+                cache.
         '''
         Cache._categories[category] = {
             'limit': limit,
-            'timeout': timeout
+            'timeout': timeout,
+            'size_limit': size_limit,
+            'sizeof': sizeof,
+            'on_evict': on_evict,
+            'mintimeout': timeout,
+            'size': 0,
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0
         }
         Cache._objects[category] = {}
+        root = _CacheEntry()
+        root.prev = root.next = root
+        Cache._lru[category] = root
         pymt_logger.debug('Cache: register <%s> with limit=%s, timeout=%ss' %
             (category, str(limit), str(timeout)))
 
     @staticmethod
-    def append(category, key, obj, timeout=None):
+    def append(category, key, obj, timeout=None, size=None):
         '''Add a new object in the cache.
 
         :Parameters:
@@ -63,23 +140,44 @@ class Cache:
                 Object to store in cache
             `timeout` : double (optionnal)
                 Custom time to delete the object if it's not used.
+            `size` : int (optionnal)
+                Size of the object, used for the size limit of the category.
         '''
         try:
             cat = Cache._categories[category]
         except KeyError:
-            pymt.pymt_logger.warning('Cache: category <%s> not exist' % category)
+            pymt_logger.warning('Cache: category <%s> not exist' % category)
             return
+        objects = Cache._objects[category]
+
+        # replace a previous object
+        entry = objects.get(key)
+        if entry is not None:
+            Cache._release(category, entry, entry.object is not obj)
+
+        if size is None:
+            size = 0
+            if cat['sizeof'] is not None and obj is not None:
+                size = cat['sizeof'](obj)
         timeout = timeout or cat['timeout']
-        # FIXME: activate purge when limit is hit
-        #limit = cat['limit']
-        #if limit is not None and len(Cache._objects[category]) >= limit:
-        #    Cache._purge_oldest(category)
-        Cache._objects[category][key] = {
-            'object': obj,
-            'timeout': timeout,
-            'lastaccess': getClock().get_time(),
-            'timestamp': getClock().get_time()
-        }
+        if timeout is not None and (cat['mintimeout'] is None
+                                    or timeout < cat['mintimeout']):
+            cat['mintimeout'] = timeout
+
+        entry = _CacheEntry(key, obj, timeout, getClock().get_time(), size)
+        entry.link_before(Cache._lru[category])
+        objects[key] = entry
+        cat['size'] += size
+
+        # remove the least recently used objects until we are in the limits.
+        # the newest object is always kept.
+        limit = cat['limit']
+        size_limit = cat['size_limit']
+        root = Cache._lru[category]
+        while root.next is not entry and (
+                (limit is not None and len(objects) > limit) or
+                (size_limit is not None and cat['size'] > size_limit)):
+            Cache._evict(category, root.next)
 
     @staticmethod
     def get(category, key, default=None):
@@ -94,10 +192,21 @@ class Cache:
                 Default value to be returned if key is not found
         '''
         try:
-            Cache._objects[category][key]['lastaccess'] = getClock().get_time()
-            return Cache._objects[category][key]['object']
-        except:
+            cat = Cache._categories[category]
+        except KeyError:
+            return default
+        entry = Cache._objects[category].get(key)
+        if entry is None:
+            cat['misses'] += 1
             return default
+        cat['hits'] += 1
+        entry.lastaccess = getClock().get_time()
+        # move to the most recently used place
+        root = Cache._lru[category]
+        if root.prev is not entry:
+            entry.unlink()
+            entry.link_before(root)
+        return entry.object
 
     @staticmethod
     def get_timestamp(category, key, default=None):
@@ -112,7 +221,7 @@ class Cache:
                 Default value to be returned if key is not found
         '''
         try:
-            return Cache._objects[category][key]['timestamp']
+            return Cache._objects[category][key].timestamp
         except:
             return default
 
@@ -129,10 +238,30 @@ class Cache:
                 Default value to be returned if key is not found
         '''
         try:
-            return Cache._objects[category][key]['lastaccess']
+            return Cache._objects[category][key].lastaccess
         except:
             return default
 
+    @staticmethod
+    def get_stats(category):
+        '''Get the statistics of a category, as a dict with `count`, `size`,
+        `limit`, `size_limit`, `timeout`, `hits`, `misses` and `evictions`
+        keys. Return None if the category doesn't exist.
+
+        :Parameters:
+            `category` : str
+                Identifier of the category
+        '''
+        try:
+            cat = Cache._categories[category]
+        except KeyError:
+            return None
+        stats = {'count': len(Cache._objects[category])}
+        for key in ('size', 'limit', 'size_limit', 'timeout', 'hits',
+                    'misses', 'evictions'):
+            stats[key] = cat[key]
+        return stats
+
     @staticmethod
     def remove(category, key=None):
         '''Purge the cache
@@ -145,77 +274,94 @@ class Cache:
         '''
         try:
             if key is not None:
-                del Cache._objects[category][key]
+                Cache._release(category, Cache._objects[category][key])
             else:
-                Cache._objects[category] = {}
+                root = Cache._lru[category]
+                while root.next is not root:
+                    Cache._release(category, root.next)
         except:
             pass
 
     @staticmethod
-    def _purge_oldest(category, maxpurge=1):
-        print 'PURGE', category
-        import heapq
-        heap_list = []
-        for key in Cache._objects[category]:
-            obj = Cache._objects[category][key]
-            if obj['lastaccess'] == obj['timestamp']:
-                continue
-            heapq.heappush(heap_list, (obj['lastaccess'], key))
-            print '<<<', obj['lastaccess']
-        n = 0
-        while n < maxpurge:
+    def _release(category, entry, notify=True):
+        '''(internal) Remove an entry from the cache, and call the eviction
+        callback if needed'''
+        cat = Cache._categories[category]
+        del Cache._objects[category][entry.key]
+        entry.unlink()
+        cat['size'] -= entry.size
+        on_evict = cat['on_evict']
+        if notify and on_evict is not None:
             try:
-                lastaccess, key = heapq.heappop(heap_list)
-                print '=>', key, lastaccess, getClock().get_time()
+                on_evict(entry.key, entry.object)
             except:
-                return
-            del Cache._objects[category][key]
+                pymt_logger.exception('Cache: error in eviction callback '
+                                      'of <%s>' % category)
 
+    @staticmethod
+    def _evict(category, entry):
+        '''(internal) Remove an entry because of a limit or a timeout'''
+        Cache._categories[category]['evictions'] += 1
+        Cache._release(category, entry)
+
+    @staticmethod
+    def _purge_oldest(category, maxpurge=1):
+        root = Cache._lru[category]
+        while maxpurge > 0 and root.next is not root:
+            Cache._evict(category, root.next)
+            maxpurge -= 1
 
     @staticmethod
     def _purge_by_timeout(dt):
 
         curtime = getClock().get_time()
 
+        # if we are late, a frame may have take lot of time to draw. An object
+        # used on every frame can look unused for the duration of the lag, so
+        # give the same delay to every object.
+        lag = max(0, dt - Cache._purge_interval)
+
         for category in Cache._objects:
 
-            timeout = Cache._categories[category]['timeout']
-            if timeout is not None and dt > timeout:
-                # XXX got a lag ! that may be because the frame take lot of time to
-                # draw. and the timeout is not adapted to the current framerate
-                # so, increase the timeout by two.
-                # ie: if the timeout is 1 sec, and framerate go to 0.7, newly
-                # object added will be automaticly trashed.
-                timeout *= 2
-                Cache._categories[category]['timeout'] = timeout
+            cat = Cache._categories[category]
+            mintimeout = cat['mintimeout']
+            if mintimeout is None:
                 continue
 
-            for key in Cache._objects[category].keys():
-
-                lastaccess  = Cache._objects[category][key]['lastaccess']
-                objtimeout  = Cache._objects[category][key]['timeout']
+            # objects are sorted by last access, stop on the first object that
+            # cannot be expired
+            root = Cache._lru[category]
+            entry = root.next
+            while entry is not root:
+                age = curtime - entry.lastaccess - lag
+                if age <= mintimeout:
+                    break
+                next = entry.next
 
                 # take the object timeout if available
-                if objtimeout is not None:
-                    timeout = objtimeout
-
-                # no timeout, cancel
+                timeout = entry.timeout
                 if timeout is None:
-                    continue
+                    timeout = cat['timeout']
 
-                if curtime - lastaccess > timeout:
-                    del Cache._objects[category][key]
+                if timeout is not None and age > timeout:
+                    Cache._evict(category, entry)
+
+                entry = next
 
     @staticmethod
     def print_usage():
         print 'Cache usage :'
         for category in Cache._categories:
-            print ' * %s : %d / %s, timeout=%s' % (
+            cat = Cache._categories[category]
+            print ' * %s : %d / %s, timeout=%s, hits=%d, misses=%d, evictions=%d' % (
                 category.capitalize(),
                 len(Cache._objects[category]),
-                str(Cache._categories[category]['limit']),
-                str(Cache._categories[category]['timeout'])
+                str(cat['limit']),
+                str(cat['timeout']),
+                cat['hits'],
+                cat['misses'],
+                cat['evictions']
             )
 
 # install the schedule clock for purging
-getClock().schedule_interval(Cache._purge_by_timeout, 1)
+getClock().schedule_interval(Cache._purge_by_timeout, Cache._purge_interval)
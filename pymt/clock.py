@@ -13,22 +13,65 @@ You can add new event like this ::
     getClock().schedule_once(my_callback, 5)
 
 If the callback return False, the schedule will be removed.
+
+Both schedule functions return an event object, that can be used to cancel
+the schedule later ::
+
+    event = getClock().schedule_interval(my_callback, 0.5)
+
+    # ... later
+    event.cancel()
+
+Events are stored in a heap, ordered by their next deadline. Only the events
+that are due are touched on each tick, and a cancel is done in constant time.
+Events scheduled with a timeout of 0 are called every frame : they are stored
+in a separate list, and don't go through the heap at all.
 '''
 
 __all__ =  ('Clock', 'getClock')
 
 import time
+from heapq import heappush, heappop, heapify
 from weakmethod import WeakMethod
 
+def _callback_key(callback):
+    # bounded method are recreated at each access, so use the instance id +
+    # the function as a key. The WeakMethod avoid to keep a reference on the
+    # instance.
+    try:
+        if callback.im_self is not None:
+            return (id(callback.im_self), callback.im_func)
+        return callback.im_func
+    except AttributeError:
+        return callback
+
 class _Event(object):
 
-    def __init__(self, loop, callback, timeout, starttime):
+    __slots__ = ('clock', 'loop', 'callback', 'timeout', 'deadline', 'key',
+                 'cancelled', 'in_heap', '_last_dt', '_dt')
+
+    def __init__(self, clock, loop, callback, timeout, starttime):
+        self.clock = clock
         self.loop = loop
         self.callback = WeakMethod(callback)
+        self.key = _callback_key(callback)
         self.timeout = timeout
+        self.deadline = starttime + timeout
+        self.cancelled = False
+        self.in_heap = False
         self._last_dt = starttime
         self._dt = 0.
 
+    def __lt__(self, other):
+        return self.deadline < other.deadline
+
+    def cancel(self):
+        '''Cancel the event. It will not be called anymore.'''
+        if self.cancelled:
+            return
+        self.cancelled = True
+        self.clock._release(self)
+
     def do(self, dt):
         if self.callback.is_dead():
             return False
@@ -42,6 +85,7 @@ class _Event(object):
         # calculate current timediff for this event
         self._dt = curtime - self._last_dt
         self._last_dt = curtime
+        self.deadline = curtime + self.timeout
 
         # call the callback
         if self.callback.is_dead():
@@ -64,7 +108,8 @@ class _Event(object):
 class Clock(object):
     '''A clock object, that support events'''
     __slots__ = ('_dt', '_last_fps_tick', '_last_tick', '_fps',
-            '_fps_counter', '_events')
+            '_fps_counter', '_heap', '_frame_events', '_callbacks',
+            '_cancelled', '_callbacks_count')
 
     def __init__(self):
         self._dt = 0
@@ -72,7 +117,16 @@ class Clock(object):
         self._fps = 0
         self._fps_counter = 0
         self._last_fps_tick = None
-        self._events = []
+        # events with a timeout, ordered by deadline
+        self._heap = []
+        # events to call every frame
+        self._frame_events = []
+        # callback key -> set of events, used for unschedule()
+        self._callbacks = {}
+        # number of cancelled events still in the heap
+        self._cancelled = 0
+        # number of events called on the last tick
+        self._callbacks_count = 0
 
     def tick(self):
         '''Advance clock to the next step. Must be called every frame.
@@ -105,27 +159,104 @@ class Clock(object):
         return self._last_tick
 
     def schedule_once(self, callback, timeout=0):
-        '''Schedule an event in <timeout> seconds'''
-        event = _Event(False, callback, timeout, self._last_tick)
-        self._events.append(event)
-        return event
+        '''Schedule an event in <timeout> seconds.
+        Return the event, that can be cancelled with event.cancel()'''
+        return self._schedule(False, callback, timeout)
 
     def schedule_interval(self, callback, timeout):
-        '''Schedule a event to be call every <timeout> seconds'''
-        event = _Event(True, callback, timeout, self._last_tick)
-        self._events.append(event)
-        return event
+        '''Schedule a event to be call every <timeout> seconds.
+        Return the event, that can be cancelled with event.cancel()'''
+        return self._schedule(True, callback, timeout)
 
     def unschedule(self, callback):
         '''Remove a previous schedule event'''
-        self._events = [x for x in self._events if x.callback() != callback]
+        events = self._callbacks.get(_callback_key(callback))
+        if not events:
+            return
+        for event in list(events):
+            if event.callback() == callback:
+                event.cancel()
+
+    def get_callbacks_count(self):
+        '''Return the number of events called on the last tick'''
+        return self._callbacks_count
+
+    def get_events_count(self):
+        '''Return the number of events currently scheduled'''
+        frame_events = [x for x in self._frame_events if not x.cancelled]
+        return len(self._heap) - self._cancelled + len(frame_events)
+
+    def _schedule(self, loop, callback, timeout):
+        event = _Event(self, loop, callback, timeout, self._last_tick)
+        if timeout <= 0:
+            self._frame_events.append(event)
+        else:
+            event.in_heap = True
+            heappush(self._heap, event)
+        key = event.key
+        if key in self._callbacks:
+            self._callbacks[key].add(event)
+        else:
+            self._callbacks[key] = set((event, ))
+        return event
+
+    def _release(self, event):
+        # called when a event is cancelled or finished
+        events = self._callbacks.get(event.key)
+        if events is not None:
+            events.discard(event)
+            if not events:
+                del self._callbacks[event.key]
+        if not event.in_heap:
+            return
+        # the event is still in the heap, and will be skipped when popped.
+        # if they are too much dead events in the heap, rebuild it.
+        self._cancelled += 1
+        if self._cancelled > 64 and self._cancelled > len(self._heap) / 2:
+            self._heap[:] = [x for x in self._heap if not x.cancelled]
+            heapify(self._heap)
+            self._cancelled = 0
 
     def _process_events(self):
-        for event in self._events[:]:
-            if event.tick(self._last_tick) == False:
-                # event may be already removed by the callback
-                if event in self._events:
-                    self._events.remove(event)
+        curtime = self._last_tick
+        count = 0
+
+        # per-frame events. The list may change during the callbacks, so
+        # iterate on a copy, and rebuild the list after.
+        frame_events = self._frame_events
+        if frame_events:
+            for event in frame_events[:]:
+                if event.cancelled:
+                    continue
+                count += 1
+                if event.tick(curtime) == False:
+                    event.cancel()
+            self._frame_events = [x for x in self._frame_events
+                                  if not x.cancelled]
+
+        # pop all events that are due. Events scheduled from a callback
+        # will be processed only on the next tick.
+        heap = self._heap
+        due = []
+        while heap and heap[0].deadline <= curtime:
+            event = heappop(heap)
+            event.in_heap = False
+            if event.cancelled:
+                self._cancelled -= 1
+                continue
+            due.append(event)
+
+        for event in due:
+            if event.cancelled:
+                continue
+            count += 1
+            if event.tick(curtime) == False:
+                event.cancel()
+            elif not event.cancelled:
+                event.in_heap = True
+                heappush(heap, event)
+
+        self._callbacks_count = count
 
 
 # create a default clock
@@ -136,4 +267,3 @@ def getClock():
     '''Return the clock instance used by PyMT'''
     global _default_clock
     return _default_clock
-
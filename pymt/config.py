@@ -12,7 +12,7 @@ from logger import pymt_logger
 from . import pymt_config_fn, logger
 
 # Version number of current configuration format
-PYMT_CONFIG_VERSION = 11
+PYMT_CONFIG_VERSION = 16
 
 #: PyMT configuration object
 pymt_config = None
@@ -152,6 +152,33 @@ if not 'PYMT_DOC_INCLUDE' in os.environ:
             pymt_config.setdefault('widgets', 'list_friction_bound', '20')
             pymt_config.setdefault('widgets', 'list_trigger_distance', '5')
 
+        elif pymt_config_version == 11:
+            # add loader pool
+            pymt_config.setdefault('pymt', 'loader_num_workers', '0')
+            pymt_config.setdefault('pymt', 'loader_max_upload_per_frame', '5')
+
+        elif pymt_config_version == 12:
+            # add image disk cache
+            pymt_config.setdefault('pymt', 'image_cache_enable', '1')
+            pymt_config.setdefault('pymt', 'image_cache_dir', 'cache/images')
+            pymt_config.setdefault('pymt', 'image_cache_size', '256')
+
+        elif pymt_config_version == 13:
+            # add glyph atlas for labels
+            pymt_config.setdefault('graphics', 'text_atlas', '0')
+
+        elif pymt_config_version == 14:
+            # add svg disk cache
+            pymt_config.setdefault('pymt', 'svg_cache_enable', '1')
+            pymt_config.setdefault('pymt', 'svg_cache_dir', 'cache/svg')
+
+        elif pymt_config_version == 15:
+            # add asynchronous record of frames
+            pymt_config.setdefault('dump', 'mode', 'image')
+            pymt_config.setdefault('dump', 'buffers', '4')
+            pymt_config.setdefault('dump', 'workers', '2')
+            pymt_config.setdefault('dump', 'command', '')
+
         else:
             # for future.
             break
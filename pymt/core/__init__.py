@@ -75,3 +75,4 @@ from spelling import *
 
 # only after core loading, load extensions
 from text.markup import *
+from text.atlas import *
@@ -2,9 +2,13 @@
 Image: handle loading of images
 '''
 
-__all__ = ('Image', 'ImageLoader', 'ImageData')
+__all__ = ('Image', 'ImageLoader', 'ImageData', 'ImageDiskCache')
 
+import os
+import numpy
+from pymt import pymt_home_dir
 from .. import core_register_libs
+from pymt.config import pymt_config
 from pymt.baseobject import BaseObject
 from pymt.utils import deprecated
 from pymt.graphx import DO, gx_color, gx_blending, drawTexturedRectangle, set_color
@@ -30,6 +34,26 @@ class ImageData(object):
     def release_data(self):
         self.data = None
 
+    def downscale(self, max_size):
+        '''Return an image reduced by an integer factor, to fit in
+        max_size x max_size. Pixels are averaged. If the image is already
+        small enough, the image itself is returned.'''
+        factor = -(-max(self.width, self.height) // int(max_size))
+        if factor <= 1 or self.data is None:
+            return self
+        fx = min(factor, self.width)
+        fy = min(factor, self.height)
+        width = self.width // fx
+        height = self.height // fy
+        bpp = len(self.mode)
+        pixels = numpy.fromstring(self.data, dtype=numpy.uint8)
+        pixels = pixels.reshape((self.height, self.width, bpp))
+        pixels = pixels[:height * fy, :width * fx].reshape(
+            (height, fy, width, fx, bpp))
+        pixels = pixels.mean(axis=3).mean(axis=1)
+        return ImageData(width, height, self.mode,
+                         pixels.round().astype(numpy.uint8).tostring())
+
 
 class ImageLoaderBase(object):
     '''Base to implement an image loader.'''
@@ -77,16 +101,55 @@ class ImageLoaderBase(object):
         return self.texture
 
 
+class ImageLoaderData(ImageLoaderBase):
+    '''Image loader for an already decoded ImageData'''
+
+    __slots__ = ()
+
+    def __init__(self, filename, data, keep_data=False):
+        self.keep_data  = keep_data
+        self.filename   = filename
+        self._texture   = None
+        self._data      = data
+
+
 class ImageLoader(object):
     __slots__ = ('loaders')
     loaders = []
 
+    #: Disk cache used when an image is loaded with disk_cache=True.
+    #: Can be None if the cache is disabled in configuration.
+    disk_cache = None
+
     @staticmethod
     def register(cls):
         ImageLoader.loaders.append(cls)
 
     @staticmethod
     def load(filename, **kwargs):
+        '''Load an image with the first loader supporting his extension.
+
+        :Parameters:
+            `keep_data` : bool, default to False
+                Keep the image data when texture is created
+            `max_size` : int, default to None
+                If set, the image is reduced to fit in max_size x max_size
+            `disk_cache` : bool, default to False
+                Use the disk cache, see :class:`ImageDiskCache`
+        '''
+        max_size = kwargs.pop('max_size', None)
+        cache = None
+        if kwargs.pop('disk_cache', False):
+            cache = ImageLoader.disk_cache
+        key = None
+        if cache is not None:
+            key = cache.key_for_file(filename, max_size)
+            entry = None
+            if key is not None:
+                entry = cache.get(key)
+            if entry is not None:
+                return ImageLoaderData(filename, entry[0], **kwargs)
+
         # extract extensions
         ext = filename.split('.')[-1].lower()
         im = None
@@ -97,6 +160,11 @@ class ImageLoader(object):
             break
         if im is None:
             raise Exception('Unsupported extension <%s>, no loader found.' % ext)
+
+        if max_size is not None and im._data is not None:
+            im._data = im._data.downscale(max_size)
+        if key is not None:
+            cache.set(key, im._data)
         return im
 
 
@@ -269,6 +337,16 @@ def load(filename):
     '''Load an image'''
     return Image.load(filename)
 
+# disk cache of decoded images
+from .diskcache import ImageDiskCache
+if pymt_config is not None and \
+   pymt_config.getint('pymt', 'image_cache_enable'):
+    _cache_dir = pymt_config.get('pymt', 'image_cache_dir')
+    if not os.path.isabs(_cache_dir):
+        _cache_dir = os.path.join(pymt_home_dir, _cache_dir)
+    ImageLoader.disk_cache = ImageDiskCache(_cache_dir,
+        pymt_config.getint('pymt', 'image_cache_size') * 1024 * 1024)
+
 # load image loaders
 core_register_libs('image', (
     ('pygame', 'img_pygame'),
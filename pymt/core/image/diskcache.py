@@ -0,0 +1,269 @@
+'''
+Image disk cache: keep the decoded images on the disk
+
+Decoding a large PNG or JPEG take time, and a photo wall can spend minutes to
+decode all his images on each start. The disk cache store the decoded pixels
+of an image in a file, so the next run read them without decoding ::
+
+    im = ImageLoader.load('photo.jpg', max_size=256, disk_cache=True)
+
+The images loaded with :class:`~pymt.loader.Loader` always use the disk cache.
+
+An entry is identified by the path, the modification time and the size of the
+image file (or the url and the ETag of a remote image), and by the requested
+max size. Each entry is a small header followed by the raw pixels, aligned on
+64 bytes : the pixels can be memory mapped and passed directly to
+:func:`~pymt.texture.Texture.blit_buffer`.
+
+When the size of the cache exceed the limit, the least recently used entries
+are removed.
+
+:Configuration tokens:
+    `image_cache_enable` : (0|1), default to 1
+        Activate the disk cache
+    `image_cache_dir` : str, default to cache/images
+        Directory of the cache, relative to the PyMT home directory
+    `image_cache_size` : int, default to 256
+        Maximum size of the cache, in megabytes
+'''
+
+__all__ = ('ImageDiskCache', )
+
+import os
+import mmap
+import struct
+import tempfile
+import time
+try:
+    from hashlib import sha1
+except ImportError:
+    from sha import new as sha1
+try:
+    import threading
+except ImportError:
+    import dummy_threading as threading
+from pymt.logger import pymt_logger
+from . import ImageData
+
+_MAGIC = 'PYMTIMC\0'
+_VERSION = 1
+_EXTENSION = '.img'
+_DATA_ALIGN = 64
+
+# magic, version, width, height, mode, data size, etag size
+_header = struct.Struct('<8sIII4sII')
+
+def _data_offset(etagsize):
+    offset = _header.size + etagsize
+    return offset + (-offset % _DATA_ALIGN)
+
+def _make_key(*largs):
+    return sha1(repr(largs)).hexdigest()
+
+
+class ImageDiskCache(object):
+    '''Cache of decoded images, stored in a directory.
+
+    :Parameters:
+        `directory` : str
+            Directory of the cache. It's created when the first entry is
+            stored.
+        `size_limit` : int, default to 256Mb
+            Maximum size of the cache, in bytes.
+    '''
+
+    def __init__(self, directory, size_limit=256 * 1024 * 1024):
+        self.directory = directory
+        self.size_limit = size_limit
+        self._lock = threading.Lock()
+        # key -> [size, last access], read from the directory on first use
+        self._entries = None
+        self._size = 0
+
+    @staticmethod
+    def key_for_file(filename, max_size=None):
+        '''Return the key of a local file, or None if the file doesn't
+        exist'''
+        try:
+            st = os.stat(filename)
+        except OSError:
+            return None
+        return _make_key('file', os.path.abspath(filename), st.st_mtime,
+                         st.st_size, max_size)
+
+    @staticmethod
+    def key_for_url(url, max_size=None):
+        '''Return the key of a remote file. The ETag is stored in the entry,
+        see :func:`get`'''
+        return _make_key('url', url, max_size)
+
+    def get(self, key):
+        '''Return a tuple (ImageData, etag) for the key, or None if the image
+        is not in the cache.'''
+        filename = self._path(key)
+        try:
+            fd = open(filename, 'rb')
+        except IOError:
+            return None
+        try:
+            try:
+                m = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    magic, version, width, height, mode, size, etagsize = \
+                        _header.unpack_from(m, 0)
+                    if magic != _MAGIC or version != _VERSION:
+                        raise ValueError('invalid header')
+                    etag = m[_header.size:_header.size + etagsize]
+                    offset = _data_offset(etagsize)
+                    if offset + size > len(m):
+                        raise ValueError('truncated entry')
+                    data = m[offset:offset + size]
+                finally:
+                    m.close()
+            finally:
+                fd.close()
+            image = ImageData(width, height, mode.rstrip('\0'), data)
+        except Exception:
+            pymt_logger.warning('ImageDiskCache: removing invalid entry %s' %
+                                filename)
+            self.remove(key)
+            return None
+
+        # mark as recently used
+        self._lock.acquire()
+        try:
+            entries = self._get_entries()
+            if key in entries:
+                entries[key][1] = self._touch(filename)
+        finally:
+            self._lock.release()
+        return image, etag
+
+    def set(self, key, image, etag=None):
+        '''Store an ImageData in the cache'''
+        if image is None or image.data is None:
+            return
+        data = str(image.data)
+        etag = etag or ''
+        offset = _data_offset(len(etag))
+        header = _header.pack(_MAGIC, _VERSION, image.width, image.height,
+                              image.mode, len(data), len(etag))
+        padding = '\0' * (offset - len(header) - len(etag))
+
+        filename = self._path(key)
+        tmpfilename = None
+        try:
+            if not os.path.exists(self.directory):
+                os.makedirs(self.directory)
+            # write in a temporary file, and rename it when it's complete, so
+            # another process never read a partial entry.
+            osfd, tmpfilename = tempfile.mkstemp(dir=self.directory,
+                                                 prefix='.tmp')
+            fd = os.fdopen(osfd, 'wb')
+            try:
+                fd.write(header)
+                fd.write(etag)
+                fd.write(padding)
+                fd.write(data)
+            finally:
+                fd.close()
+            if os.path.exists(filename):
+                os.unlink(filename)
+            os.rename(tmpfilename, filename)
+            tmpfilename = None
+        except EnvironmentError:
+            pymt_logger.exception('ImageDiskCache: unable to write %s' %
+                                  filename)
+            return
+        finally:
+            if tmpfilename is not None and os.path.exists(tmpfilename):
+                os.unlink(tmpfilename)
+
+        self._lock.acquire()
+        try:
+            entries = self._get_entries()
+            if key in entries:
+                self._size -= entries[key][0]
+            size = offset + len(data)
+            entries[key] = [size, self._touch(filename)]
+            self._size += size
+            if self._size > self.size_limit:
+                self._cleanup()
+        finally:
+            self._lock.release()
+
+    def remove(self, key):
+        '''Remove an entry from the cache'''
+        self._lock.acquire()
+        try:
+            self._remove(key)
+        finally:
+            self._lock.release()
+
+    def clear(self):
+        '''Remove all the entries'''
+        self._lock.acquire()
+        try:
+            for key in self._get_entries().keys():
+                self._remove(key)
+        finally:
+            self._lock.release()
+
+    def get_size(self):
+        '''Return the size of all the entries, in bytes'''
+        self._lock.acquire()
+        try:
+            self._get_entries()
+            return self._size
+        finally:
+            self._lock.release()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + _EXTENSION)
+
+    def _touch(self, filename):
+        # the access time is not reliable (noatime), use the modification
+        # time as the last access.
+        try:
+            os.utime(filename, None)
+        except OSError:
+            pass
+        return time.time()
+
+    def _get_entries(self):
+        if self._entries is not None:
+            return self._entries
+        self._entries = {}
+        self._size = 0
+        if not os.path.isdir(self.directory):
+            return self._entries
+        for name in os.listdir(self.directory):
+            if not name.endswith(_EXTENSION):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            self._entries[name[:-len(_EXTENSION)]] = [st.st_size, st.st_mtime]
+            self._size += st.st_size
+        return self._entries
+
+    def _remove(self, key):
+        entry = self._get_entries().pop(key, None)
+        if entry is not None:
+            self._size -= entry[0]
+        try:
+            os.unlink(self._path(key))
+        except OSError:
+            pass
+
+    def _cleanup(self):
+        # remove the least recently used entries, until the cache use 90% of
+        # his limit. this avoid to clean the cache on every new entry.
+        target = self.size_limit * 0.9
+        entries = self._entries.items()
+        entries.sort(key=lambda x: x[1][1])
+        for key, entry in entries:
+            if self._size <= target:
+                break
+            self._remove(key)
@@ -1,10 +1,19 @@
 '''
 SVG: Squirtle SVG image loader
+
+:Configuration tokens:
+    `svg_cache_enable` : (0|1), default to 1
+        Keep the tessellated svg on the disk
+    `svg_cache_dir` : str, default to cache/svg
+        Directory of the cache, relative to the PyMT home directory
 '''
 
 __all__ = ('SvgLoaderSquirtle', )
 
+import os
 import pymt
+from pymt import pymt_home_dir
+from pymt.config import pymt_config
 from pymt.core.svg import SvgBase, SvgLoader
 from pymt.lib import squirtle
 
@@ -29,6 +38,14 @@ class SvgSquirtle(SvgBase):
     def draw(self):
         self.svg_data.draw(0,0) #squirtle object requires we pass x and y
 
+# disk cache of tessellated svg
+if pymt_config is not None and \
+   pymt_config.getint('pymt', 'svg_cache_enable'):
+    _cache_dir = pymt_config.get('pymt', 'svg_cache_dir')
+    if not os.path.isabs(_cache_dir):
+        _cache_dir = os.path.join(pymt_home_dir, _cache_dir)
+    squirtle.SVG.cache_dir = _cache_dir
+
 # register
 SvgLoader.register(SvgSquirtle)
 
@@ -9,11 +9,16 @@ import re
 import os
 from .. import core_select_lib
 from ...baseobject import BaseObject
+from ...cache import Cache
 
 DEFAULT_FONT = 'Liberation Sans,Bitstream Vera Sans,Free Sans,Arial, Sans'
 
 label_font_cache = {}
 
+# wrapped paragraphs, see LabelBase._get_layout()
+if not 'PYMT_DOC' in os.environ:
+    Cache.register('pymt.textwrap', limit=2000, timeout=60)
+
 class LabelBase(BaseObject):
     '''Core text label.
     This is the abstract class used for different backend to render text.
@@ -53,7 +58,8 @@ class LabelBase(BaseObject):
             Text color in (R, G, B, A)
     '''
 
-    __slots__ = ('options', 'texture', '_label', 'color', 'usersize')
+    __slots__ = ('options', 'texture', '_label', 'color', 'usersize',
+                 '_layout')
 
     _cache_glyphs = {}
 
@@ -83,6 +89,7 @@ class LabelBase(BaseObject):
         super(LabelBase, self).__init__(**kwargs)
 
         self._label     = None
+        self._layout    = None
 
         self.color      = kwargs.get('color')
         self.usersize   = kwargs.get('size')
@@ -117,126 +124,146 @@ class LabelBase(BaseObject):
     def _render_end(self):
         pass
 
-    def render(self, real=False):
-        '''Return a tuple(width, height) to create the image
-        with the user constraints.
+    def _get_layout(self):
+        '''Return the lines of the label, as a list of
+        ((width, height), text). The text is a string if no width is set, or
+        a list of glyphs otherwise.
 
-        2 differents methods are used:
-          * if user don't set width, splitting line
-            and calculate max width + height
-          * if user set a width, blit per glyph
+        The layout is shared between the measure and the real render pass.
+        With a width, each paragraph is wrapped only once for a font and a
+        width, and kept in the `pymt.textwrap` cache : when a long text is
+        edited, only the changed paragraphs are wrapped again.
         '''
+        uw = self.usersize[0]
+        key = (self._label, uw, self.fontid)
+        if self._layout is not None and self._layout[0] == key:
+            return self._layout[1]
 
-        uw, uh = self.usersize
-        w, h = 0, 0
-        x, y = 0, 0
-        if real:
-            self._render_begin()
-
-        # no width specified, faster method
+        lines = []
         if uw is None:
-            for line in self.label.split('\n'):
-                lw, lh = self.get_extents(line)
-                if real:
-                    x = 0
-                    if self.options['halign'] == 'center':
-                        x = int((self.width - lw) / 2.)
-                    elif self.options['halign'] == 'right':
-                        x = int(self.width - lw)
-                    self._render_text(line, x, y)
-                    y += int(lh)
-                else:
-                    w = max(w, int(lw))
-                    h += int(lh)
-
-        # constraint
+            # no width specified, faster method
+            for line in self._label.split('\n'):
+                lines.append((self.get_extents(line), line))
         else:
-            # precalculate id/name
-            if not self.fontid in self._cache_glyphs:
-                self._cache_glyphs[self.fontid] = {}
-            cache = self._cache_glyphs[self.fontid]
+            fontid = key[2]
+            if not fontid in self._cache_glyphs:
+                self._cache_glyphs[fontid] = {}
+            for paragraph in self._label.split('\n'):
+                wrapkey = (fontid, uw, paragraph)
+                wrapped = Cache.get('pymt.textwrap', wrapkey)
+                if wrapped is None:
+                    wrapped = self._wrap_paragraph(paragraph, uw,
+                                                   self._cache_glyphs[fontid])
+                    Cache.append('pymt.textwrap', wrapkey, wrapped)
+                lines.extend(wrapped)
+
+        self._layout = (key, lines)
+        return lines
+
+    def _wrap_paragraph(self, paragraph, uw, cache):
+        '''Split a paragraph (a text without new line) in lines that fit in
+        the width `uw`. Return a list of ((width, height), glyphs)'''
+        # verify that each glyph have size
+        for glyph in set(paragraph):
+            if not glyph in cache:
+                cache[glyph] = self.get_extents(glyph)
+
+        glyphs = []
+        lines = []
+        lw = lh = 0
+        for word in re.split(r'( )', paragraph):
+
+            # calculate the word width
+            ww, wh = 0, 0
+            for glyph in word:
+                gw, gh = cache[glyph]
+                ww += gw
+                wh = max(gh, wh)
+
+            # is the word fit on the uw ?
+            if ww > uw:
+                if lw != 0:
+                    lines.append(((lw, lh), glyphs))
+                lines.append(((ww, wh), list(word)))
+                glyphs = []
+                lw = lh = 0
+                continue
+
+            # is the word fit on the line ?
+            if lw + ww > uw and lw != 0:
+                # no, push actuals glyph
+                lines.append(((lw, lh), glyphs))
+                glyphs = []
+                lw = lh = 0
 
-            if not real:
-                # verify that each glyph have size
-                glyphs = list(set(self.label))
-                for glyph in glyphs:
-                    if not glyph in cache:
-                        cache[glyph] = self.get_extents(glyph)
-
-            # first, split lines
-            glyphs = []
-            lines = []
-            lw = lh = 0
-            for word in re.split(r'( |\n)', self.label):
-
-                # calculate the word width
-                ww, wh = 0, 0
-                for glyph in word:
-                    gw, gh = cache[glyph]
-                    ww += gw
-                    wh = max(gh, wh)
-
-                # is the word fit on the uw ?
-                if ww > uw:
-                    lines.append(((ww, wh), word))
-                    lw = lh = x = 0
-                    continue
-
-                # get the maximum height for this line
+            # advance the width
+            if word != ' ' or lw != 0:
+                lw += ww
                 lh = max(wh, lh)
+                glyphs += list(word)
 
-                # is the word fit on the line ?
-                if (word == '\n' or x + ww > uw) and lw != 0:
+        # got some char left ?
+        if lw != 0:
+            lines.append(((lw, lh), glyphs))
 
-                    # no, push actuals glyph
-                    lines.append(((lw, lh), glyphs))
-                    glyphs = []
-
-                    # reset size
-                    lw = lh = x = 0
+        # empty paragraph, keep the height of a line
+        if not lines:
+            if not ' ' in cache:
+                cache[' '] = self.get_extents(' ')
+            lines.append(((0, cache[' '][1]), []))
 
-                    # new line ? don't render
-                    if word == '\n':
-                        continue
+        return lines
 
-                # advance the width
-                if word != ' ' or x != 0:
-                    lw += ww
-                    x  += ww
-                    lh = max(wh, lh)
-                    glyphs += list(word)
+    def render(self, real=False):
+        '''Return a tuple(width, height) to create the image
+        with the user constraints.
 
-            # got some char left ?
-            if lw != 0:
-                lines.append(((lw, lh), glyphs))
+        2 differents methods are used:
+          * if user don't set width, splitting line
+            and calculate max width + height
+          * if user set a width, blit per glyph
+        '''
 
-            if not real:
-                h = sum([size[1] for size, glyphs in lines])
-                w = uw
-            else:
-                # really render now.
-                y = 0
-                for size, glyphs in lines:
-                    x = 0
-                    if self.options['halign'] == 'center':
-                        x = int((self.width - size[0]) / 2.)
-                    elif self.options['halign'] == 'right':
-                        x = int(self.width - size[0])
-                    for glyph in glyphs:
-                        lw, lh = cache[glyph]
-                        self._render_text(glyph, x, y)
-                        x += lw
-                    y += size[1]
+        uw, uh = self.usersize
+        lines = self._get_layout()
 
         if not real:
             # was only the first pass
             # return with/height
+            w = h = 0
+            for size, text in lines:
+                w = max(w, int(size[0]))
+                h += int(size[1])
+            if uw is not None:
+                w = uw
             w = int(max(w, 1))
             h = int(max(h, 1))
             return w, h
 
+        # really render now.
+        self._render_begin()
+        if uw is not None:
+            cache = self._cache_glyphs[self.fontid]
+        halign = self.options['halign']
+        y = 0
+        for size, text in lines:
+            x = 0
+            if halign == 'center':
+                x = int((self.width - size[0]) / 2.)
+            elif halign == 'right':
+                x = int(self.width - size[0])
+            if uw is None:
+                self._render_text(text, x, y)
+            else:
+                for glyph in text:
+                    self._render_text(glyph, x, y)
+                    x += cache[glyph][0]
+            y += int(size[1])
+
         # get data from provider
-        data = self._render_end()
+        self._update_texture(self._render_end())
+
+    def _update_texture(self, data):
         assert(data)
 
         # create texture is necessary
@@ -271,6 +298,17 @@ class LabelBase(BaseObject):
             # it's a empty label, don't waste time to draw it
             return
 
+        x, y = self._get_draw_pos()
+        alpha = 1
+        if len(self.options['color']) > 3:
+            alpha = self.options['color'][3]
+        pymt.set_color(1, 1, 1, alpha, blend=True)
+        pymt.drawTexturedRectangle(
+            texture=self.texture,
+            pos=(x, y), size=self.texture.size)
+
+    def _get_draw_pos(self):
+        # bottom left position of the text, from the anchors
         x, y = self.pos
         w, h = self.size
         anchor_x = self.options['anchor_x']
@@ -292,13 +330,7 @@ class LabelBase(BaseObject):
         elif anchor_y == 'top':
             y -= h - padding_y
 
-        alpha = 1
-        if len(self.options['color']) > 3:
-            alpha = self.options['color'][3]
-        pymt.set_color(1, 1, 1, alpha, blend=True)
-        pymt.drawTexturedRectangle(
-            texture=self.texture,
-            pos=(int(x), int(y)), size=self.texture.size)
+        return int(x), int(y)
 
     def _get_label(self):
         return self._label
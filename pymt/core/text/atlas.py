@@ -0,0 +1,273 @@
+'''
+Atlas: draw labels with glyphs shared in texture pages
+
+The glyphs are rasterized once per font (name, size, bold, italic) by the text
+provider, in white, and packed in big texture pages shared by all the atlas
+labels. A label is then only a vertex array of quads referencing the glyphs of
+the pages, tinted with the label color at drawing: changing the text of a
+label doesn't need any rasterization or texture upload, except for the glyphs
+never seen before.
+
+The lines are splitted like the other labels, with
+:func:`~pymt.core.text.LabelBase.render`. Markup is not supported.
+
+The atlas label is used by :func:`~pymt.graphx.draw.getLabel` when the
+`text_atlas` token of the `graphics` section is activated in the
+configuration.
+'''
+
+__all__ = ('GlyphAtlas', 'AtlasLabel', 'getGlyphAtlas')
+
+import pymt
+from OpenGL.GL import GL_T2F_V3F, GL_QUADS, GL_CLIENT_VERTEX_ARRAY_BIT, \
+        GLfloat, glInterleavedArrays, glDrawArrays, glPushClientAttrib, \
+        glPopClientAttrib, glTranslatef
+from . import Label, LabelBase
+
+
+class _Glyph(object):
+    '''(internal) Place of a glyph in a page'''
+
+    __slots__ = ('page', 'width', 'height', 'tex_coords')
+
+    def __init__(self, page, x, y, width, height):
+        self.page = page
+        self.width = width
+        self.height = height
+        # u1, v1 (top of the glyph), u2, v2 (bottom of the glyph)
+        self.tex_coords = (x / float(page.width), y / float(page.height),
+                           (x + width) / float(page.width),
+                           (y + height) / float(page.height))
+
+
+class _AtlasPage(object):
+    '''(internal) A texture page, filled with shelves of glyphs.
+    The texture is created and updated only when the page is drawn.'''
+
+    def __init__(self, width, height, padding):
+        self.width = width
+        self.height = height
+        self.padding = padding
+        # current shelf
+        self.x = self.y = padding
+        self.shelf_height = 0
+        # (x, y, ImageData) of the glyphs not yet in the texture
+        self.pending = []
+        self.texture = None
+
+    def allocate(self, width, height):
+        '''Return the (x, y) position for a glyph of this size, or None if the
+        page is full'''
+        padding = self.padding
+        if self.x + width + padding > self.width:
+            # next shelf
+            self.x = padding
+            self.y += self.shelf_height + padding
+            self.shelf_height = 0
+        if self.x + width + padding > self.width or \
+           self.y + height + padding > self.height:
+            return None
+        x, y = self.x, self.y
+        self.x += width + padding
+        self.shelf_height = max(self.shelf_height, height)
+        return x, y
+
+    def get_texture(self):
+        '''Return the texture of the page, with all the glyphs uploaded'''
+        if self.texture is None:
+            self.texture = pymt.Texture.create(self.width, self.height)
+        if self.pending:
+            for x, y, data in self.pending:
+                self.texture.blit_data(data, pos=(x, y))
+            self.pending = []
+        return self.texture
+
+
+class GlyphAtlas(object):
+    '''Store the glyphs of all the fonts in shared texture pages.
+
+    :Parameters:
+        `page_size` : int, default to 512
+            Width and height of a texture page. A glyph bigger than a page
+            get a page for him.
+        `padding` : int, default to 1
+            Space between 2 glyphs, to prevent bleeding with the linear
+            filtering
+    '''
+
+    def __init__(self, page_size=512, padding=1):
+        self.page_size = page_size
+        self.padding = padding
+        self.pages = []
+        # fontid -> {char: _Glyph}
+        self.fonts = {}
+
+    def get_glyph(self, fontid, char, rasterize):
+        '''Return the glyph `char` of the font `fontid`. If the glyph is not
+        in the atlas, `rasterize(char)` is called to get his ImageData.'''
+        glyphs = self.fonts.get(fontid)
+        if glyphs is None:
+            glyphs = self.fonts[fontid] = {}
+        glyph = glyphs.get(char)
+        if glyph is None:
+            data = rasterize(char)
+            glyph = glyphs[char] = self.add(data.width, data.height, data)
+        return glyph
+
+    def add(self, width, height, data=None):
+        '''Allocate a place for a glyph of this size, and return the
+        glyph'''
+        for page in self.pages:
+            pos = page.allocate(width, height)
+            if pos is not None:
+                break
+        else:
+            size = self.page_size
+            padding = self.padding * 2
+            while size < width + padding or size < height + padding:
+                size *= 2
+            page = _AtlasPage(size, size, self.padding)
+            self.pages.append(page)
+            pos = page.allocate(width, height)
+        if data is not None:
+            page.pending.append((pos[0], pos[1], data))
+        return _Glyph(page, pos[0], pos[1], width, height)
+
+    def clear(self):
+        '''Remove all the glyphs and the pages. The labels already rendered
+        must be refreshed.'''
+        self.pages = []
+        self.fonts = {}
+
+_default_atlas = None
+
+def getGlyphAtlas():
+    '''Return the atlas shared by all the atlas labels'''
+    global _default_atlas
+    if _default_atlas is None:
+        _default_atlas = GlyphAtlas()
+    return _default_atlas
+
+
+# We need to do this trick when documentation is generated
+AtlasLabelBase = Label
+if Label is None:
+    AtlasLabelBase = LabelBase
+
+class AtlasLabel(AtlasLabelBase):
+    '''Label drawn with the glyphs of a :class:`GlyphAtlas`. It takes the
+    same parameters as :class:`~pymt.core.text.Label`, plus :
+
+    :Parameters:
+        `atlas` : GlyphAtlas, default to None
+            Atlas to use, default to the shared atlas (see
+            :func:`getGlyphAtlas`)
+    '''
+
+    def __init__(self, label, **kwargs):
+        self.atlas = kwargs.pop('atlas', None) or getGlyphAtlas()
+        # list of (page, GLfloat array of T2F_V3F, number of vertices)
+        self._meshes = []
+        self._content = None
+        self._vertices = None
+        super(AtlasLabel, self).__init__(label, **kwargs)
+
+    def _rasterize(self, char):
+        # render the glyph alone with the provider, in white. The color is
+        # applied when the label is drawn.
+        size, color = self._size, self.options['color']
+        self._size = [max(1, x) for x in self._get_glyph_extents(char)]
+        self.options['color'] = (1, 1, 1, 1)
+        try:
+            AtlasLabelBase._render_begin(self)
+            AtlasLabelBase._render_text(self, char, 0, 0)
+            return AtlasLabelBase._render_end(self)
+        finally:
+            self._size = size
+            self.options['color'] = color
+
+    def _get_glyph_extents(self, char):
+        fontid = self.fontid
+        cache = self._cache_glyphs.get(fontid)
+        if cache is None:
+            cache = self._cache_glyphs[fontid] = {}
+        extents = cache.get(char)
+        if extents is None:
+            extents = cache[char] = self.get_extents(char)
+        return extents
+
+    def _render_begin(self):
+        # page -> list of T2F_V3F floats
+        self._vertices = {}
+
+    def _render_text(self, text, x, y):
+        vertices = self._vertices
+        fontid = self.fontid
+        get_glyph = self.atlas.get_glyph
+        rasterize = self._rasterize
+        # the text is layouted from the top, the vertices are from the bottom
+        top = self.height - y
+        for char in text:
+            gw, gh = self._get_glyph_extents(char)
+            if gw and gh and not char.isspace():
+                glyph = get_glyph(fontid, char, rasterize)
+                u1, v1, u2, v2 = glyph.tex_coords
+                x2 = x + glyph.width
+                bottom = top - glyph.height
+                page = vertices.get(glyph.page)
+                if page is None:
+                    page = vertices[glyph.page] = []
+                page.extend((u1, v2, x, bottom, 0, u2, v2, x2, bottom, 0,
+                             u2, v1, x2, top, 0, u1, v1, x, top, 0))
+            x += gw
+
+    def _render_end(self):
+        meshes = []
+        for page, vertices in self._vertices.iteritems():
+            meshes.append((page, (GLfloat * len(vertices))(*vertices),
+                           len(vertices) / 5))
+        self._vertices = None
+        return meshes
+
+    def _update_texture(self, meshes):
+        self._meshes = meshes
+        self._content = self.size
+
+    def draw(self):
+        '''Draw the label'''
+        if not self._meshes or not len(self.label):
+            return
+        x, y = self._get_draw_pos()
+        color = self.options['color']
+        if len(color) == 3:
+            color = tuple(color) + (1, )
+        pymt.set_color(*color, blend=True)
+        with pymt.gx_matrix:
+            glTranslatef(x, y, 0)
+            glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT)
+            for page, array, count in self._meshes:
+                with pymt.gx_texture(page.get_texture()):
+                    glInterleavedArrays(GL_T2F_V3F, 0, array)
+                    glDrawArrays(GL_QUADS, 0, count)
+            glPopClientAttrib()
+
+    @property
+    def content_width(self):
+        '''Return the content width'''
+        if self._content is None:
+            return 0
+        return self._content[0] + 2 * self.options['padding_x']
+
+    @property
+    def content_height(self):
+        '''Return the content height'''
+        if self._content is None:
+            return 0
+        return self._content[1] + 2 * self.options['padding_y']
+
+    @property
+    def content_size(self):
+        '''Return the content size (width, height)'''
+        if self._content is None:
+            return (0, 0)
+        return (self.content_width, self.content_height)
@@ -49,9 +49,37 @@ class MaterialGroup(object):
     def __init__(self, material):
         self.material = material
 
-        # Interleaved array of floats in GL_T2F_N3F_V3F format
+        # Interleaved array of floats in GL_T2F_N3F_V3F format, can be a list
+        # or a numpy array of float32
         self.vertices = []
         self.array = None
+        self.triangles = 0
+
+    def build_array(self):
+        '''Create the array used for drawing from the vertices'''
+        texture = None
+        if self.material and self.material.texture:
+            texture = self.material.texture
+        vertices = self.vertices
+        if isinstance(vertices, list):
+            if texture:
+                # We do that because we don't known if the texture
+                # is a NV|ARB_RECTANGLE. If yes, texture coordinate
+                # must be in 0-size, instead of 0-1.
+                vertices[0::8] = map(lambda x: x * texture.width,
+                                     vertices[0::8])
+                vertices[1::8] = map(lambda x: x * texture.height,
+                                     vertices[1::8])
+            self.array = (GLfloat * len(vertices))(*vertices)
+        else:
+            if texture:
+                # the vertices can be read-only (memory mapped), copy them
+                vertices = vertices.reshape(-1, 8).copy()
+                vertices[:, 0] *= texture.width
+                vertices[:, 1] *= texture.height
+                vertices = vertices.ravel()
+            self.array = vertices
+        self.triangles = len(vertices) / 8
 
 class Mesh(object):
     '''
@@ -79,20 +107,7 @@ class Mesh(object):
             if group.material:
                 group.material.apply()
             if group.array is None:
-                if group.material and group.material.texture:
-                    # We do that because we don't known if the texture
-                    # is a NV|ARB_RECTANGLE. If yes, texture coordinate
-                    # must be in 0-size, instead of 0-1.
-                    group.vertices[0::8] = map(
-                        lambda x: x * group.material.texture.width,
-                        group.vertices[0::8]
-                    )
-                    group.vertices[1::8] = map(
-                        lambda x: x * group.material.texture.height,
-                        group.vertices[1::8]
-                    )
-                group.array = (GLfloat * len(group.vertices))(*group.vertices)
-                group.triangles = len(group.vertices) / 8
+                group.build_array()
             glInterleavedArrays(GL_T2F_N3F_V3F, 0, group.array)
             glDrawArrays(GL_TRIANGLES, 0, group.triangles)
             if group.material:
@@ -19,38 +19,221 @@ new gesture, and compare them ! ::
     g2 = Gesture()
     # ...
     gdb.find(g2)
+
+The database compile all his gestures into numpy arrays, grouped by the number
+of points in each stroke. A candidate gesture is scored against all the
+gestures of his group with a few matrix operations, instead of calling
+:func:`Gesture.get_score` on each gesture.
+
+A database can be saved in a binary file, and loaded later without creating
+all the gestures (see :class:`GestureFile`) ::
+
+    gdb.save('gestures.gdb')
+
+    gdb = GestureDatabase()
+    gdb.load('gestures.gdb')
 '''
 
-__all__ = ['Gesture', 'GestureDatabase', 'GesturePoint', 'GestureStroke']
+__all__ = ['Gesture', 'GestureDatabase', 'GesturePoint', 'GestureStroke',
+           'GestureFile']
 
 import math
+import mmap
+import os
+import struct
+import numpy
 from vector import *
 
+class _GestureGroup(object):
+    '''(internal) Gestures of a database having the same stroke signature,
+    stored as contiguous arrays.'''
+
+    def __init__(self, indices, points, products):
+        self.indices = numpy.array(indices, dtype=numpy.intp)
+        count = len(indices)
+        npoints = len(points[0])
+        data = numpy.empty((count, npoints, 2), dtype=numpy.float64)
+        for i, p in enumerate(points):
+            data[i] = p
+        self.x = numpy.ascontiguousarray(data[:, :, 0])
+        self.y = numpy.ascontiguousarray(data[:, :, 1])
+        self.valid = numpy.array([product is not False for product in products],
+                                 dtype=bool)
+        computed = (self.x * self.x + self.y * self.y).sum(axis=1)
+        for i, product in enumerate(products):
+            if product is not None and product is not True and \
+               product is not False:
+                computed[i] = product
+        self.products = computed
+        if npoints:
+            self.first_x = self.x[:, 0].copy()
+            self.first_y = self.y[:, 0].copy()
+            self.features = _gesture_features(self.x, self.y)
+
+
+def _gesture_info(gesture):
+    '''(internal) Return the (signature, points, product) of a gesture'''
+    return (gesture.get_signature(), gesture.get_points_array(),
+            getattr(gesture, 'gesture_product', None))
+
+
+def _gesture_features(x, y):
+    '''(internal) Coarse features of gestures, used for the prefilter :
+    the rms radius (rotation invariant), and the aspect of the bounding box'''
+    x = numpy.atleast_2d(x)
+    y = numpy.atleast_2d(y)
+    radius = numpy.sqrt((x * x + y * y).mean(axis=1))
+    w = x.max(axis=1) - x.min(axis=1)
+    h = y.max(axis=1) - y.min(axis=1)
+    total = w + h
+    total[total == 0] = 1.
+    return radius, w / total
+
+
 class GestureDatabase(object):
     '''Class to handle a gesture database.'''
     def __init__(self):
         self.db = []
+        self._groups = None
+        self._groups_count = 0
 
     def add_gesture(self, gesture):
         '''Add a new gesture in database'''
         self.db.append(gesture)
+        self._groups = None
+
+    def _compile(self):
+        '''(internal) Build the arrays used by find()'''
+        # a GestureFile can give the points without creating the gestures
+        get_info = getattr(self.db, 'get_info', None)
+        if get_info is None:
+            infos = [_gesture_info(g) for g in self.db]
+        else:
+            infos = [get_info(index) for index in xrange(len(self.db))]
+        signatures = {}
+        for index, info in enumerate(infos):
+            signature = info[0]
+            if signature in signatures:
+                signatures[signature].append(index)
+            else:
+                signatures[signature] = [index]
+        self._groups = {}
+        for signature, indices in signatures.iteritems():
+            self._groups[signature] = _GestureGroup(indices,
+                [infos[i][1] for i in indices], [infos[i][2] for i in indices])
+        self._groups_count = len(self.db)
+
+    def get_scores(self, gesture, rotation_invariant=True, prefilter=None):
+        '''Return a numpy array with the score of `gesture` against every
+        gesture of the database, in the same order as the database. The scores
+        are the same as :func:`Gesture.get_score`.
+
+        :Parameters:
+            `prefilter` : float, default to None
+                If set, gestures with a rms radius (and with a bounding box
+                aspect if `rotation_invariant` is False) too different from
+                the candidate are not scored, and have a score of -inf. This is
+                an approximation, use it only with large database.
+        '''
+        if self._groups is None or self._groups_count != len(self.db):
+            self._compile()
+
+        # gestures without the same number of strokes have a score of -1
+        scores = numpy.empty(len(self.db), dtype=numpy.float64)
+        scores.fill(-1.)
 
-    def find(self, gesture, minscore=0.9, rotation_invariant=True):
-        '''Find current gesture in database'''
+        signature = gesture.get_signature()
+        for group_signature, group in self._groups.iteritems():
+            if group_signature == signature:
+                continue
+            if len(group_signature) != len(signature):
+                continue
+            # same number of strokes, but not the same number of points. this
+            # happen only on non normalized gestures, use the slow path.
+            for index in group.indices:
+                scores[index] = self.db[index].get_score(
+                    gesture, rotation_invariant)
+
+        group = self._groups.get(signature)
+        if group is None or \
+           getattr(gesture, 'gesture_product', True) is False:
+            return scores
+
+        points = gesture.get_points_array()
+        cx = points[:, 0]
+        cy = points[:, 1]
+        x, y = group.x, group.y
+        indices = group.indices
+        products = group.products
+        valid = group.valid
+
+        if prefilter is not None and len(points):
+            radius, aspect = group.features
+            cradius, caspect = _gesture_features(cx, cy)
+            keep = numpy.abs(radius - cradius[0]) <= prefilter
+            if not rotation_invariant:
+                keep &= numpy.abs(aspect - caspect[0]) <= prefilter
+            scores[indices[~keep]] = -numpy.inf
+            x, y = x[keep], y[keep]
+            indices = indices[keep]
+            products = products[keep]
+            valid = valid[keep]
+            first_x = group.first_x[keep]
+            first_y = group.first_y[keep]
+        elif len(points):
+            first_x = group.first_x
+            first_y = group.first_y
+
+        if rotation_invariant and len(points):
+            # dot and cross products of every gesture with the candidate
+            dot = x.dot(cx) + y.dot(cy)
+            cross = y.dot(cx) - x.dot(cy)
+            # rotate the candidate to align his first point with the first
+            # point of each gesture (see Gesture.get_rigid_rotation()). The
+            # cos and sin of the angle -arctan2(a, b) are b / n and -a / n,
+            # or 1 and 0 when n is 0, like arctan2(0, 0).
+            tx, ty = cx[0], cy[0]
+            a = first_x * ty - first_y * tx
+            b = first_x * tx + first_y * ty
+            n = numpy.hypot(a, b)
+            zero = n == 0
+            n[zero] = 1.
+            b[zero] = 1.
+            a[zero] = 0.
+            dot = (b * dot - a * cross) / n
+            cproduct = float((cx * cx + cy * cy).sum())
+        else:
+            # dot product of every gesture with the candidate
+            dot = x.dot(cx) + y.dot(cy)
+            cproduct = getattr(gesture, 'gesture_product', None)
+            if cproduct is None or cproduct is True:
+                cproduct = float((cx * cx + cy * cy).sum())
+
+        positive = dot > 0
+        result = dot.copy()
+        result[positive] /= numpy.sqrt(products[positive] * cproduct)
+        result[~valid] = -1.
+        scores[indices] = result
+        return scores
+
+    def find(self, gesture, minscore=0.9, rotation_invariant=True,
+             prefilter=None):
+        '''Find current gesture in database. Return a tuple (score, gesture)
+        for the best gesture, or None if no gesture have a score greater than
+        `minscore`. Check :func:`get_scores` for the `prefilter` parameter.'''
         if not gesture:
             return
+        if not self.db:
+            return
 
-        best = None
-        bestscore = minscore
-        for g in self.db:
-            score = g.get_score(gesture, rotation_invariant)
-            if score < bestscore:
-                continue
-            bestscore = score
-            best = g
-        if not best:
+        scores = self.get_scores(gesture, rotation_invariant, prefilter)
+
+        # take the last best gesture, as the previous implementation did
+        index = len(scores) - 1 - int(numpy.argmax(scores[::-1]))
+        bestscore = float(scores[index])
+        if bestscore < minscore:
             return
-        return (bestscore, best)
+        return (bestscore, self.db[index])
 
     def gesture_to_str(self, gesture):
         '''Convert a gesture into a unique string'''
@@ -71,6 +254,269 @@ class GestureDatabase(object):
         gesture = p.load()
         return gesture
 
+    def strings_to_file(self, strings, filename):
+        '''Convert gestures in the string format (see
+        :func:`gesture_to_str`) to a binary gesture file. The gestures are
+        appended one by one to the file, and the number of gestures written is
+        returned.'''
+        gfile = GestureFile(filename)
+        count = 0
+        try:
+            for data in strings:
+                gfile.append(self.str_to_gesture(data))
+                count += 1
+        finally:
+            gfile.close()
+        return count
+
+    def save(self, filename):
+        '''Save all the gestures of the database in a binary gesture file
+        (see :class:`GestureFile`)'''
+        if isinstance(self.db, GestureFile) and \
+           os.path.abspath(self.db.filename) == os.path.abspath(filename):
+            self.db.flush()
+            return
+        with open(filename, 'wb') as fd:
+            fd.write(_file_header.pack(GESTURE_FILE_MAGIC,
+                                       GESTURE_FILE_VERSION, 0))
+            for gesture in self.db:
+                fd.write(_pack_gesture(gesture))
+
+    def load(self, filename):
+        '''Use a binary gesture file as database. The file is memory mapped,
+        and the gestures are created only when they are needed. New gestures
+        added with :func:`add_gesture` are appended to the file.'''
+        if isinstance(self.db, GestureFile):
+            self.db.close()
+        self.db = GestureFile(filename)
+        self._groups = None
+
+
+GESTURE_FILE_MAGIC = 'PYMTGDB\0'
+GESTURE_FILE_VERSION = 1
+
+# magic, version, reserved
+_file_header = struct.Struct('<8sII')
+# record size, flags, label size, strokes count, points count, tolerance,
+# gesture product
+_record_header = struct.Struct('<IIIIIdd')
+
+_FLAG_PRODUCT = 1
+_FLAG_INVALID = 2
+_FLAG_LABEL = 4
+_FLAG_UNICODE = 8
+
+def _pack_gesture(gesture):
+    '''(internal) Return the binary record of a gesture'''
+    flags = 0
+    label = getattr(gesture, 'label', None)
+    if label is None:
+        label = ''
+    else:
+        flags |= _FLAG_LABEL
+        if isinstance(label, unicode):
+            flags |= _FLAG_UNICODE
+            label = label.encode('utf-8')
+        else:
+            label = str(label)
+    padding = '\0' * (-len(label) % 4)
+
+    signature = numpy.array(gesture.get_signature(), dtype='<u4')
+    points = gesture.get_points_array().astype('<f4')
+
+    product = getattr(gesture, 'gesture_product', None)
+    if product is False:
+        flags |= _FLAG_INVALID
+        product = 0.
+    elif product is None or product is True:
+        product = 0.
+    else:
+        # the points are stored in simple precision, compute the product
+        # again to have a score of 1 between a gesture and himself.
+        flags |= _FLAG_PRODUCT
+        p = points.astype(numpy.float64)
+        product = float((p * p).sum())
+
+    size = _record_header.size + len(label) + len(padding) + \
+           signature.nbytes + points.nbytes
+    return ''.join((
+        _record_header.pack(size, flags, len(label), len(signature),
+                            len(points), gesture.tolerance, product),
+        label, padding, signature.tostring(), points.tostring()))
+
+
+class GestureFile(object):
+    '''A gesture database stored in a binary file. It can be used like a list
+    of :class:`Gesture`, and can be passed to :func:`GestureDatabase.load`.
+
+    The file start with a header (magic + version), followed by one record per
+    gesture : a fixed size header (sizes, flags, tolerance and product), the
+    label, the number of points in each stroke, and the points as a flat
+    float32 array. Records are only appended, so a gesture can be added without
+    rewriting the file.
+
+    The file is memory mapped, and the index of the records is built from the
+    record headers when the file is opened. A :class:`Gesture` is created only
+    when it is accessed, and :class:`GestureDatabase` read the points directly
+    from the file to compile his arrays. ::
+
+        gdb = GestureDatabase()
+        gdb.load('gestures.gdb')
+        gdb.add_gesture(g)      # appended to gestures.gdb
+        gdb.find(g2)
+
+    To convert gestures from the string format ::
+
+        gdb.strings_to_file(list_of_strings, 'gestures.gdb')
+
+    :Parameters:
+        `filename` : str
+            Filename of the database. The file is created if it doesn't exist.
+    '''
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._offsets = []
+        self._end = _file_header.size
+        self._cache = {}
+        self._map = None
+        self._mapsize = 0
+        self._fd = None
+        if not os.path.exists(filename) or os.path.getsize(filename) == 0:
+            with open(filename, 'wb') as fd:
+                fd.write(_file_header.pack(GESTURE_FILE_MAGIC,
+                                           GESTURE_FILE_VERSION, 0))
+        self._remap()
+        magic, version, reserved = _file_header.unpack_from(self._map, 0)
+        if magic != GESTURE_FILE_MAGIC:
+            raise ValueError('%s is not a gesture file' % filename)
+        if version > GESTURE_FILE_VERSION:
+            raise ValueError('%s: unsupported gesture file version %d' % (
+                filename, version))
+        self._build_index()
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __iter__(self):
+        for index in xrange(len(self._offsets)):
+            yield self[index]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self._offsets)
+        if index < 0 or index >= len(self._offsets):
+            raise IndexError('gesture index out of range')
+        gesture = self._cache.get(index)
+        if gesture is None:
+            gesture = self._cache[index] = self._load_gesture(index)
+        return gesture
+
+    def append(self, gesture):
+        '''Append a gesture at the end of the file'''
+        data = _pack_gesture(gesture)
+        if self._fd is None:
+            self._fd = open(self.filename, 'r+b')
+        self._fd.seek(self._end)
+        self._fd.write(data)
+        index = len(self._offsets)
+        self._offsets.append(self._end)
+        self._end += len(data)
+        self._cache[index] = gesture
+
+    def flush(self):
+        '''Flush the appended gestures to the disk'''
+        if self._fd is not None:
+            self._fd.flush()
+
+    def close(self):
+        '''Close the file. The gestures already created stay usable.'''
+        if self._fd is not None:
+            self._fd.close()
+            self._fd = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+            self._mapsize = 0
+
+    def get_info(self, index):
+        '''Return a tuple (signature, points, product) for a gesture, without
+        creating it. Used by :class:`GestureDatabase`.'''
+        gesture = self._cache.get(index)
+        if gesture is not None:
+            return _gesture_info(gesture)
+        flags, label, tolerance, product, signature, points = \
+            self._read(index)
+        if flags & _FLAG_PRODUCT:
+            pass
+        elif flags & _FLAG_INVALID:
+            product = False
+        else:
+            product = None
+        return (tuple(signature.tolist()), points.astype(numpy.float64),
+                product)
+
+    def _remap(self):
+        if self._fd is not None:
+            self._fd.flush()
+        if self._map is not None:
+            self._map.close()
+        with open(self.filename, 'rb') as fd:
+            self._mapsize = os.fstat(fd.fileno()).st_size
+            self._map = mmap.mmap(fd.fileno(), self._mapsize,
+                                  access=mmap.ACCESS_READ)
+
+    def _build_index(self):
+        m = self._map
+        offset = self._end
+        hsize = _record_header.size
+        while offset + hsize <= self._mapsize:
+            size = _record_header.unpack_from(m, offset)[0]
+            if size < hsize or offset + size > self._mapsize:
+                # incomplete record, the last write has been interrupted
+                break
+            self._offsets.append(offset)
+            offset += size
+        self._end = offset
+
+    def _read(self, index):
+        offset = self._offsets[index]
+        if self._map is None or offset >= self._mapsize:
+            self._remap()
+        m = self._map
+        size, flags, labelsize, nstrokes, npoints, tolerance, product = \
+            _record_header.unpack_from(m, offset)
+        offset += _record_header.size
+        label = m[offset:offset + labelsize]
+        offset += labelsize + (-labelsize % 4)
+        signature = numpy.frombuffer(m, dtype='<u4', count=nstrokes,
+                                     offset=offset)
+        offset += signature.nbytes
+        points = numpy.frombuffer(m, dtype='<f4', count=npoints * 2,
+                                  offset=offset).reshape((npoints, 2))
+        return flags, label, tolerance, product, signature, points
+
+    def _load_gesture(self, index):
+        flags, label, tolerance, product, signature, points = \
+            self._read(index)
+        gesture = Gesture(tolerance)
+        points = points.tolist()
+        pos = 0
+        for count in signature.tolist():
+            stroke = gesture.add_stroke()
+            stroke.points = [GesturePoint(x, y)
+                             for x, y in points[pos:pos + count]]
+            pos += count
+        if flags & _FLAG_LABEL:
+            if flags & _FLAG_UNICODE:
+                label = label.decode('utf-8')
+            gesture.label = label
+        if flags & _FLAG_PRODUCT:
+            gesture.gesture_product = product
+        elif flags & _FLAG_INVALID:
+            gesture.gesture_product = False
+        return gesture
+
 
 class GesturePoint:
     def __init__(self, x, y):
@@ -291,6 +737,19 @@ class Gesture:
             raise ValueError("point_list should be a tuple/list")
         return self.strokes[-1]
 
+    def get_signature(self):
+        '''Return a tuple with the number of points in each stroke'''
+        return tuple([len(stroke.points) for stroke in self.strokes])
+
+    def get_points_array(self):
+        '''Return the points of all the strokes, as a numpy array of shape
+        (number of points, 2)'''
+        points = [(pt.x, pt.y) for stroke in self.strokes
+                  for pt in stroke.points]
+        if not points:
+            return numpy.zeros((0, 2), dtype=numpy.float64)
+        return numpy.array(points, dtype=numpy.float64)
+
     def normalize(self, stroke_samples=32):
         ''' Runs the gesture normalization algorithm and calculates the dot product with self '''
         if not self._scale_gesture() or not self._center_gesture():
@@ -8,13 +8,19 @@ import os
 from draw import *
 from colors import set_color
 from pymt.cache import Cache
+from pymt.utils import freeze
 from statement import GlDisplayList, gx_color
+import statement
 from OpenGL.GL import *
 from pymt.core.svg import Svg
 
 
+def _release_cssrect(key, displaylist):
+    displaylist.release()
+
 if not 'PYMT_DOC' in os.environ:
-    Cache.register('pymt.cssrect', limit=100, timeout=60)
+    Cache.register('pymt.cssrect', limit=100, timeout=60,
+                   on_evict=_release_cssrect)
 
 
 def drawCSSRectangle(pos=(0,0), size=(100,100), style={}, prefix=None, state=None):
@@ -25,6 +31,13 @@ def drawCSSRectangle(pos=(0,0), size=(100,100), style={}, prefix=None, state=Non
             for example:  style[bg-color] and style[bg-color-down] are both set.
             if state == "down", we wil use bg-color-down instead of bg-color
 
+    The rectangle is compiled in a display list at (0, 0), cached for the
+    size, the style, the prefix and the state, and drawn under a translation :
+    a moving widget reuse the same display list. The cache is cleared when
+    the CSS is reloaded. Inside the compilation of another display list, the
+    rectangle is drawn without the cache: the cached list may be deleted
+    while the other one still call it.
+
     :Styles:
         * alpha-background (color)
         * border-radius (float)
@@ -41,10 +54,13 @@ def drawCSSRectangle(pos=(0,0), size=(100,100), style={}, prefix=None, state=Non
         bg_image = style.get('bg-image')
 
     # Check if we have a cached version
-    cache_id = '%s:%s:%s:%s:%s' % (pos, size, style, prefix, state)
+    cache_id = (tuple(size), freeze(style), prefix, state)
     cache = Cache.get('pymt.cssrect', cache_id)
-    if cache:
+    if cache and not statement.gl_displaylist_generate:
+        glPushMatrix()
+        glTranslatef(pos[0], pos[1], 0)
         cache.draw()
+        glPopMatrix()
         if bg_image:
             bg_image.size = size
             bg_image.pos = pos
@@ -52,6 +68,9 @@ def drawCSSRectangle(pos=(0,0), size=(100,100), style={}, prefix=None, state=Non
         return
 
 
+    # don't change the style of the caller
+    style = dict(style)
+
     # lets use the ones for given state,
     # and ignore the regular ones if the state ones are there
     if state:
@@ -86,7 +105,12 @@ def drawCSSRectangle(pos=(0,0), size=(100,100), style={}, prefix=None, state=Non
     style.setdefault('draw-alpha-background', 0)
     style.setdefault('alpha-background', (1, 1, .5, .5))
 
-    k = { 'pos': pos, 'size': size }
+    k = { 'pos': (0, 0), 'size': size }
+
+    # if the drawCSSRectangle is already inside a display list, the
+    # translation is recorded in it, with the drawing.
+    glPushMatrix()
+    glTranslatef(pos[0], pos[1], 0)
 
     new_cache = GlDisplayList()
     with new_cache:
@@ -144,6 +168,10 @@ def drawCSSRectangle(pos=(0,0), size=(100,100), style={}, prefix=None, state=Non
     if new_cache.is_compiled():
         Cache.append('pymt.cssrect', cache_id, new_cache)
         new_cache.draw()
+    else:
+        new_cache.release()
+
+    glPopMatrix()
 
     if bg_image:
         bg_image.size = size
@@ -17,6 +17,7 @@ import math
 import pymt
 from pymt.cache import Cache
 from pymt.vector import Vector
+from pymt.utils import freeze, StyleDict
 from OpenGL.GL import *
 from OpenGL.GLU import gluNewQuadric, gluDisk, gluPartialDisk
 from paint import *
@@ -32,6 +33,7 @@ except ImportError, e:
 
 # create a cache for label
 _temp_label = None
+_unhashable = (list, dict, StyleDict)
 if not 'PYMT_DOC' in os.environ:
     Cache.register('pymt.label', timeout=1., limit=1000)
 
@@ -45,6 +47,14 @@ def _make_point_list(points):
     else:
         return list(points)
 
+_text_atlas = None
+def _use_text_atlas():
+    global _text_atlas
+    if _text_atlas is None:
+        _text_atlas = pymt.pymt_config is not None and \
+            pymt.pymt_config.getboolean('graphics', 'text_atlas')
+    return _text_atlas
+
 def getLabel(label, **kwargs):
     '''Get a cached label object
 
@@ -59,6 +69,9 @@ def getLabel(label, **kwargs):
     getLabel() support all parameters from the Core label. Check `LabelBase`
     class to known all availables parameters.
 
+    If the `text_atlas` token of the `graphics` section is activated in the
+    configuration, the labels without markup are :class:`AtlasLabel`.
+
     Used by drawLabel()
     '''
     kwargs.setdefault('markup', False)
@@ -72,14 +85,18 @@ def getLabel(label, **kwargs):
         kwargs.setdefault('anchor_y', 'bottom')
     del kwargs['center']
 
-    # create an uniq id for this label
-    id = '%s##%s' % (label, str(kwargs))
+    # create an uniq id for this label. Most of the parameters are already
+    # hashable, only the colors (list) and the styles (dict) are converted.
+    id = (label, frozenset([(k, freeze(v) if type(v) in _unhashable else v)
+                            for k, v in kwargs.iteritems()]))
 
     # get or store
     obj = Cache.get('pymt.label', id)
     if not obj:
         if kwargs.get('markup'):
             obj = pymt.MarkupLabel(label, **kwargs)
+        elif _use_text_atlas():
+            obj = pymt.AtlasLabel(label, **kwargs)
         else:
             obj = pymt.Label(label, **kwargs)
         if 'nocache' not in kwargs:
@@ -9,13 +9,14 @@ __all__ = [
     'set_brush', 'set_brush_size',
     'set_texture', 'get_texture_id', 'get_texture_target',
     # draw
-    'paintLine',
+    'paintLine', 'interpolateLine', 'PaintStroke',
 ]
 
 import os
-from math import sqrt
+import numpy
 import pymt
 from OpenGL.GL import *
+from OpenGL.GL.ARB.point_sprite import GL_POINT_SPRITE_ARB, GL_COORD_REPLACE_ARB
 from statement import *
 
 _brushs_cache   = {}
@@ -78,21 +79,41 @@ def set_texture(texture, target=None):
         target = get_texture_target(texture)
     glBindTexture(target, get_texture_id(texture))
 
-def paintLine(points, numsteps=None, **kwargs):
-    '''Paint a line with current brush
-    ::
-
-        set_brush("mybrush.png", 10)
-        paintLine((0, 0, 20, 50))
-        paintLine((1, 2, 1, 5, 4, 6, 8, 7))
+def interpolateLine(points, numsteps=None):
+    '''Return the positions of the brush sprites to paint a line, as a numpy
+    array of shape (n, 2). Each segment get `numsteps` sprites, or one sprite
+    every 4 pixels if numsteps is None. The last point of the line is not
+    included.
 
+    :Parameters:
+        `points` : list
+            List of x, y of the line
+        `numsteps` : int, default to None
+            Number of sprites for each segment
     '''
-    global _brush_texture, _brush_size
-    if not _brush_texture:
-        pymt.pymt_logger.warning('Graphx: No brush set to paint line, abort')
-        return
     if len(points) % 2 == 1:
         raise Exception('Points list must be a pair length number (not impair)')
+    points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 2)
+    if len(points) < 2:
+        return numpy.zeros((0, 2), dtype=numpy.float32)
+    delta = points[1:] - points[:-1]
+    if numsteps is None:
+        dist = numpy.sqrt((delta * delta).sum(axis=1))
+        steps = numpy.maximum(1, dist.astype(numpy.int64) // 4)
+    else:
+        steps = numpy.empty(len(delta), dtype=numpy.int64)
+        steps.fill(numsteps)
+    # segment and step of each sprite
+    segment = numpy.repeat(numpy.arange(len(delta)), steps)
+    first = numpy.cumsum(steps) - steps
+    step = numpy.arange(len(segment)) - first[segment]
+    factor = step / steps[segment].astype(numpy.float64)
+    output = points[segment] + delta[segment] * factor[:, numpy.newaxis]
+    return output.astype(numpy.float32)
+
+def _paintSprites(vertices, count, **kwargs):
+    '''(internal) Draw `count` sprites of the current brush, at the positions
+    of a float32 array, in one call'''
     kwargs.setdefault('sfactor', GL_SRC_ALPHA)
     kwargs.setdefault('dfactor', GL_ONE_MINUS_SRC_ALPHA)
     blending = GlBlending(sfactor=kwargs.get('sfactor'), dfactor=kwargs.get('dfactor'))
@@ -103,30 +124,105 @@ def paintLine(points, numsteps=None, **kwargs):
         glTexEnvi(GL_POINT_SPRITE_ARB, GL_COORD_REPLACE_ARB, GL_TRUE)
         glPointSize(_brush_size)
 
-        # initialize outputList
-        outputList = []
+        # draw !
+        glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(2, GL_FLOAT, 0, vertices)
+        glDrawArrays(GL_POINTS, 0, count)
+        glPopClientAttrib()
 
-        # extract 4 points each 2 points
-        for x1, y1, x2, y2 in zip(points[::2], points[1::2],
-                                  points[2::2], points[3::2]):
+def paintLine(points, numsteps=None, **kwargs):
+    '''Paint a line with current brush
+    ::
 
-            # calculate vector and distance
-            dx, dy = x2 - x1, y2 - y1
-            dist = sqrt(dx * dx + dy * dy)
+        set_brush("mybrush.png", 10)
+        paintLine((0, 0, 20, 50))
+        paintLine((1, 2, 1, 5, 4, 6, 8, 7))
 
-            # determine step
-            steps = numsteps
-            if steps is None:
-                steps = max(1, int(dist) / 4)
+    For a line painted at each frame, and growing, use a
+    :class:`PaintStroke`.
+    '''
+    if not _brush_texture:
+        pymt.pymt_logger.warning('Graphx: No brush set to paint line, abort')
+        return
+    vertices = interpolateLine(points, numsteps)
+    if not len(vertices):
+        return
+    _paintSprites(vertices, len(vertices), **kwargs)
 
-            # construct pointList
-            for i in xrange(steps):
-                outputList.extend([x1 + dx * (float(i) / steps),
-                                   y1 + dy * (float(i) / steps)])
 
-        # draw !
-        if len(outputList) < 2:
+class PaintStroke(object):
+    '''A line painted with the current brush, which can grow. The sprites
+    of the new segments are computed when the points are added, and kept in
+    a vertex array: drawing the stroke is one draw call, whatever his
+    length.
+    ::
+
+        stroke = PaintStroke()
+        stroke.append(touch.x, touch.y)
+        ...
+        stroke.draw()
+
+    :Parameters:
+        `points` : list, default to None
+            List of x, y to start the stroke
+        `numsteps` : int, default to None
+            Number of sprites for each segment, see :func:`interpolateLine`
+    '''
+
+    def __init__(self, points=None, numsteps=None):
+        self.numsteps = numsteps
+        self.clear()
+        if points:
+            self.extend(points)
+
+    def clear(self):
+        '''Remove all the points of the stroke'''
+        self._last = None
+        self._count = 0
+        self._vertices = numpy.empty((64, 2), dtype=numpy.float32)
+
+    def append(self, x, y):
+        '''Add a point at the end of the stroke'''
+        self.extend((x, y))
+
+    def extend(self, points):
+        '''Add a list of x, y at the end of the stroke'''
+        if len(points) % 2 == 1:
+            raise Exception('Points list must be a pair length number (not impair)')
+        if not len(points):
+            return
+        last = self._last
+        self._last = tuple(points[-2:])
+        if last is not None:
+            points = list(last) + list(points)
+        new = interpolateLine(points, self.numsteps)
+        count = self._count + len(new)
+        if count > len(self._vertices):
+            # grow the array by 2, to keep the copies rare
+            size = len(self._vertices)
+            while size < count:
+                size *= 2
+            vertices = numpy.empty((size, 2), dtype=numpy.float32)
+            vertices[:self._count] = self._vertices[:self._count]
+            self._vertices = vertices
+        self._vertices[self._count:count] = new
+        self._count = count
+
+    @property
+    def vertices(self):
+        '''Positions of the sprites, as a numpy array of shape (n, 2)'''
+        return self._vertices[:self._count]
+
+    def __len__(self):
+        return self._count
+
+    def draw(self, **kwargs):
+        '''Paint the stroke with the current brush. Take the same keywords
+        as :func:`paintLine`.'''
+        if not _brush_texture:
+            pymt.pymt_logger.warning('Graphx: No brush set to paint line, abort')
+            return
+        if not self._count:
             return
-        with gx_begin(GL_POINTS):
-            for x, y in zip(outputList[::2], outputList[1::2]):
-                glVertex2f(x, y)
+        _paintSprites(self._vertices, self._count, **kwargs)
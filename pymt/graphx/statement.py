@@ -111,6 +111,14 @@ class GlDisplayList:
             return
         glCallList(self.dl)
 
+    def release(self):
+        '''Delete the display list. It can't be used anymore.'''
+        if self.dl is None:
+            return
+        glDeleteLists(self.dl, 1)
+        self.dl = None
+        self.compiled = False
+
 class DO:
     '''A way to do multiple action in with statement
     ::
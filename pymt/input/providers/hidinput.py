@@ -11,6 +11,11 @@ To configure HIDInput, put in your configuration ::
     stantum = hidinput,/dev/input/event2
 
 You must have read access to the input event.
+
+The device is read in a thread: all the events waiting are read at once, and
+decoded together. Each frame (SYN_REPORT) is given to the main thread as an
+immutable snapshot of the points, the touches are only changed in the main
+thread.
 '''
 
 __all__ = ('HIDInputTouchProvider', 'HIDTouch')
@@ -47,6 +52,8 @@ else:
     import struct
     import sys
     import fcntl
+    import numpy
+    from itertools import izip
     from ..provider import TouchProvider
     from ..factory import TouchFactory
     from ...logger import pymt_logger
@@ -109,6 +116,15 @@ else:
     struct_input_absinfo_sz = struct.calcsize('iiiiii')
     sz_l = struct.calcsize('L')
 
+    # struct input_event, to decode many events at once
+    input_event_dtype = numpy.dtype([
+        ('tv_sec', numpy.uint), ('tv_usec', numpy.uint),
+        ('type', numpy.ushort), ('code', numpy.ushort),
+        ('value', numpy.intc)], align=True)
+
+    # number of events read at once
+    read_events_count = 1024
+
     class HIDInputTouchProvider(TouchProvider):
         def __init__(self, device, args):
             super(HIDInputTouchProvider, self).__init__(device, args)
@@ -126,6 +142,9 @@ else:
                 return
             self.uid = 0
             self.queue = collections.deque()
+            # touches of the main thread, and id of the touches dispatched
+            self.touches = {}
+            self.touches_sent = set()
             self.thread = threading.Thread(
                 target=self._thread_run, kwargs={
                 'queue': self.queue,
@@ -137,50 +156,27 @@ else:
         def _thread_run(self, **kwargs):
             input_fn = kwargs.get('input_fn')
             queue = kwargs.get('queue')
-            device = kwargs.get('device')
-            touches = {}
-            touches_sent = []
-            point = {}
-            l_points = []
-
-            # prepare some vars to get limit of some component
-            range_min_position_x    = 0
-            range_max_position_x    = 2048
-            range_min_position_y    = 0
-            range_max_position_y    = 2048
-            range_min_pressure      = 0
-            range_max_pressure      = 255
-
-            def process(points):
-                actives = [args['id'] for args in points]
-                for args in points:
-                    tid = args['id']
-                    try:
-                        touch = touches[tid]
-                        if touch.sx == args['x'] and touch.sy == args['y']:
-                            continue
-                        touch.move(args)
-                        if tid not in touches_sent:
-                            queue.append(('down', touch))
-                            touches_sent.append(tid)
-                        queue.append(('move', touch))
-                    except KeyError:
-                        touch = HIDTouch(device, tid, args)
-                        touches[touch.id] = touch
-
-                for tid in touches.keys():
-                    if tid not in actives:
-                        touch = touches[tid]
-                        if tid in touches_sent:
-                            queue.append(('up', touch))
-                            touches_sent.remove(tid)
-                        del touches[tid]
-
-            def normalize(value, vmin, vmax):
-                return (value - vmin) / float(vmax - vmin)
 
             # open the input
-            fd = open(input_fn, 'rb')
+            fd = os.open(input_fn, os.O_RDONLY)
+            try:
+                ranges = self._get_ranges(fd)
+                self._read_events(fd, queue, ranges)
+            finally:
+                os.close(fd)
+
+        def _get_ranges(self, fd):
+            '''Return the range (min, max) of the position x, position y and
+            pressure of the device'''
+            # prepare some vars to get limit of some component
+            ranges = {
+                ABS_MT_POSITION_X: (0, 2048),
+                ABS_MT_POSITION_Y: (0, 2048),
+                ABS_MT_PRESSURE: (0, 255)}
+            names = {
+                ABS_MT_POSITION_X: 'position X',
+                ABS_MT_POSITION_Y: 'position Y',
+                ABS_MT_PRESSURE: 'pressure'}
 
             # get the controler name (EVIOCGNAME)
             device_name = fcntl.ioctl(fd, EVIOCGNAME + (256 << 16), " " * 256).split('\x00')[0]
@@ -207,48 +203,55 @@ else:
                                           ' ' * struct_input_absinfo_sz)
                     abs_value, abs_min, abs_max, abs_fuzz, \
                         abs_flat, abs_res = struct.unpack('iiiiii', absinfo)
-                    if y == ABS_MT_POSITION_X:
-                        range_min_position_x = abs_min
-                        range_max_position_x = abs_max
-                        pymt_logger.info('HIDTouch: ' +
-                            '<%s> range position X is %d - %d' % (
-                            device_name, abs_min, abs_max))
-                    elif y == ABS_MT_POSITION_Y:
-                        range_min_position_y = abs_min
-                        range_max_position_y = abs_max
+                    if y in ranges:
+                        ranges[y] = (abs_min, abs_max)
                         pymt_logger.info('HIDTouch: ' +
-                            '<%s> range position Y is %d - %d' % (
-                            device_name, abs_min, abs_max))
-                    elif y == ABS_MT_PRESSURE:
-                        range_min_pressure = abs_min
-                        range_max_pressure = abs_max
-                        pymt_logger.info('HIDTouch: ' +
-                            '<%s> range pressure is %d - %d' % (
-                            device_name, abs_min, abs_max))
+                            '<%s> range %s is %d - %d' % (
+                            device_name, names[y], abs_min, abs_max))
+            return ranges
+
+        def _read_events(self, fd, queue, ranges):
+            '''Read the events of `fd` until the end, and push a snapshot of
+            each frame in the queue: a tuple of points, each point is a tuple
+            of (key, value).'''
+            point = {}
+            l_points = []
+            min_x, max_x = ranges[ABS_MT_POSITION_X]
+            min_y, max_y = ranges[ABS_MT_POSITION_Y]
+            min_pressure, max_pressure = ranges[ABS_MT_PRESSURE]
+            # precompute the normalization
+            scale_x = 1. / float(max_x - min_x)
+            scale_y = 1. / float(max_y - min_y)
+            scale_pressure = 1. / float(max_pressure - min_pressure)
 
             # read until the end
-            while fd:
-
-                data = fd.read(struct_input_event_sz)
-                if len(data) < struct_input_event_sz:
+            remaining = ''
+            while True:
+                # read all the events available at once
+                data = os.read(fd, struct_input_event_sz * read_events_count)
+                if not data:
                     break
+                if remaining:
+                    data = remaining + data
+                count = len(data) / struct_input_event_sz
+                remaining = data[count * struct_input_event_sz:]
+                if not count:
+                    continue
 
-                # extract each event
-                for i in xrange(len(data) / struct_input_event_sz):
-                    ev = data[i * struct_input_event_sz:]
-
-                    # extract timeval + event infos
-                    tv_sec, tv_usec, ev_type, ev_code, ev_value = \
-                            struct.unpack('LLHHi', ev[:struct_input_event_sz])
+                # extract all the events
+                events = numpy.frombuffer(data, input_event_dtype, count)
+                for ev_type, ev_code, ev_value in izip(
+                        events['type'].tolist(), events['code'].tolist(),
+                        events['value'].tolist()):
 
                     # sync event
                     if ev_type == EV_SYN:
                         if ev_code == SYN_MT_REPORT:
                             if 'id' not in point:
                                 continue
-                            l_points.append(point)
+                            l_points.append(tuple(point.iteritems()))
                         elif ev_code == SYN_REPORT:
-                            process(l_points)
+                            queue.append(tuple(l_points))
                             l_points = []
 
                     elif ev_type == EV_MSC and ev_code in (MSC_RAW, MSC_SCAN):
@@ -260,31 +263,56 @@ else:
                             point = {}
                             point['id'] = ev_value
                         elif ev_code == ABS_MT_POSITION_X:
-                            point['x'] = normalize(ev_value,
-                                range_min_position_x, range_max_position_x)
+                            point['x'] = (ev_value - min_x) * scale_x
                         elif ev_code == ABS_MT_POSITION_Y:
-                            point['y'] = 1. - normalize(ev_value,
-                                range_min_position_y, range_max_position_y)
+                            point['y'] = 1. - (ev_value - min_y) * scale_y
                         elif ev_code == ABS_MT_ORIENTATION:
                             point['orientation'] = ev_value
                         elif ev_code == ABS_MT_BLOB_ID:
                             point['blobid'] = ev_value
                         elif ev_code == ABS_MT_PRESSURE:
-                            point['pressure'] = normalize(ev_value,
-                                range_min_pressure, range_max_pressure)
+                            point['pressure'] = \
+                                (ev_value - min_pressure) * scale_pressure
                         elif ev_code == ABS_MT_TOUCH_MAJOR:
                             point['size_w'] = ev_value
                         elif ev_code == ABS_MT_TOUCH_MINOR:
                             point['size_h'] = ev_value
 
         def update(self, dispatch_fn):
-            # dispatch all event from threads
-            try:
-                while True:
-                    event_type, touch = self.queue.popleft()
-                    dispatch_fn(event_type, touch)
-            except:
-                pass
+            # dispatch all the frames from the thread
+            queue = self.queue
+            while queue:
+                self._process_frame(queue.popleft(), dispatch_fn)
+
+        def _process_frame(self, frame, dispatch_fn):
+            '''Update the touches from the snapshot of a frame'''
+            touches = self.touches
+            touches_sent = self.touches_sent
+            actives = set()
+            for point in frame:
+                args = dict(point)
+                tid = args['id']
+                actives.add(tid)
+                if 'x' not in args or 'y' not in args:
+                    continue
+                touch = touches.get(tid)
+                if touch is None:
+                    touches[tid] = HIDTouch(self.device, tid, args)
+                    continue
+                if touch.sx == args['x'] and touch.sy == args['y']:
+                    continue
+                touch.move(args)
+                if tid not in touches_sent:
+                    dispatch_fn('down', touch)
+                    touches_sent.add(tid)
+                dispatch_fn('move', touch)
+
+            for tid in touches.keys():
+                if tid not in actives:
+                    touch = touches.pop(tid)
+                    if tid in touches_sent:
+                        touches_sent.remove(tid)
+                        dispatch_fn('up', touch)
 
 
     TouchFactory.register('hidinput', HIDInputTouchProvider)
@@ -24,6 +24,15 @@ class TuioTouchProvider(TouchProvider):
         # name = tuio,<ip>:<port>
         multitouchtable = tuio,192.168.0.1:3333
 
+    For high touch rates, you can use the batch mode. The socket is not read
+    in a separate process anymore, but polled on each frame : all the
+    datagrams are read at once, bundles are decoded in one pass, late frames
+    (according to the fseq message) are ignored, and when a touch have
+    several `set` messages in the same frame, only the last one is used ::
+
+        [input]
+        multitouchtable = tuio,192.168.0.1:3333,batch
+
     You can easily handle new tuio path by extending the providers like this ::
 
         # Create a class to handle the new touch type
@@ -62,8 +71,11 @@ class TuioTouchProvider(TouchProvider):
             return None
         self.ip, self.port = args[0].split(':')
         self.port = int(self.port)
+        self.batch = 'batch' in args[1:]
         self.handlers = {}
         self.oscid = None
+        self.poller = None
+        self.fseq = {}
         self.tuio_event_q = deque()
         self.touches = {}
 
@@ -87,18 +99,30 @@ class TuioTouchProvider(TouchProvider):
 
     def start(self):
         '''Start the tuio provider'''
-        self.oscid = osc.listen(self.ip, self.port)
         for oscpath in TuioTouchProvider.__handlers__:
             self.touches[oscpath] = {}
+        if self.batch:
+            self.poller = osc.OSCPoller(self.ip, self.port)
+            return
+        self.oscid = osc.listen(self.ip, self.port)
+        for oscpath in TuioTouchProvider.__handlers__:
             osc.bind(self.oscid, self._osc_tuio_cb, oscpath)
 
     def stop(self):
         '''Stop the tuio provider'''
+        if self.poller is not None:
+            self.poller.close()
+            self.poller = None
+            return
         osc.dontListen(self.oscid)
 
     def update(self, dispatch_fn):
         '''Update the tuio provider (pop event from the queue)'''
 
+        if self.poller is not None:
+            self._update_batch(dispatch_fn, self.poller.read())
+            return
+
         # deque osc queue
         osc.readQueue(self.oscid)
 
@@ -115,6 +139,75 @@ class TuioTouchProvider(TouchProvider):
         oscpath, types, args = message[0], message[1], message[2:]
         self.tuio_event_q.appendleft([oscpath, args, types])
 
+    def _is_late(self, oscpath, fseq):
+        '''Check if a frame is older than the last frame received. The
+        sequence can be restarted by the tracker, so only frames a bit older
+        than the last one are considered late.'''
+        if fseq <= 0:
+            return False
+        last = self.fseq.get(oscpath, 0)
+        if fseq < last and last - fseq <= 100:
+            return True
+        self.fseq[oscpath] = fseq
+        return False
+
+    def _update_batch(self, dispatch_fn, packets):
+        '''Decode and dispatch a batch of datagrams'''
+        handlers = TuioTouchProvider.__handlers__
+        queue = []
+        # (oscpath, id) -> index in queue of the last set message
+        sets = {}
+        # oscpath -> index in queue of the last alive message, if no set
+        # message have been received after it
+        alives = {}
+        for packet in packets:
+            try:
+                messages = osc.decodePacket(packet)
+            except Exception:
+                pymt_logger.debug('Tuio: ignoring a malformed packet')
+                continue
+
+            # ignore the late frames
+            late = None
+            for message in messages:
+                if len(message) > 3 and message[2] == 'fseq' and \
+                   message[0] in handlers:
+                    if self._is_late(message[0], message[3]):
+                        if late is None:
+                            late = set()
+                        late.add(message[0])
+
+            for message in messages:
+                oscpath = message[0]
+                if oscpath not in handlers or len(message) < 3:
+                    continue
+                if late is not None and oscpath in late:
+                    continue
+                command = message[2]
+                if command == 'set':
+                    if len(message) < 4:
+                        continue
+                    # a newer set supersede the previous one for the touch
+                    key = (oscpath, message[3])
+                    index = sets.get(key)
+                    if index is not None:
+                        queue[index] = None
+                    sets[key] = len(queue)
+                    alives.pop(oscpath, None)
+                elif command == 'alive':
+                    # without set between them, only the last alive matter
+                    index = alives.get(oscpath)
+                    if index is not None:
+                        queue[index] = None
+                    alives[oscpath] = len(queue)
+                else:
+                    continue
+                queue.append([oscpath, message[2:], message[1]])
+
+        for value in queue:
+            if value is not None:
+                self._update(dispatch_fn, value)
+
     def _update(self, dispatch_fn, value):
         oscpath, args, types = value
         command = args[0]
@@ -36,6 +36,15 @@ testing the profile ::
             # not a fiducial, abandon
             return
 
+Multiple move received from the provider in the same frame are dispatched
+only once. The intermediate positions are available in `touch.history`, as a
+list of (sx, sy, sz), the last one being the current position ::
+
+    def on_touch_move(self, touch):
+        for sx, sy, sz in touch.history:
+            # draw the whole path, not only the last position
+            pass
+
 
 '''
 
@@ -126,6 +135,7 @@ class Touch(object):
         self.double_tap_time = 0
         self.no_event = False
         self.userdata = {}
+        self.history = []
 
         self.depack(args)
 
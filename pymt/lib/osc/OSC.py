@@ -246,6 +246,109 @@ def decodeOSC(data):
     return decoded
 
 
+# fixed size arguments, used by decodePacket()
+_fixedTags = {"i": "i", "f": "f", "d": "d", "h": "q", "t": "Q", "c": "i",
+              "r": "I", "m": "I"}
+_bundleSize = struct.Struct(">i")
+# typetags -> list of steps to decode the arguments
+_plans = {}
+
+def _getPlan(typetags):
+    """Compile the typetags into a list of steps. A step is a struct for a
+    run of fixed size arguments, or a typetag for the others arguments."""
+    plan = _plans.get(typetags)
+    if plan is not None:
+        return plan
+    if not typetags.startswith(","):
+        raise ValueError("OSC typetags lacks the magic ,")
+    plan = []
+    run = ""
+    for tag in typetags[1:]:
+        if tag in _fixedTags:
+            run += _fixedTags[tag]
+            continue
+        if run:
+            plan.append(struct.Struct(">" + run))
+            run = ""
+        if tag not in "sSbTFN":
+            raise ValueError("unknown OSC typetag %r" % tag)
+        plan.append(tag)
+    if run:
+        plan.append(struct.Struct(">" + run))
+    plan = _plans[typetags] = tuple(plan)
+    return plan
+
+def _decodeMessage(data, offset, end, messages):
+    find = data.find
+    stop = find("\0", offset)
+    if stop < 0:
+        raise ValueError("unterminated OSC string")
+    message = [data[offset:stop]]
+    offset = (stop + 4) & ~3
+    if offset >= end:
+        message.append("")
+        messages.append(message)
+        return
+    stop = find("\0", offset)
+    if stop < 0:
+        raise ValueError("unterminated OSC string")
+    typetags = data[offset:stop]
+    offset = (stop + 4) & ~3
+    message.append(typetags)
+    for step in _getPlan(typetags):
+        if step.__class__ is str:
+            if step == "s" or step == "S":
+                stop = find("\0", offset)
+                if stop < 0:
+                    raise ValueError("unterminated OSC string")
+                message.append(data[offset:stop])
+                offset = (stop + 4) & ~3
+            elif step == "b":
+                length = _bundleSize.unpack_from(data, offset)[0]
+                offset += 4
+                message.append(data[offset:offset + length])
+                offset += (length + 3) & ~3
+            elif step == "T":
+                message.append(True)
+            elif step == "F":
+                message.append(False)
+            else:
+                message.append(None)
+        else:
+            message.extend(step.unpack_from(data, offset))
+            offset += step.size
+    if offset > end:
+        raise ValueError("truncated OSC message")
+    messages.append(message)
+
+def decodePacket(data, messages=None, offset=0, end=None):
+    """Decodes an OSC packet (a message, or a bundle with nested bundles) in
+    a single pass, without slicing the data, and returns a flat list of
+    messages. Each message is a list [address, typetags, arg1, ...], like
+    decodeOSC(). Raises ValueError or struct.error on malformed data."""
+    if messages is None:
+        messages = []
+    if end is None:
+        end = len(data)
+    if not data.startswith("#bundle\0", offset):
+        _decodeMessage(data, offset, end, messages)
+        return messages
+    # skip the bundle header and the time tag
+    offset += 16
+    unpack_from = _bundleSize.unpack_from
+    while offset + 4 <= end:
+        length = unpack_from(data, offset)[0]
+        offset += 4
+        if length < 0 or offset + length > end:
+            raise ValueError("invalid OSC bundle element size")
+        if data.startswith("#bundle\0", offset):
+            decodePacket(data, messages, offset, offset + length)
+        else:
+            _decodeMessage(data, offset, offset + length, messages)
+        offset += length
+    return messages
+
+
 class CallbackManager:
     """This utility class maps OSC addresses to callables.
 
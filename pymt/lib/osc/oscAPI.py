@@ -228,6 +228,66 @@ class OSCServer(_OSCServer):
                 pymt_logger.exception(e)
                 return 'no data arrived'
 
+class OSCPoller(object):
+    '''Non-blocking OSC socket, read from the main thread.
+
+    No thread or process is used : all the datagrams received since the last
+    call are read at once with read(), and can be decoded with
+    decodePacket(). The receive buffer of the socket is enlarged to keep the
+    datagrams received between two frames.
+    '''
+    def __init__(self, ipAddr='127.0.0.1', port=9001, bufsize=1048576):
+        self.ipAddr     = ipAddr
+        self.port       = port
+        self.haveSocket = False
+        self._lastBind  = 0
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if os.name in ['posix', 'mac'] and hasattr(socket, 'SO_REUSEADDR'):
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, bufsize)
+        except socket.error:
+            pass
+        self.socket.setblocking(0)
+        self._bind()
+
+    def _bind(self):
+        self._lastBind = time.time()
+        try:
+            self.socket.bind((self.ipAddr, self.port))
+            self.haveSocket = True
+            pymt_logger.info('OSC: polling for Tuio on %s:%i' % (
+                self.ipAddr, self.port))
+        except socket.error, e:
+            if e.args[0] == errno.EADDRINUSE:
+                pymt_logger.error('OSC: Address %s:%i already in use, retry in 2 second' % (self.ipAddr, self.port))
+            else:
+                pymt_logger.exception(e)
+
+    def read(self, maxPackets=4096):
+        '''Return the list of datagrams waiting on the socket'''
+        if not self.haveSocket:
+            # retry to bind the socket every 2 seconds
+            if time.time() - self._lastBind > 2:
+                self._bind()
+            return []
+        packets = []
+        recv = self.socket.recv
+        try:
+            while len(packets) < maxPackets:
+                packets.append(recv(65535))
+        except socket.error, e:
+            if e.args[0] not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                pymt_logger.error('OSC: Error in Tuio recv()')
+                pymt_logger.exception(e)
+        return packets
+
+    def close(self):
+        '''Close the socket'''
+        self.socket.close()
+        self.haveSocket = False
+
+
 def listen(ipAddr='127.0.0.1', port=9001):
     '''Creates a new thread listening to that port
     defaults to ipAddr='127.0.0.1', port 9001
@@ -5,6 +5,12 @@ Example usage:
     my_svg = squirtle.SVG('filename.svg')
     my_svg.draw(100, 200, angle=15)
 
+The paths are tessellated once into flat arrays of vertices and colors, drawn
+with vertex arrays. When :attr:`SVG.cache_dir` is set, the arrays are saved in
+that directory, identified by the hash of the file content and the number of
+bezier and circle points : the next loads of the same file don't parse
+anything.
+
 '''
 
 __all__ = ['SVG', 'setup_gl']
@@ -15,6 +21,14 @@ from xml.etree.cElementTree import parse
 import re
 import math
 import sys, os
+import gzip
+import struct
+import tempfile
+import numpy
+try:
+    from hashlib import sha1
+except ImportError:
+    from sha import new as sha1
 try:
     # get the faster one
     from cStringIO import StringIO
@@ -26,6 +40,19 @@ from pymt.logger import pymt_logger
 BEZIER_POINTS = 10
 CIRCLE_POINTS = 24
 TOLERANCE = 0.001
+# vertices of a loop nearer than this are merged before the tessellation
+MERGE_DISTANCE = 0.0000001
+
+_CACHE_MAGIC = 'PYMTSVG\0'
+_CACHE_VERSION = 1
+_CACHE_EXTENSION = '.svgmesh'
+_CACHE_ALIGN = 64
+# magic, version, width, height, number of vertices, number of ranges
+_cache_header = struct.Struct('<8sIddII')
+
+def _cache_offset(offset):
+    return offset + (-offset % _CACHE_ALIGN)
+
 def setup_gl():
     """Set various pieces of OpenGL state for better rendering of SVG.
 
@@ -372,7 +399,12 @@ class SVG(object):
     """
 
     _tess = None
-    _disp_list_cache = {}
+    _mesh_cache = {}
+
+    #: Directory of the persistent cache of the tessellated files. If None,
+    #: the files are parsed again on each start.
+    cache_dir = None
+
     def __init__(self, filename, anchor_x=0, anchor_y=0, bezier_points=BEZIER_POINTS, circle_points=CIRCLE_POINTS, rawdata=None):
         """Creates an SVG object from a .svg or .svgz file.
 
@@ -403,7 +435,7 @@ class SVG(object):
         self.circle_points = circle_points
         self.bezier_coefficients = []
         self.gradients = GradientContainer()
-        self.generate_disp_list()
+        self.generate_arrays()
         self.anchor_x = anchor_x
         self.anchor_y = anchor_y
 
@@ -439,25 +471,121 @@ class SVG(object):
 
     anchor_y = property(_get_anchor_y, _set_anchor_y)
 
-    def generate_disp_list(self):
-        if (self.filename, self.bezier_points) in self._disp_list_cache:
-            self.disp_list, self.width, self.height = self._disp_list_cache[self.filename, self.bezier_points]
+    def generate_arrays(self):
+        key = (self.filename, self.bezier_points, self.circle_points)
+        if key in self._mesh_cache:
+            mesh, self.width, self.height = self._mesh_cache[key]
+            self._set_mesh(*mesh)
+            return
+        if self.rawdata != None:
+            data = self.rawdata
         else:
-            if self.rawdata != None:
-                f = StringIO(self.rawdata)
+            fd = open(self.filename, 'rb')
+            try:
+                data = fd.read()
+            finally:
+                fd.close()
+
+        mesh = cache_key = None
+        if self.cache_dir:
+            cache_key = self._get_cache_key(data)
+            mesh = self._read_cache(cache_key)
+        if mesh is None:
+            if data[:3] == '\x1f\x8b\x08': #gzip magic numbers
+                f = gzip.GzipFile(fileobj=StringIO(data))
             else:
-                if open(self.filename, 'rb').read(3) == '\x1f\x8b\x08': #gzip magic numbers
-                    import gzip
-                    f = gzip.open(self.filename, 'rb')
-                else:
-                    f = open(self.filename, 'rb')
+                f = StringIO(data)
             self.tree = parse(f)
             self.parse_doc()
-            self.disp_list = glGenLists(1)
-            glNewList(self.disp_list, GL_COMPILE)
-            self.render_slowly()
-            glEndList()
-            self._disp_list_cache[self.filename, self.bezier_points] = (self.disp_list, self.width, self.height)
+            mesh = self.build_arrays()
+            if cache_key is not None:
+                self._write_cache(cache_key, mesh)
+        self._set_mesh(*mesh)
+        self._mesh_cache[key] = (mesh, self.width, self.height)
+
+    def _set_mesh(self, vertices, colors, ranges):
+        self.vertices = vertices
+        self.colors = colors
+        self.ranges = ranges
+        self.n_tris = sum([c for m, f, c in ranges if m == GL_TRIANGLES]) / 3
+        self.n_lines = sum([c for m, f, c in ranges if m == GL_LINES]) / 2
+
+    def _get_cache_key(self, data):
+        key = sha1(data)
+        key.update(repr((self.bezier_points, self.circle_points)))
+        return key.hexdigest()
+
+    def _read_cache(self, key):
+        filename = os.path.join(self.cache_dir, key + _CACHE_EXTENSION)
+        try:
+            fd = open(filename, 'rb')
+        except IOError:
+            return None
+        try:
+            try:
+                data = fd.read()
+            finally:
+                fd.close()
+            magic, version, width, height, count, nranges = \
+                _cache_header.unpack_from(data, 0)
+            if magic != _CACHE_MAGIC or version != _CACHE_VERSION:
+                raise ValueError('invalid header')
+            offset = _cache_offset(_cache_header.size)
+            ranges = numpy.frombuffer(data, 'int32', nranges * 3, offset)
+            offset = _cache_offset(offset + ranges.nbytes)
+            vertices = numpy.frombuffer(data, 'float32', count * 2, offset)
+            offset = _cache_offset(offset + vertices.nbytes)
+            colors = numpy.frombuffer(data, 'uint8', count * 4, offset)
+            vertices = vertices.reshape(count, 2)
+            colors = colors.reshape(count, 4)
+        except Exception:
+            pymt_logger.warning('Squirtle: invalid cache %s for %s' %
+                                (filename, self.filename))
+            return None
+        self.width, self.height = width, height
+        return vertices, colors, [tuple(map(int, x)) for x in ranges.reshape(-1, 3)]
+
+    def _write_cache(self, key, mesh):
+        vertices, colors, ranges = mesh
+        ranges = numpy.array(ranges, 'int32').reshape(-1)
+        chunks = [_cache_header.pack(_CACHE_MAGIC, _CACHE_VERSION,
+                                     self.width, self.height, len(vertices),
+                                     len(ranges) / 3)]
+        offset = len(chunks[0])
+        for array in (ranges, vertices, colors):
+            if offset != _cache_offset(offset):
+                chunks.append('\0' * (_cache_offset(offset) - offset))
+                offset = _cache_offset(offset)
+            chunks.append(array.tostring())
+            offset += array.nbytes
+
+        filename = os.path.join(self.cache_dir, key + _CACHE_EXTENSION)
+        tmpfilename = None
+        try:
+            if not os.path.exists(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            # write in a temporary file, and rename it when it's complete, so
+            # another process never read a partial entry.
+            osfd, tmpfilename = tempfile.mkstemp(dir=self.cache_dir,
+                                                 prefix='.tmp')
+            fd = os.fdopen(osfd, 'wb')
+            try:
+                fd.write(''.join(chunks))
+            finally:
+                fd.close()
+            # mkstemp create the file readable only by us, the cache may be
+            # shared with other users
+            os.chmod(tmpfilename, 0644)
+            if os.path.exists(filename):
+                os.unlink(filename)
+            os.rename(tmpfilename, filename)
+            tmpfilename = None
+        except EnvironmentError:
+            pymt_logger.exception('Squirtle: unable to write cache %s' %
+                                  filename)
+        finally:
+            if tmpfilename is not None and os.path.exists(tmpfilename):
+                os.unlink(tmpfilename)
 
     def draw(self, x, y, z=0, angle=0, scale=1):
         """Draws the SVG to screen.
@@ -488,49 +616,65 @@ class SVG(object):
                 glScalef(scale, scale, 1)
         if self._a_x or self._a_y:
             glTranslatef(-self._a_x, -self._a_y, 0)
-        glCallList(self.disp_list)
+        if self.ranges:
+            glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT)
+            glEnableClientState(GL_VERTEX_ARRAY)
+            glEnableClientState(GL_COLOR_ARRAY)
+            glVertexPointer(2, GL_FLOAT, 0, self.vertices)
+            glColorPointer(4, GL_UNSIGNED_BYTE, 0, self.colors)
+            for mode, first, count in self.ranges:
+                glDrawArrays(mode, first, count)
+            glPopClientAttrib()
         glPopMatrix()
 
-    def render_slowly(self):
-        self.n_tris = 0
-        self.n_lines = 0
+    def build_arrays(self):
+        '''Return the parsed paths as a tuple (vertices, colors, ranges):
+        vertices is a float32 array of (x, y) already transformed, colors an
+        uint8 array of RGBA, and ranges a list of (mode, first, count) to
+        draw in order.'''
+        vertices = []
+        colors = []
+        ranges = []
+        first = [0]
+
+        def add(mode, pts, color, transform):
+            count = len(pts)
+            if isinstance(color, str):
+                g = self.gradients[color]
+                colors.append(numpy.array([g.interp(x) for x in pts], 'uint8'))
+            else:
+                colors.append(numpy.tile(numpy.array(color, 'uint8'),
+                                         (count, 1)))
+            a, b, c, d, e, f = transform.values
+            x, y = pts[:, 0], pts[:, 1]
+            out = numpy.empty((count, 2), 'float32')
+            out[:, 0] = a * x + c * y + e
+            out[:, 1] = b * x + d * y + f
+            vertices.append(out)
+            # merge the consecutive draws of the same mode
+            if ranges and ranges[-1][0] == mode:
+                ranges[-1] = (mode, ranges[-1][1], ranges[-1][2] + count)
+            else:
+                ranges.append((mode, first[0], count))
+            first[0] += count
+
         for path, stroke, tris, fill, transform in self.paths:
             if tris:
-                self.n_tris += len(tris)/3
-                if isinstance(fill, str):
-                    g = self.gradients[fill]
-                    fills = [g.interp(x) for x in tris]
-                else:
-                    fills = [fill for x in tris]
-                #pyglet.graphics.draw(len(tris), GL_TRIANGLES,
-                #                     ('v3f', sum((x + [0] for x in tris), [])),
-                #                     ('c3B', sum(fills, [])))
-                glBegin(GL_TRIANGLES)
-                for vtx, clr in zip(tris, fills):
-                    vtx = transform(vtx)
-                    glColor4ub(*clr)
-                    glVertex3f(vtx[0], vtx[1], 0)
-                glEnd()
+                add(GL_TRIANGLES, numpy.array(tris, 'float64'), fill,
+                    transform)
             if path:
                 for loop in path:
-                    self.n_lines += len(loop) - 1
-                    loop_plus = []
-                    for i in xrange(len(loop) - 1):
-                        loop_plus += [loop[i], loop[i+1]]
-                    if isinstance(stroke, str):
-                        g = self.gradients[stroke]
-                        strokes = [g.interp(x) for x in loop_plus]
-                    else:
-                        strokes = [stroke for x in loop_plus]
-                    #pyglet.graphics.draw(len(loop_plus), GL_LINES,
-                    #                     ('v3f', sum((x + [0] for x in loop_plus), [])),
-                    #                     ('c3B', sum((stroke for x in loop_plus), [])))
-                    glBegin(GL_LINES)
-                    for vtx, clr in zip(loop_plus, strokes):
-                        vtx = transform(vtx)
-                        glColor4ub(*clr)
-                        glVertex3f(vtx[0], vtx[1], 0)
-                    glEnd()
+                    if len(loop) < 2:
+                        continue
+                    # segments between each point and the next one
+                    pts = numpy.repeat(numpy.array(loop, 'float64'), 2, 0)
+                    add(GL_LINES, pts[1:-1], stroke, transform)
+
+        if not vertices:
+            return numpy.zeros((0, 2), 'float32'), \
+                   numpy.zeros((0, 4), 'uint8'), []
+        return numpy.concatenate(vertices), numpy.concatenate(colors), ranges
+
     def parse_float(self, txt):
         if txt.endswith('px'):
             return float(txt[:-2])
@@ -861,25 +1005,30 @@ class SVG(object):
         gluTessCallback(self._tess, GLU_TESS_ERROR, errorCallback)
         gluTessCallback(self._tess, GLU_TESS_COMBINE, combineCallback)
 
+        # a coordinate nearly the same as an other coordinate is the "COMBINE"
+        # case of GLU tesslation. But on some PyOpenGL versions, we got the
+        # "need combine callback" error, and we're unable to get ride of it
+        # until the wrong vertex is removed. The vertices are stored in a
+        # spatial hash: a near vertex is in the same cell or a neighbour one.
+        def is_near(cells, x, y, cx, cy):
+            for ix in (cx - 1, cx, cx + 1):
+                for iy in (cy - 1, cy, cy + 1):
+                    for x2, y2 in cells.get((ix, iy), ()):
+                        if (x - x2) ** 2 + (y - y2) ** 2 < MERGE_DISTANCE ** 2:
+                            return True
+            return False
+
         data_lists = []
         for vlist in looplist:
             d_list = []
+            cells = {}
             for x, y in vlist:
-                v_data = (x, y, 0)
-                found = False
-                for x2, y2, z2 in d_list:
-                    d = math.sqrt((x - x2) ** 2 + (y - y2) ** 2)
-                    if d < 0.0000001:
-                        # XXX we've found a coordinate nearly the same as an other
-                        # coordinate. this is the "COMBINE" case of GLU tesslation
-                        # But on my PyOpenGL version, i got the "need combine
-                        # callback" error, and i'm unable to get ride of it until
-                        # the wrong vertex is removed.
-                        found = True
-                        break
-                if found:
+                cx = int(math.floor(x / MERGE_DISTANCE))
+                cy = int(math.floor(y / MERGE_DISTANCE))
+                if is_near(cells, x, y, cx, cy):
                     continue
-                d_list.append(v_data)
+                cells.setdefault((cx, cy), []).append((x, y))
+                d_list.append((x, y, 0))
             data_lists.append(d_list)
         gluTessBeginPolygon(self._tess, None)
         for d_list in data_lists:
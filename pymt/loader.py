@@ -24,17 +24,35 @@ from pymt import pymt_data_dir
 from pymt.logger import pymt_logger
 from pymt.clock import getClock
 from pymt.cache import Cache
-from pymt.utils import SafeList
-from pymt.core.image import ImageLoader, Image
+from pymt.config import pymt_config
+from pymt.core.image import ImageLoader, ImageLoaderData, Image
 from pymt.event import EventDispatcher
 from abc import ABCMeta, abstractmethod
+from heapq import heappush, heappop
 
-import time
 import collections
 import os
+import weakref
+try:
+    import threading
+except ImportError:
+    import dummy_threading as threading
+
+def _image_size(image):
+    # size of the texture in bytes, for the cache statistics
+    if not image:
+        return 0
+    return image.width * image.height * 4
+
+def _cpu_count():
+    try:
+        import multiprocessing
+        return multiprocessing.cpu_count()
+    except (ImportError, NotImplementedError):
+        return 2
 
 # Register a cache for loader
-Cache.register('pymt.loader', limit=500, timeout=60)
+Cache.register('pymt.loader', limit=500, timeout=60, sizeof=_image_size)
 
 class ProxyImage(Image, EventDispatcher):
     '''Image returned by the Loader.image() function.
@@ -57,12 +75,41 @@ class ProxyImage(Image, EventDispatcher):
         pass
 
 
+class _LoaderRequest(object):
+    '''(internal) A file waiting to be loaded'''
+
+    __slots__ = ('key', 'filename', 'load_callback', 'post_callback',
+                 'priority', 'max_size', 'loading', 'cancelled')
+
+    def __init__(self, key, filename, load_callback, post_callback, priority,
+                 max_size):
+        self.key = key
+        self.filename = filename
+        self.max_size = max_size
+        self.load_callback = load_callback
+        self.post_callback = post_callback
+        self.priority = priority
+        self.loading = False
+        self.cancelled = False
+
+
 class LoaderBase(object):
     '''Common base for Loader and specific implementation.
     By default, Loader will be the best available loader implementation.
 
     The _update() function is called every 1 / 25.s or each frame if we have
-    less than 25 FPS.
+    less than 25 FPS. At most `max_upload_per_frame` images are given to their
+    clients on each call, to not stall a frame with lot of texture uploads.
+
+    Requests are loaded by priority (see :func:`image`). A request is cancelled
+    when all his ProxyImage have been garbage collected before the loading.
+
+    :Configuration tokens:
+        `loader_num_workers` : int, default to 0
+            Number of threads used to load images. 0 mean one thread per core.
+        `loader_max_upload_per_frame` : int, default to 5
+            Maximum number of loaded images passed to the clients on each
+            update. 0 mean no limit.
     '''
 
     __metaclass__ = ABCMeta
@@ -74,9 +121,25 @@ class LoaderBase(object):
         self.loading_image = ImageLoader.load(loading_png_fn)
         self.error_image = ImageLoader.load(error_png_fn)
 
-        self._q_load  = collections.deque()
+        self.num_workers = 0
+        self.max_upload_per_frame = 5
+        if pymt_config is not None:
+            self.num_workers = pymt_config.getint('pymt', 'loader_num_workers')
+            self.max_upload_per_frame = pymt_config.getint('pymt',
+                'loader_max_upload_per_frame')
+        if self.num_workers <= 0:
+            self.num_workers = _cpu_count()
+
+        # heap of (-priority, -sequence, request)
+        self._q_load  = []
         self._q_done  = collections.deque()
-        self._client  = SafeList()
+        self._sequence = 0
+        # key -> request, for files queued or being loaded
+        self._requests = {}
+        # key -> weak references to the waiting ProxyImage
+        self._clients = {}
+        # protect the queue, requests and clients. workers wait on it.
+        self._condition = threading.Condition()
         self._running = False
         self._start_wanted = False
 
@@ -84,7 +147,7 @@ class LoaderBase(object):
 
     def __del__(self):
         try:
-            getClock().unschedule_intervale(self._update)
+            getClock().unschedule(self._update)
         except:
             pass
 
@@ -103,55 +166,122 @@ class LoaderBase(object):
         '''Stop the loader thread/process'''
         self._running = False
 
-    def _load(self, parameters):
+    def _push_request(self, request):
+        '''(internal) Add a request in the loading queue. Must be called with
+        the condition acquired.'''
+        self._sequence += 1
+        # same priority : the most recent request is loaded first
+        heappush(self._q_load, (-request.priority, -self._sequence, request))
+        self._condition.notify()
+
+    def _pop_request(self):
+        '''(internal) Return the next request to load, or None if the queue
+        is empty. Must be called with the condition acquired.'''
+        while self._q_load:
+            priority, sequence, request = heappop(self._q_load)
+            # skip cancelled requests, and old entries of requests that have
+            # been pushed again with an higher priority
+            if request.cancelled or request.loading or \
+               -priority != request.priority:
+                continue
+            request.loading = True
+            return request
+        return None
+
+    def _release_client(self, key, ref):
+        '''(internal) Called when a ProxyImage is garbage collected'''
+        self._condition.acquire()
+        try:
+            clients = self._clients.get(key)
+            if clients is None or ref not in clients:
+                return
+            clients.remove(ref)
+            if clients:
+                return
+            del self._clients[key]
+            # nobody is waiting for this file anymore
+            request = self._requests.get(key)
+            if request is not None and not request.loading:
+                request.cancelled = True
+                del self._requests[key]
+        finally:
+            self._condition.release()
+
+    def _load(self, request):
         '''(internal) Loading function, called by the thread.
         Will call _load_local() if the file is local,
         or _load_urllib() if the file is on Internet'''
 
-        filename, load_callback, post_callback = parameters
-        proto = filename.split(':', 1)[0]
-        if load_callback is not None:
-            data = load_callback(filename)
-        elif proto in ('http', 'https', 'ftp'):
-            data = self._load_urllib(filename)
-        else:
-            data = self._load_local(filename)
-
-        if post_callback:
-            data = post_callback(data)
+        filename = request.filename
+        try:
+            proto = filename.split(':', 1)[0]
+            if request.load_callback is not None:
+                data = request.load_callback(filename)
+            elif proto in ('http', 'https', 'ftp'):
+                data = self._load_urllib(filename, request.max_size)
+            else:
+                data = self._load_local(filename, request.max_size)
+
+            if request.post_callback:
+                data = request.post_callback(data)
+        except:
+            pymt_logger.exception('Loader: Failed to load <%s>' % filename)
+            data = self.error_image
 
-        self._q_done.append((filename, data))
+        self._q_done.append((request.key, data))
 
-    def _load_local(self, filename):
+    def _load_local(self, filename, max_size=None, disk_cache=True):
         '''(internal) Loading a local file'''
-        return ImageLoader.load(filename)
+        return ImageLoader.load(filename, max_size=max_size,
+                                disk_cache=disk_cache)
 
-    def _load_urllib(self, filename):
+    def _load_urllib(self, filename, max_size=None):
         '''(internal) Loading a network file. First download it, save it to a
-        temporary file, and pass it to _load_local()'''
+        temporary file, and pass it to _load_local(). The decoded image is
+        kept in the disk cache, and downloaded again only if his ETag have
+        changed.'''
         import urllib2, tempfile
+        cache = ImageLoader.disk_cache
+        key = entry = None
+        if cache is not None:
+            key = cache.key_for_url(filename, max_size)
+            entry = cache.get(key)
+
         data = None
+        _out_filename = None
         try:
-            suffix = '.%s'  % (filename.split('.')[-1])
-            _out_osfd, _out_filename = tempfile.mkstemp(
-                    prefix='pymtloader', suffix=suffix)
-
             # read from internet
-            fd = urllib2.urlopen(filename)
+            request = urllib2.Request(filename)
+            if entry is not None and entry[1]:
+                request.add_header('If-None-Match', entry[1])
+            try:
+                fd = urllib2.urlopen(request)
+            except urllib2.URLError:
+                # not modified (304), or not reachable : use the cache
+                if entry is not None:
+                    return ImageLoaderData(filename, entry[0])
+                raise
             idata = fd.read()
+            etag = fd.info().get('ETag')
             fd.close()
 
             # write to local filename
+            suffix = '.%s'  % (filename.split('.')[-1])
+            _out_osfd, _out_filename = tempfile.mkstemp(
+                    prefix='pymtloader', suffix=suffix)
             os.write(_out_osfd, idata)
             os.close(_out_osfd)
 
             # load data
-            data = self._load_local(_out_filename)
+            data = self._load_local(_out_filename, max_size, False)
+            if key is not None:
+                cache.set(key, data._data, etag)
         except:
             pymt_logger.exception('Failed to load image <%s>' % filename)
             return self.error_image
         finally:
-            os.unlink(_out_filename)
+            if _out_filename is not None:
+                os.unlink(_out_filename)
 
         return data
 
@@ -163,27 +293,40 @@ class LoaderBase(object):
                 self.start()
             self._start_wanted = False
 
-        while True:
+        # limit the number of textures created in one frame
+        limit = self.max_upload_per_frame
+        count = 0
+        while limit <= 0 or count < limit:
             try:
-                filename, data = self._q_done.pop()
-            except:
+                key, data = self._q_done.popleft()
+            except IndexError:
                 return
 
             # create the image
             image = data#ProxyImage(data)
-            Cache.append('pymt.loader', filename, image)
+            Cache.append('pymt.loader', key, image)
+
+            self._condition.acquire()
+            try:
+                self._requests.pop(key, None)
+                refs = self._clients.pop(key, ())
+            finally:
+                self._condition.release()
 
             # update client
-            for c_filename, client in self._client[:]:
-                if filename != c_filename:
+            for ref in refs:
+                client = ref()
+                if client is None:
                     continue
                 # got one client to update
                 client.image = image
                 client.loaded = True
                 client.dispatch_event('on_load')
-                self._client.remove((c_filename, client))
 
-    def image(self, filename, load_callback=None, post_callback=None):
+            count += 1
+
+    def image(self, filename, load_callback=None, post_callback=None,
+              priority=0, max_size=None):
         '''Load a image using loader. A Proxy image is returned
         with a loading image ::
 
@@ -194,8 +337,18 @@ class LoaderBase(object):
             # the loader will change the img.image property
             # to the new loaded image
 
+        Images with an higher `priority` are loaded first (for example, use an
+        higher priority for the visible thumbnails). If the image is already
+        waiting with a lower priority, his priority is raised.
+
+        If `max_size` is set, the image is reduced to fit in
+        max_size x max_size (useful for thumbnails). Decoded images are kept
+        in the disk cache (see :class:`~pymt.core.image.ImageDiskCache`).
         '''
-        data = Cache.get('pymt.loader', filename)
+        key = filename
+        if max_size is not None:
+            key = (filename, max_size)
+        data = Cache.get('pymt.loader', key)
         if data not in (None, False):
             # found image
             return ProxyImage(data,
@@ -204,16 +357,30 @@ class LoaderBase(object):
 
         client = ProxyImage(self.loading_image,
                     loading_image=self.loading_image)
-        self._client.append((filename, client))
-
-        if data is None:
-            # if data is None, this is really the first time
-            self._q_load.append((filename, load_callback, post_callback))
-            Cache.append('pymt.loader', filename, False)
-            self._start_wanted = True
-        else:
-            # already queued for loading
-            pass
+        release = lambda ref: self._release_client(key, ref)
+        ref = weakref.ref(client, release)
+
+        self._condition.acquire()
+        try:
+            if key in self._clients:
+                self._clients[key].append(ref)
+            else:
+                self._clients[key] = [ref]
+
+            request = self._requests.get(key)
+            if request is None:
+                # this is really the first time
+                request = _LoaderRequest(key, filename, load_callback,
+                                         post_callback, priority, max_size)
+                self._requests[key] = request
+                self._push_request(request)
+            elif priority > request.priority and not request.loading:
+                # already queued for loading, with a lower priority
+                request.priority = priority
+                self._push_request(request)
+        finally:
+            self._condition.release()
+        self._start_wanted = True
 
         return client
 
@@ -228,35 +395,57 @@ if 'PYMT_DOC' in os.environ:
 else:
 
     #
-    # Try to use pygame as our first choice for loader
+    # Use a pool of threads as our first choice for loader
     #
 
     try:
-        import pygame
+        # check that python have thread support
+        import thread
+
+        class LoaderThreadPool(LoaderBase):
+            '''Loader implementation using a pool of threads'''
+            def __init__(self):
+                super(LoaderThreadPool, self).__init__()
+                self.workers = []
 
-        class LoaderPygame(LoaderBase):
             def start(self):
-                super(LoaderPygame, self).start()
-                self.worker = pygame.threads.WorkerQueue()
-                self.worker.do(self.run)
+                super(LoaderThreadPool, self).start()
+                for x in xrange(self.num_workers):
+                    worker = threading.Thread(target=self.run,
+                                              name='LoaderWorker-%d' % x)
+                    worker.daemon = True
+                    worker.start()
+                    self.workers.append(worker)
 
             def stop(self):
-                super(LoaderPygame, self).stop()
-                self.worker.stop()
+                super(LoaderThreadPool, self).stop()
+                self._condition.acquire()
+                try:
+                    self._condition.notify_all()
+                finally:
+                    self._condition.release()
+                self.workers = []
 
             def run(self, *largs):
-                while self._running:
+                while True:
+                    self._condition.acquire()
                     try:
-                        parameters = self._q_load.pop()
-                    except:
-                        time.sleep(0.1)
-                        continue
-                    self.worker.do(self._load, parameters)
-
-        Loader = LoaderPygame()
-        pymt_logger.info('Loader: using <pygame> as thread loader')
-
-    except:
+                        # wait for a new request
+                        request = self._pop_request()
+                        while request is None and self._running:
+                            self._condition.wait()
+                            request = self._pop_request()
+                        if not self._running:
+                            return
+                    finally:
+                        self._condition.release()
+                    self._load(request)
+
+        Loader = LoaderThreadPool()
+        pymt_logger.info('Loader: using a pool of %d threads as loader' %
+                         Loader.num_workers)
+
+    except ImportError:
 
         #
         # Default to the clock loader
@@ -270,15 +459,17 @@ else:
 
             def stop(self):
                 super(LoaderClock, self).stop()
-                getClock().unschedule_interval(self.run)
+                getClock().unschedule(self.run)
 
             def run(self, *largs):
+                self._condition.acquire()
                 try:
-                    parameters = self._q_load.pop()
-                except:
+                    request = self._pop_request()
+                finally:
+                    self._condition.release()
+                if request is None:
                     return
-                self._load(parameters)
+                self._load(request)
 
         Loader = LoaderClock()
         pymt_logger.info('Loader: using <clock> as thread loader')
-
@@ -81,17 +81,19 @@ class Modules:
             pymt.pymt_logger.debug('Modules: Start <%s> with config %s' % (id, str(config)))
             self.mods[id]['context'].config = config
             module.start(win, self.mods[id]['context'])
+            self.mods[id]['activated'] = True
 
     def deactivate_module(self, id, win):
         '''Deactivate a module from a window'''
         if not id in self.mods:
             pymt.pymt_logger.warning('Modules: Module <%s> not found' % id)
             return
-        if not hasattr(self.mods[id], 'module'):
+        if not 'module' in self.mods[id]:
             return
         module = self.mods[id]['module']
         if self.mods[id]['activated']:
             module.stop(win, self.mods[id]['context'])
+            self.mods[id]['activated'] = False
 
     def register_window(self, win):
         '''Add window in window list'''
@@ -99,7 +101,9 @@ class Modules:
         self.update()
 
     def unregister_window(self, win):
-        '''Remove window from window list'''
+        '''Remove window from window list, and stop his modules'''
+        for id in self.mods:
+            self.deactivate_module(id, win)
         self.wins.remove(win)
         self.update()
 
@@ -1,49 +1,253 @@
 '''
-Create/fill an heatmap in database
+Heatmap: record the touches of an application in a database
+
+The touches are recorded in a sqlite database, heatmap-<appname>.db by
+default. The records are written by a thread, in one transaction every
+`interval` milliseconds : the application never wait for the disk. If the
+thread is late, the records are dropped instead of blocking the application.
+The records waiting are written when the application exit.
+
+:Configuration:
+    `filename` : str, default to heatmap-<appname>.db
+        Database where the touches are recorded
+    `events` : str, default to 'down'
+        Events recorded, separated by a ':' (like down:move:up)
+    `interval` : int, default to 500
+        Time between 2 writes in the database, in milliseconds
+    `queue_size` : int, default to 10000
+        Maximum number of records waiting to be written
+
+Example ::
+
+    python myapp.py -m heatmap:events=down:move:up
+
+The density of the touches can be computed in the database, without reading
+all the records ::
+
+    from pymt.modules.heatmap import get_density
+    grid = get_density('heatmap-myapp.db', bins=(64, 48))
 '''
 
-from pymt import MTWidget, pymt_logger
-import sys
+__all__ = ('HeatMap', 'HeatMapWriter', 'get_density')
+
 import os
+import sys
+import time
+import atexit
+import Queue
 import sqlite3
+import threading
+import numpy
+from pymt import MTWidget, pymt_logger, getClock
+
+_insert = 'INSERT INTO heatmap (x, y, time, event, id) VALUES (?, ?, ?, ?, ?)'
+
+def _init_database(db):
+    '''(internal) Create the heatmap table, or add the columns of the event
+    and the touch id in an old database'''
+    columns = [x[1] for x in db.execute('PRAGMA table_info(heatmap)')]
+    if not columns:
+        db.execute('''
+            CREATE TABLE heatmap (
+                x NUMERIC,
+                y NUMERIC,
+                time NUMERIC,
+                event TEXT DEFAULT 'down',
+                id INTEGER
+            )
+        ''')
+        return True
+    # the old databases have only the touch down
+    if 'event' not in columns:
+        db.execute("ALTER TABLE heatmap ADD COLUMN event TEXT DEFAULT 'down'")
+    if 'id' not in columns:
+        db.execute('ALTER TABLE heatmap ADD COLUMN id INTEGER')
+    return False
+
+
+class HeatMapWriter(object):
+    '''Write the records of the touches in a database, from a thread.
+
+    :Parameters:
+        `filename` : str
+            Filename of the database
+        `interval` : float, default to 0.5
+            Time between 2 writes, in seconds. The records are inserted in
+            one transaction.
+        `queue_size` : int, default to 10000
+            Maximum number of records waiting. When the queue is full, the
+            new records are dropped.
+
+    The writer is stopped when the application exit, if :meth:`stop` was not
+    called before.
+    '''
+
+    def __init__(self, filename, interval=.5, queue_size=10000):
+        self.filename = filename
+        self.interval = interval
+        #: Number of records dropped because the queue was full
+        self.dropped = 0
+        self._queue = Queue.Queue(queue_size)
+        self._thread = threading.Thread(target=self.run)
+        self._thread.daemon = True
+        self._thread.start()
+        # the thread is a daemon: write the last records before the exit
+        atexit.register(self.stop)
+
+    def push(self, event, touch):
+        '''Record an event of a touch. Never block.'''
+        if event == 'down':
+            t = touch.time_start
+        else:
+            t = getClock().get_time()
+        try:
+            self._queue.put_nowait((touch.sx, touch.sy, t, event, touch.id))
+        except Queue.Full:
+            if not self.dropped:
+                pymt_logger.warning('Heatmap: the writer is late, '
+                                    'dropping records')
+            self.dropped += 1
+
+    def stop(self):
+        '''Write the records waiting, and stop the thread'''
+        if not self._thread.is_alive():
+            return
+        # the queue may be full, the stop marker must not be dropped
+        self._queue.put(None)
+        self._thread.join()
+
+    def run(self):
+        # the connection must be used in the thread that created it
+        db = sqlite3.connect(self.filename)
+        try:
+            # readers of the database don't block the writer
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            if _init_database(db):
+                pymt_logger.info('Heatmap: Create new database for heatmap '
+                                 'in %s' % self.filename)
+            else:
+                pymt_logger.info('Heatmap: Fill heatmap database in %s' %
+                                 self.filename)
+            db.commit()
+
+            queue = self._queue
+            records = []
+            running = True
+            next_write = time.time() + self.interval
+            while running:
+                try:
+                    record = queue.get(True, max(0, next_write - time.time()))
+                    if record is None:
+                        running = False
+                    else:
+                        records.append(record)
+                except Queue.Empty:
+                    pass
+                if running and time.time() < next_write:
+                    continue
+                if records:
+                    # one transaction for all the records
+                    with db:
+                        db.executemany(_insert, records)
+                    records = []
+                next_write = time.time() + self.interval
+        finally:
+            db.close()
+
+
+def get_density(filename, bins=(64, 64), events=('down', )):
+    '''Return the density of the touches recorded in a database, as a numpy
+    array of shape (bins[1], bins[0]) : the number of touches in each cell,
+    the first row is the bottom of the screen. The counting is done in the
+    database.
+
+    :Parameters:
+        `filename` : str
+            Filename of the database
+        `bins` : tuple, default to (64, 64)
+            Number of columns and rows of the grid
+        `events` : list, default to ('down', )
+            Events to count
+    '''
+    cols, rows = bins
+    grid = numpy.zeros((rows, cols), dtype=numpy.int64)
+    db = sqlite3.connect(filename)
+    try:
+        # the positions are normalized: the cell is the integer part of the
+        # position * bins, clamped in the grid.
+        cursor = db.execute('''
+            SELECT MAX(0, MIN(?, CAST(x * ? AS INTEGER))) AS col,
+                   MAX(0, MIN(?, CAST(y * ? AS INTEGER))) AS row,
+                   COUNT(*)
+            FROM heatmap
+            WHERE event IN (%s)
+            GROUP BY col, row
+        ''' % ', '.join('?' * len(events)),
+            [cols - 1, cols, rows - 1, rows] + list(events))
+        result = numpy.array(cursor.fetchall(), dtype=numpy.int64)
+    finally:
+        db.close()
+    if len(result):
+        grid[result[:, 1], result[:, 0]] = result[:, 2]
+    return grid
+
 
 class HeatMap(MTWidget):
+    '''Widget recording the touches with a :class:`HeatMapWriter`. It takes
+    the parameters of the writer, plus:
+
+    :Parameters:
+        `events` : list, default to ('down', )
+            Events recorded: down, move or up
+    '''
     def __init__(self, **kwargs):
+        kwargs.setdefault('events', ('down', ))
+        kwargs.setdefault('interval', .5)
+        kwargs.setdefault('queue_size', 10000)
+        kwargs.setdefault('filename', None)
         super(HeatMap, self).__init__(**kwargs)
-        self.appname = sys.argv[0]
-        if self.appname == '':
-            self.appname = 'python'
-        elif self.appname[-3:] == '.py':
-            self.appname = self.appname[:-3]
-        self.filename = 'heatmap-%s.db' % self.appname
-        self.db = sqlite3.connect(self.filename)
-        try:
-            self.db.execute('''
-                CREATE TABLE heatmap (
-                    x NUMERIC,
-                    y NUMERIC,
-                    time NUMERIC
-                )
-            ''')
-            self.db.commit()
-            pymt_logger.info('Heatmap: Create new database for heatmap in %s' % self.filename)
-        except sqlite3.OperationalError:
-            pymt_logger.info('Heatmap: Fill heatmap database in %s' % self.filename)
+        self.events = kwargs.get('events')
+        self.filename = kwargs.get('filename')
+        if not self.filename:
+            self.appname = os.path.basename(sys.argv[0])
+            if self.appname == '':
+                self.appname = 'python'
+            elif self.appname[-3:] == '.py':
+                self.appname = self.appname[:-3]
+            self.filename = 'heatmap-%s.db' % self.appname
+        self.writer = HeatMapWriter(self.filename,
+                                    interval=kwargs.get('interval'),
+                                    queue_size=kwargs.get('queue_size'))
 
     def on_touch_down(self, touch):
-        self.db.execute('''
-            INSERT INTO heatmap
-            VALUES (%f, %f, %f)
-        ''' % (touch.sx, touch.sy, touch.time_start))
-        self.db.commit()
+        if 'down' in self.events:
+            self.writer.push('down', touch)
+
+    def on_touch_move(self, touch):
+        if 'move' in self.events:
+            self.writer.push('move', touch)
+
+    def on_touch_up(self, touch):
+        if 'up' in self.events:
+            self.writer.push('up', touch)
 
     def on_update(self):
         self.bring_to_front()
 
 
 def start(win, ctx):
-    ctx.w = HeatMap()
+    ctx.config.setdefault('filename', '')
+    ctx.config.setdefault('events', 'down')
+    ctx.config.setdefault('interval', '500')
+    ctx.config.setdefault('queue_size', '10000')
+    ctx.w = HeatMap(
+        filename=ctx.config.get('filename'),
+        events=ctx.config.get('events').split(':'),
+        interval=float(ctx.config.get('interval')) / 1000.,
+        queue_size=int(ctx.config.get('queue_size')))
     win.add_widget(ctx.w)
 
 def stop(win, ctx):
     win.remove_widget(ctx.w)
+    ctx.w.writer.stop()
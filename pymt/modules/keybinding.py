@@ -121,21 +121,19 @@ def _on_draw():
         y = 0
         for x in Cache._categories:
             y += 25
-            cat = Cache._categories[x]
-            count = 0
+            stats = Cache.get_stats(x)
+            count = stats['count']
             usage = '-'
-            limit = cat['limit']
-            timeout = cat['timeout']
-            try:
-                count = len(Cache._objects[x])
-            except:
-                pass
+            limit = stats['limit']
+            timeout = stats['timeout']
             try:
                 usage = 100 * count / limit
             except:
                 pass
-            args = (x, usage, count, limit, timeout)
-            drawLabel('%s: usage=%s%% count=%d limit=%s timeout=%s' % args,
+            args = (x, usage, count, limit, timeout, stats['hits'],
+                    stats['misses'], stats['evictions'])
+            drawLabel('%s: usage=%s%% count=%d limit=%s timeout=%s '
+                      'hits=%d misses=%d evictions=%d' % args,
                       pos=(20, 20 + y), font_size=20, center=False, nocache=True)
 
         return True
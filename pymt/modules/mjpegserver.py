@@ -7,75 +7,196 @@ Stream the PyMT video inside MJPEG HTTP server
     `port` : int, default to 8000
         TCP Port to listen
     `fps` : int, default to 20
-        Fix a FPS to try to have the same FPS on the whole video
+        Maximum FPS sent to a client
     `size` : str, default to ''
         If the image must be resized, set size to "320x240" for example
-
+    `quality` : int, default to 75
+        Quality of the JPEG images
+    `workers` : int, default to 2
+        Number of threads encoding the images
+
+Any number of clients can watch the stream. A client can ask another fps,
+size or quality in the url, like http://localhost:8000/?fps=5&size=160x120.
+
+The window is captured only when a client is waiting for a new frame, and
+the application never wait for the clients : each frame is encoded once
+for each size and quality asked, by a pool of threads, and sent to all the
+clients who want it. A slow client skip the frames that have been captured
+while he was receiving the previous one.
 '''
-#
-# Developper note
-#
-# Double lock is needed if we don't want the sensation about laggy video
-# The deal is, if we don't lock the screen, you got more FPS on OpenGL than
-# streaming (and that would be good.) Except that since it's not synced,
-# video look laggy.
-# Double-lock was just the faster solution to do right now :)
-#
+
+__all__ = ('MjpegStream', 'MjpegServerThread', 'encode_jpeg')
 
 import os
 import pymt
 import threading
 import time
-import StringIO
 import random
+import socket
+import urlparse
+import Queue
+from StringIO import StringIO
+from SocketServer import ThreadingMixIn
 from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
 from OpenGL.GL import glReadBuffer, glReadPixels, GL_RGB, GL_UNSIGNED_BYTE, GL_FRONT
-from pymt.utils import curry
-
-if 'PYMT_DOC' not in os.environ:
-	from PIL import Image
 
-lock_current    = threading.Lock()
-sem_current     = threading.Semaphore(0)
-sem_next        = threading.Semaphore(1)
-img_current     = None
-connected       = False
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+def encode_jpeg(data, width, height, size=None, quality=75):
+    '''Encode RGB pixels read from OpenGL (bottom to top) in JPEG'''
+    if Image is None:
+        raise Exception('MjpegServer: PIL is needed to encode the images')
+    frombytes = getattr(Image, 'frombytes', None) or Image.fromstring
+    im = frombytes('RGB', (width, height), data)
+    if size:
+        im = im.resize(size)
+    im = im.transpose(Image.FLIP_TOP_BOTTOM)
+    buf = StringIO()
+    im.save(buf, format='JPEG', quality=quality)
+    return buf.getvalue()
+
+
+class _EncodeJob(object):
+    '''(internal) Encoding of a frame for a size and a quality'''
+    __slots__ = ('frame', 'size', 'quality', 'event', 'jpeg')
+
+    def __init__(self, frame, size, quality):
+        self.frame = frame
+        self.size = size
+        self.quality = quality
+        self.event = threading.Event()
+        self.jpeg = None
+
+
+class MjpegStream(object):
+    '''Share the last frame of the window between the clients. The frames
+    are encoded by a pool of threads, once for each (size, quality).
+
+    :Parameters:
+        `workers` : int, default to 2
+            Number of threads encoding the frames
+    '''
+
+    def __init__(self, workers=2):
+        self.running = True
+        #: Number of clients waiting for a new frame
+        self.waiting = 0
+        # (sequence, width, height, data) of the last frame
+        self.frame = None
+        self._seq = 0
+        # (size, quality) -> _EncodeJob of the last frame
+        self._jobs = {}
+        self._condition = threading.Condition()
+        self._queue = Queue.Queue()
+        self._workers = []
+        for x in xrange(max(1, workers)):
+            worker = threading.Thread(target=self._run_worker)
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def publish(self, data, width, height):
+        '''Replace the last frame. Never block.'''
+        with self._condition:
+            self._seq += 1
+            self.frame = (self._seq, width, height, data)
+            self._jobs = {}
+            self._condition.notify_all()
+
+    def on_flip(self, *largs):
+        '''Capture the window, if a client is waiting for a frame'''
+        if not self.waiting:
+            return
+        win = pymt.getWindow()
+        glReadBuffer(GL_FRONT)
+        data = glReadPixels(0, 0, win.width, win.height, GL_RGB, GL_UNSIGNED_BYTE)
+        self.publish(str(buffer(data)), win.width, win.height)
+
+    def get_jpeg(self, last_seq, size=None, quality=75, timeout=1.):
+        '''Wait a frame newer than `last_seq`, and return a tuple (sequence,
+        jpeg). Return None if no frame have been captured before the
+        timeout.'''
+        deadline = time.time() + timeout
+        with self._condition:
+            self.waiting += 1
+            try:
+                while self.running and \
+                      (self.frame is None or self.frame[0] <= last_seq):
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return None
+                    self._condition.wait(remaining)
+            finally:
+                self.waiting -= 1
+            if not self.running:
+                return None
+            frame = self.frame
+            key = (size, quality)
+            job = self._jobs.get(key)
+            if job is None:
+                job = self._jobs[key] = _EncodeJob(frame, size, quality)
+                self._queue.put(job)
+        job.event.wait()
+        if job.jpeg is None:
+            return None
+        return frame[0], job.jpeg
+
+    def stop(self):
+        '''Stop the workers, and release the clients'''
+        with self._condition:
+            self.running = False
+            self._condition.notify_all()
+        for worker in self._workers:
+            self._queue.put(None)
+
+    def _run_worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            try:
+                seq, width, height, data = job.frame
+                job.jpeg = encode_jpeg(data, width, height,
+                                       job.size, job.quality)
+            except Exception:
+                pymt.pymt_logger.exception('MjpegServer: unable to encode '
+                                           'a frame')
+            finally:
+                job.event.set()
 
-def keep_running():
-    return True
 
 class MjpegHttpRequestHandler(BaseHTTPRequestHandler):
     def do_GET(self):
-        global connected, sem_next
         try:
-            connected = True
             self._stream_video()
-        finally:
-            connected = False
-            # to prevent that app hang
-            sem_next.release()
-            pymt.pymt_logger.info(
-                'MjpegServer: Client %s:%d disconnect' % self.client_address)
+        except socket.error:
+            pass
+        pymt.pymt_logger.info(
+            'MjpegServer: Client %s:%d disconnect' % self.client_address)
+
+    def _get_options(self):
+        # options of the client, or of the configuration
+        config = dict(self.server.config)
+        query = urlparse.parse_qs(urlparse.urlparse(self.path).query)
+        for key in ('fps', 'size', 'quality'):
+            if key in query:
+                config[key] = query[key][-1]
+
+        fps = config.get('fps')
+        fps = float(fps) if fps else 0
+        size = config.get('size')
+        size = tuple(map(int, size.split('x'))) if size else None
+        quality = config.get('quality')
+        quality = int(quality) if quality else 75
+        return fps, size, quality
 
     def _stream_video(self):
-        global img_current
-
-        lfps        = []
-        dt          = 0
-        frames      = 0
-        fps_wanted  = self.server.config.get('fps')
-        if fps_wanted == '':
-            fps_wanted = 0
-        fps_wanted = float(fps_wanted)
-        if fps_wanted <= 1:
-            fps_wanted = 0
-        else:
-            fps_wanted = 1 / fps_wanted
-        size        = self.server.config.get('size')
-        if size == '':
-            size = None
-        else:
-            size = map(int, size.split('x'))
+        stream = self.server.stream
+        fps, size, quality = self._get_options()
+        interval = 1. / fps if fps > 0 else 0
 
         pymt.pymt_logger.info(
             'MjpegServer: Client %s:%d connected' % self.client_address)
@@ -86,43 +207,31 @@ class MjpegHttpRequestHandler(BaseHTTPRequestHandler):
         self.send_header('Content-type', 'multipart/x-mixed-replace; boundary=%s' % self.boundary)
         self.end_headers()
 
-        # don't accept connection until the window is created
-        # XXX really needed ?
-        while not pymt.getWindow():
-            time.sleep(0.1)
-        win = pymt.getWindow()
-
-        dt = dt_current = dt_old = time.time()
-        while keep_running():
-
-            # SYNC START
-            sem_current.acquire()
-
-            with lock_current:
-                im = Image.fromstring('RGB', win.size, img_current)
-                img_current = None
-
-            sem_next.release()
-            # SYNC END
-
-            buf = StringIO.StringIO()
-            if size:
-                im = im.resize(size)
-            im = im.transpose(Image.FLIP_TOP_BOTTOM)
-            im.save(buf, format='JPEG')
-            jpeg = buf.getvalue()
+        seq = 0
+        lfps        = []
+        frames      = 0
+        dt = dt_next = time.time()
+        while stream.running:
+            # fps cap of this client
+            delay = dt_next - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+            # the last frame, whatever the frames we missed
+            result = stream.get_jpeg(seq, size, quality)
+            if result is None:
+                continue
+            seq, jpeg = result
 
             self.wfile.write('--%s\r\n' % self.boundary)
             self.wfile.write('Content-Type: image/jpeg\r\n')
             self.wfile.write('Content-Length: %d\r\n\r\n' % len(jpeg))
             self.wfile.write(jpeg)
+            self.wfile.write('\r\n')
+            self.wfile.flush()
 
-            dt_old = dt_current
             dt_current = time.time()
-
-            d = dt_current - dt_old
-            if d < fps_wanted:
-                time.sleep(d)
+            dt_next = max(dt_next + interval, dt_current)
 
             frames += 1
             if dt_current - dt > 2.:
@@ -133,47 +242,58 @@ class MjpegHttpRequestHandler(BaseHTTPRequestHandler):
                 dt = dt_current
                 frames = 0
 
+    def log_message(self, format, *args):
+        pymt.pymt_logger.debug('MjpegServer: ' + format % args)
+
+
+class MjpegHttpServer(ThreadingMixIn, HTTPServer):
+    '''HTTP server with one thread per client'''
+    daemon_threads = True
+    allow_reuse_address = True
+
+
 class MjpegServerThread(threading.Thread):
-    def __init__(self, config):
+    '''Serve a :class:`MjpegStream` to HTTP clients'''
+    def __init__(self, config, stream):
         super(MjpegServerThread, self).__init__()
         self.config = config
-
-    def run(self):
+        self.stream = stream
         server_address = (self.config.get('ip'), int(self.config.get('port')))
-        httpd = HTTPServer(server_address, MjpegHttpRequestHandler)
-        httpd.config = self.config
-        pymt.pymt_logger.info('MjpegServer: Listen to %s:%d' % server_address)
-        while keep_running():
-            httpd.handle_request()
-
-def window_flip_and_save():
-    global img_current
-    win = pymt.getWindow()
-
-    with lock_current:
-        if not connected:
-            return
-
-    sem_next.acquire()
+        self.httpd = MjpegHttpServer(server_address, MjpegHttpRequestHandler)
+        self.httpd.config = self.config
+        self.httpd.stream = stream
 
-    with lock_current:
-        glReadBuffer(GL_FRONT)
-        data = glReadPixels(0, 0, win.width, win.height, GL_RGB, GL_UNSIGNED_BYTE)
-        img_current = str(buffer(data))
+    def run(self):
+        pymt.pymt_logger.info('MjpegServer: Listen to %s:%d' %
+                              self.httpd.server_address)
+        self.httpd.serve_forever()
 
-    sem_current.release()
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
 
 def start(win, ctx):
-    win.push_handlers(on_flip=window_flip_and_save)
-
     ctx.config.setdefault('ip', '')
     ctx.config.setdefault('port', '8000')
-    ctx.config.setdefault('fps', '')
+    ctx.config.setdefault('fps', '20')
     ctx.config.setdefault('size', '')
+    ctx.config.setdefault('quality', '75')
+    ctx.config.setdefault('workers', '2')
+
+    if Image is None:
+        pymt.pymt_logger.error('MjpegServer: PIL is needed to encode the images')
+        return
+
+    ctx.stream = MjpegStream(int(ctx.config.get('workers')))
+    win.push_handlers(on_flip=ctx.stream.on_flip)
 
-    ctx.server = MjpegServerThread(ctx.config)
+    ctx.server = MjpegServerThread(ctx.config, ctx.stream)
     ctx.server.daemon = True
     ctx.server.start()
 
 def stop(win, ctx):
-    win.remove_handlers(on_flip=window_flip_and_save)
+    if not hasattr(ctx, 'stream'):
+        return
+    win.remove_handlers(on_flip=ctx.stream.on_flip)
+    ctx.stream.stop()
+    ctx.server.stop()
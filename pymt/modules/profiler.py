@@ -0,0 +1,77 @@
+'''
+Profiler: measure the frames, and show the slowest widgets at exit
+
+:Configuration:
+    `frames` : int, default to 300
+        Number of frames kept in memory
+    `budget` : float, default to ''
+        Time budget of a frame in milliseconds (like 16). A warning is logged
+        when a frame take more time.
+    `trace` : int, default to 0
+        If 1, every widget event is saved in the Chrome trace
+    `output` : str, default to ''
+        Filename where the frames are saved at exit
+    `format` : str, default to 'chrome'
+        Format of the output: 'chrome' for chrome://tracing, or 'json'
+
+Example ::
+
+    python myapp.py -m profiler:budget=16,output=trace.json
+'''
+
+__all__ = ('start', 'stop')
+
+import atexit
+from pymt.logger import pymt_logger
+from pymt.profiler import FrameProfiler
+
+def _report(ctx):
+    profiler = ctx.profiler
+    stats = profiler.get_frame_stats()
+    if not stats['frames']:
+        return
+    pymt_logger.info('Profiler: %d frames, average %.2fms, max %.2fms' % (
+        stats['frames'], stats['average'] * 1000., stats['max'] * 1000.))
+    for name, duration in stats['phases'].iteritems():
+        pymt_logger.info('Profiler: phase %-8s %.2fms' % (
+            name, duration * 1000.))
+    for stat in profiler.get_stats()[:10]:
+        pymt_logger.info('Profiler: %-30s %.2fms self, %.2fms total, '
+                         '%d calls' % ('%s.%s' % (stat['name'], stat['event']),
+                         stat['self'] * 1000. / stats['frames'],
+                         stat['total'] * 1000. / stats['frames'],
+                         stat['count']))
+
+    output = ctx.config.get('output')
+    if not output:
+        return
+    try:
+        if ctx.config.get('format') == 'json':
+            profiler.export_json(output)
+        else:
+            profiler.export_chrome_trace(output)
+        pymt_logger.info('Profiler: frames saved in %s' % output)
+    except IOError:
+        pymt_logger.exception('Profiler: unable to save %s' % output)
+
+def start(win, ctx):
+    ctx.config.setdefault('frames', '300')
+    ctx.config.setdefault('budget', '')
+    ctx.config.setdefault('trace', '0')
+    ctx.config.setdefault('output', '')
+    ctx.config.setdefault('format', 'chrome')
+
+    budget = None
+    if ctx.config.get('budget'):
+        budget = float(ctx.config.get('budget')) / 1000.
+    ctx.profiler = FrameProfiler(
+        frames=int(ctx.config.get('frames')),
+        trace=ctx.config.get('trace') in (True, '1'),
+        budget=budget)
+    ctx.profiler.start()
+
+    # the modules are not stopped when the application leave
+    atexit.register(_report, ctx)
+
+def stop(win, ctx):
+    ctx.profiler.stop()
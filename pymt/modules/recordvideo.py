@@ -1,30 +1,322 @@
 '''
 Record the opengl output into a video
+
+The window is read after each flip into a ring of reusable buffers, and the
+frames are written by a pool of threads: the application only pay for the
+readback. If the writers are late and no buffer is free, the frame is dropped
+instead of blocking the application. The frames waiting are written, and the
+file or the command closed, when the application exit.
+
+:Configuration:
+    `mode` : str, default to the `mode` token of the `dump` section
+        How the frames are written:
+
+        - image: one file per frame, <prefix><index>.<format>
+        - raw: all the frames in one raw RGB file, <prefix>frames.raw (read
+          it with :func:`read_raw`)
+        - pipe: the raw RGB frames are written to the stdin of `command`
+    `prefix` : str, default to the `prefix` token of the `dump` section
+        Prefix of the files written
+    `format` : str, default to the `format` token of the `dump` section
+        Format of the images, for the image mode (png, jpeg...)
+    `buffers` : int, default to the `buffers` token of the `dump` section
+        Number of frames waiting to be written, before dropping the frames
+    `workers` : int, default to the `workers` token of the `dump` section
+        Number of threads writing the images. The raw and pipe modes are
+        written by one thread, to keep the order of the frames.
+    `command` : str, default to the `command` token of the `dump` section
+        Command of the pipe mode, like an encoder reading the video on his
+        stdin. {width} and {height} are replaced by the size of the frames.
+
+Example of command for the pipe mode, in the configuration ::
+
+    [dump]
+    mode = pipe
+    command = ffmpeg -y -f rawvideo -pix_fmt rgb24 -s {width}x{height} -r 30 -i - video.avi
 '''
 
+__all__ = ('FrameRecorder', 'ImageWriter', 'RawWriter', 'PipeWriter',
+           'encode_png', 'read_raw')
+
 import os
+import time
+import atexit
+import zlib
+import struct
+import Queue
+import threading
+import subprocess
+import numpy
+import pymt
+from OpenGL.GL import glReadBuffer, glReadPixels, GL_RGB, GL_UNSIGNED_BYTE, \
+        GL_FRONT, glPixelStorei, GL_PACK_ALIGNMENT, glPushClientAttrib, \
+        glPopClientAttrib, GL_CLIENT_PIXEL_STORE_BIT
 if 'PYMT_DOC' not in os.environ:
-	import pygame
-	import pymt
-	from OpenGL.GL import glReadBuffer, glReadPixels, GL_RGB, GL_UNSIGNED_BYTE, GL_FRONT
-	from pymt.utils import curry
-
-	dump_prefix    = pymt.pymt_config.get('dump', 'prefix')
-	dump_format    = pymt.pymt_config.get('dump', 'format')
-	dump_idx       = 0
-
-def window_flip_and_save():
-    global dump_idx
-    win = pymt.getWindow()
-    glReadBuffer(GL_FRONT)
-    data = glReadPixels(0, 0, win.width, win.height, GL_RGB, GL_UNSIGNED_BYTE)
-    surface = pygame.image.fromstring(str(buffer(data)), win.size, 'RGB', True)
-    filename = '%s%05d.%s' % (dump_prefix, dump_idx, dump_format)
-    pygame.image.save(surface, filename)
-    dump_idx += 1
+    import pygame
+
+def encode_png(pixels, level=6):
+    '''Encode a frame (numpy array of shape (height, width, 3), from the
+    bottom to the top) in PNG. The compression is done by zlib, which release
+    the GIL: many frames can be encoded in parallel by threads.'''
+    height, width = pixels.shape[:2]
+    # one row is the filter type (0, none) followed by the pixels
+    rows = numpy.zeros((height, width * 3 + 1), dtype=numpy.uint8)
+    rows[:, 1:] = pixels[::-1].reshape(height, width * 3)
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + \
+               struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+    return ''.join((
+        '\x89PNG\r\n\x1a\n',
+        chunk('IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)),
+        chunk('IDAT', zlib.compress(rows.tostring(), level)),
+        chunk('IEND', '')))
+
+
+class ImageWriter(object):
+    '''Write each frame in an image file, <prefix><index>.<format>. The PNG
+    are encoded with :func:`encode_png`, the other formats with pygame.
+
+    :Parameters:
+        `prefix` : str, default to 'img_'
+            Prefix of the filenames
+        `format` : str, default to 'png'
+            Format of the images
+    '''
+    #: The frames can be written in any order
+    ordered = False
+
+    def __init__(self, prefix='img_', format='png'):
+        self.prefix = prefix
+        self.format = format
+
+    def write(self, index, timestamp, pixels):
+        filename = '%s%05d.%s' % (self.prefix, index, self.format)
+        if self.format == 'png':
+            with open(filename, 'wb') as fd:
+                fd.write(encode_png(pixels))
+            return
+        height, width = pixels.shape[:2]
+        surface = pygame.image.fromstring(pixels.tostring(), (width, height),
+                                          'RGB', True)
+        pygame.image.save(surface, filename)
+
+    def close(self):
+        pass
+
+
+_raw_header = struct.Struct('<8sII')
+_raw_frame = struct.Struct('<Id')
+_raw_magic = 'PYMTRAW1'
+
+class RawWriter(object):
+    '''Write all the frames in one file: a header (magic, width, height),
+    then for each frame his index, his timestamp, and the RGB pixels from
+    the top to the bottom. See :func:`read_raw`.
+
+    :Parameters:
+        `filename` : str
+            Filename of the raw file
+        `width` : int
+            Width of the frames
+        `height` : int
+            Height of the frames
+    '''
+    ordered = True
+
+    def __init__(self, filename, width, height):
+        self.fd = open(filename, 'wb')
+        self.fd.write(_raw_header.pack(_raw_magic, width, height))
+
+    def write(self, index, timestamp, pixels):
+        self.fd.write(_raw_frame.pack(index, timestamp))
+        self.fd.write(pixels[::-1].tostring())
+
+    def close(self):
+        self.fd.close()
+
+
+def read_raw(filename):
+    '''Iterate over the frames of a file written by :class:`RawWriter`.
+    Yield a tuple (index, timestamp, pixels), the pixels are a numpy array of
+    shape (height, width, 3), from the top to the bottom.'''
+    with open(filename, 'rb') as fd:
+        magic, width, height = _raw_header.unpack(fd.read(_raw_header.size))
+        if magic != _raw_magic:
+            raise Exception('RecordVideo: %s is not a raw file' % filename)
+        size = width * height * 3
+        while True:
+            header = fd.read(_raw_frame.size)
+            if len(header) < _raw_frame.size:
+                return
+            index, timestamp = _raw_frame.unpack(header)
+            data = fd.read(size)
+            if len(data) < size:
+                return
+            pixels = numpy.frombuffer(data, dtype=numpy.uint8)
+            yield index, timestamp, pixels.reshape(height, width, 3)
+
+
+class PipeWriter(object):
+    '''Write the RGB pixels of the frames, from the top to the bottom, to the
+    stdin of a command.
+
+    :Parameters:
+        `command` : str
+            Shell command, {width} and {height} are replaced by the size of
+            the frames
+        `width` : int
+            Width of the frames
+        `height` : int
+            Height of the frames
+    '''
+    ordered = True
+
+    def __init__(self, command, width, height):
+        command = command.replace('{width}', str(width))
+        command = command.replace('{height}', str(height))
+        self.process = subprocess.Popen(command, shell=True,
+                                        stdin=subprocess.PIPE)
+
+    def write(self, index, timestamp, pixels):
+        self.process.stdin.write(pixels[::-1].tostring())
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
+
+
+class FrameRecorder(object):
+    '''Read the frames in a ring of buffers, and give them to a writer from
+    a pool of threads. The writer must have a `write(index, timestamp,
+    pixels)` and a `close()` method, the pixels are a numpy array of shape
+    (height, width, 3), from the bottom to the top. The buffer is reused
+    after the write.
+
+    :Parameters:
+        `writer` : object
+            Writer of the frames, like :class:`ImageWriter`
+        `width` : int
+            Width of the frames
+        `height` : int
+            Height of the frames
+        `buffers` : int, default to 4
+            Number of buffers. When all the buffers are waiting to be
+            written, the new frames are dropped.
+        `workers` : int, default to 2
+            Number of threads writing the frames. Only one is used if the
+            writer is ordered.
+
+    The recorder is stopped when the application exit, if :meth:`stop` was
+    not called before.
+    '''
+
+    def __init__(self, writer, width, height, buffers=4, workers=2):
+        self.writer = writer
+        self.width = width
+        self.height = height
+        #: Number of frames captured
+        self.captured = 0
+        #: Number of frames dropped because all the buffers were used
+        self.dropped = 0
+        self._buffers = [numpy.empty((height, width, 3), dtype=numpy.uint8)
+                         for x in xrange(max(1, buffers))]
+        self._free = Queue.Queue()
+        for buf in self._buffers:
+            self._free.put(buf)
+        self._queue = Queue.Queue()
+        if getattr(writer, 'ordered', True):
+            workers = 1
+        self._workers = []
+        for x in xrange(max(1, workers)):
+            worker = threading.Thread(target=self._run_worker)
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+        self._stopped = False
+        # the workers are daemons: write the last frames before the exit
+        atexit.register(self.stop)
+
+    def capture(self, data=None):
+        '''Read the window in a free buffer, or copy `data` (RGB pixels from
+        the bottom to the top) if given, and queue the frame. Never block:
+        return False if the frame is dropped.'''
+        if self._stopped:
+            return False
+        try:
+            buf = self._free.get_nowait()
+        except Queue.Empty:
+            if not self.dropped:
+                pymt.pymt_logger.warning('RecordVideo: the writers are late, '
+                                         'dropping frames')
+            self.dropped += 1
+            return False
+        if data is None:
+            # the rows of the buffer are not padded to the default alignment
+            # of 4 bytes
+            glPushClientAttrib(GL_CLIENT_PIXEL_STORE_BIT)
+            glPixelStorei(GL_PACK_ALIGNMENT, 1)
+            glReadBuffer(GL_FRONT)
+            glReadPixels(0, 0, self.width, self.height, GL_RGB,
+                         GL_UNSIGNED_BYTE, array=buf)
+            glPopClientAttrib()
+        else:
+            buf.reshape(-1)[:] = numpy.frombuffer(data, dtype=numpy.uint8)
+        self._queue.put((self.captured, time.time(), buf))
+        self.captured += 1
+        return True
+
+    def on_flip(self, *largs):
+        self.capture()
+
+    def stop(self):
+        '''Write the frames waiting, stop the threads and close the
+        writer'''
+        if self._stopped:
+            return
+        self._stopped = True
+        for worker in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self.writer.close()
+
+    def _run_worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            index, timestamp, buf = job
+            try:
+                self.writer.write(index, timestamp, buf)
+            except Exception:
+                pymt.pymt_logger.exception('RecordVideo: unable to write '
+                                           'the frame %d' % index)
+            finally:
+                self._free.put(buf)
+
 
 def start(win, ctx):
-    win.push_handlers(on_flip=window_flip_and_save)
+    config = pymt.pymt_config
+    for key in ('mode', 'prefix', 'format', 'buffers', 'workers', 'command'):
+        ctx.config.setdefault(key, config.get('dump', key))
+
+    mode = ctx.config.get('mode')
+    prefix = ctx.config.get('prefix')
+    width, height = win.size
+    if mode == 'raw':
+        writer = RawWriter('%sframes.raw' % prefix, width, height)
+    elif mode == 'pipe':
+        writer = PipeWriter(ctx.config.get('command'), width, height)
+    else:
+        writer = ImageWriter(prefix, ctx.config.get('format'))
+
+    ctx.recorder = FrameRecorder(writer, width, height,
+                                 buffers=int(ctx.config.get('buffers')),
+                                 workers=int(ctx.config.get('workers')))
+    win.push_handlers(on_flip=ctx.recorder.on_flip)
 
 def stop(win, ctx):
-    win.remove_handlers(on_flip=window_flip_and_save)
+    win.remove_handlers(on_flip=ctx.recorder.on_flip)
+    ctx.recorder.stop()
+    pymt.pymt_logger.info('RecordVideo: %d frames recorded, %d dropped' % (
+        ctx.recorder.captured, ctx.recorder.dropped))
@@ -1,16 +1,114 @@
 '''
 Obj: handle 3D mesh
+
+The Wavefront OBJ files are parsed with numpy : the vertices of each material
+group are stored in one contiguous float32 array, in the GL_T2F_N3F_V3F
+interleaved format.
+
+Parsing a big model still take time, so the arrays are saved in a binary
+cache next to the OBJ file (`model.obj.pymtcache`). On the next loads, the
+cache is memory mapped and the arrays are used directly for the drawing. The
+cache is ignored if the OBJ file has changed.
 '''
 __all__ = ['OBJ']
 
 import os
+import mmap
+import struct
+import tempfile
 import warnings
+try:
+    import json
+except ImportError:
+    import simplejson as json
+import numpy
 import pymt
+from pymt.logger import pymt_logger
 
 from OpenGL.GL import *
 from graphx import *
 from geometric import *
 
+_CACHE_EXTENSION = '.pymtcache'
+_CACHE_MAGIC = 'PYMTOBJ\0'
+_CACHE_VERSION = 1
+_CACHE_ALIGN = 64
+
+# magic, version, mtime of the obj, size of the obj, size of the description
+_cache_header = struct.Struct('<8sIdQI')
+
+def _align(offset):
+    return offset + (-offset % _CACHE_ALIGN)
+
+def _parse_floats(lines, count):
+    '''Return an array of `count` floats per line, with a zero line first
+    (the indices of obj start at 1)'''
+    if not lines:
+        return numpy.zeros((1, count), dtype='f')
+    data = numpy.fromstring(' '.join(lines), dtype='f', sep=' ')
+    if data.size != len(lines) * count:
+        # optional values (like w) or missing values, slower
+        data = numpy.array([(map(float, line.split()[:count]) +
+                             [0.] * count)[:count] for line in lines],
+                           dtype='f')
+    data = data.reshape(-1, count)
+    return numpy.vstack((numpy.zeros((1, count), dtype='f'), data))
+
+def _absolute_indices(face, counts):
+    '''Convert the relative indices (negative) of a face'''
+    tokens = []
+    for token in face.split():
+        parts = token.split('/')
+        for i, part in enumerate(parts):
+            if part.startswith('-'):
+                parts[i] = str(counts[i] + 1 + int(part))
+        tokens.append('/'.join(parts))
+    return ' '.join(tokens)
+
+def _parse_faces(faces, count):
+    '''Return the (vertex, texcoord, normal) indices of faces with `count`
+    vertices, as an array of shape (len(faces), count, 3)'''
+    text = ' '.join(faces).replace('//', '/0/')
+    ncomp = text.split(None, 1)[0].count('/') + 1
+    indices = numpy.fromstring(text.replace('/', ' '), dtype=numpy.int32,
+                               sep=' ')
+    if ncomp > 3 or indices.size != len(faces) * count * ncomp:
+        # mixed formats in the same group, slower
+        ncomp = 3
+        values = []
+        for token in text.split():
+            parts = (token.split('/') + ['0', '0'])[:3]
+            values.extend([int(x or 0) for x in parts])
+        indices = numpy.array(values, dtype=numpy.int32)
+    indices = indices.reshape(len(faces), count, ncomp)
+    if ncomp < 3:
+        indices = numpy.concatenate((indices, numpy.zeros(
+            (len(faces), count, 3 - ncomp), dtype=numpy.int32)), axis=2)
+    return indices
+
+def _build_vertices(faces, vertices, tex_coords, normals):
+    '''Return the T2F_N3F_V3F array of the faces. The polygons are
+    triangulated as fans.'''
+    by_count = {}
+    for face in faces:
+        count = len(face.split())
+        if count >= 3:
+            by_count.setdefault(count, []).append(face)
+    triangles = []
+    for count, lines in by_count.iteritems():
+        indices = _parse_faces(lines, count)
+        for i in xrange(1, count - 1):
+            triangles.append(indices[:, (0, i, i + 1)].reshape(-1, 3))
+    if not triangles:
+        return numpy.zeros(0, dtype='f')
+    indices = numpy.concatenate(triangles)
+    data = numpy.empty((len(indices), 8), dtype='f')
+    data[:, 0:2] = tex_coords[indices[:, 1]]
+    data[:, 2:5] = normals[indices[:, 2]]
+    data[:, 5:8] = vertices[indices[:, 0]]
+    return data.ravel()
+
+
 class OBJ:
     '''3D object representation.
 
@@ -24,41 +122,75 @@ class OBJ:
         `compat` : bool, default to True
             Set to False if you want to take care yourself of the lights, depth
             test, color...
+        `cache` : bool, default to True
+            Use the binary cache stored next to the file. Not used if `file`
+            is set.
     '''
-    def __init__(self, filename, file=None, path=None, compat=True):
+    def __init__(self, filename, file=None, path=None, compat=True,
+                 cache=True):
         self.materials = {}
         self.meshes = {}        # Name mapping
         self.mesh_list = []     # Also includes anonymous meshes
         self.compat = compat
-
-        if file is None:
-            file = open(filename, 'r')
+        self._mtllibs = []
 
         if path is None:
             path = os.path.dirname(filename)
-            self.path = path
+        self.path = path
+
+        if file is not None:
+            self._parse(file)
+            return
 
+        if cache and self._load_cache(filename):
+            return
+
+        file = open(filename, 'r')
+        try:
+            self._parse(file)
+        finally:
+            file.close()
+        if cache:
+            self._save_cache(filename)
+
+    def _parse(self, file):
         mesh = None
         group = None
         material = None
 
-        vertices = [[0., 0., 0.]]
-        normals = [[0., 0., 0.]]
-        tex_coords = [[0., 0.]]
+        vertices = []
+        normals = []
+        tex_coords = []
+        # faces of each group, in the order of the groups
+        faces = []
 
-        for line in open(filename, 'r'):
-            if line.startswith('#'):
+        for line in file:
+            # fast path for the vertices and the faces
+            start = line[:3]
+            if start[:2] == 'v ':
+                vertices.append(line[2:])
                 continue
-            values = line.split()
-            if not values:
+            elif start == 'vn ':
+                normals.append(line[3:])
+                continue
+            elif start == 'vt ':
+                tex_coords.append(line[3:])
                 continue
+            elif start[:2] == 'f ':
+                values = ('f', )
+            elif line.startswith('#'):
+                continue
+            else:
+                values = line.split()
+                if not values:
+                    continue
 
             if values[0] == 'v':
-                vertices.append(map(float, values[1:4]))
+                vertices.append(' '.join(values[1:]))
             elif values[0] == 'vn':
-                normals.append(map(float, values[1:4]))
+                normals.append(' '.join(values[1:]))
             elif values[0] == 'vt':
-                tex_coords.append(map(float, values[1:3]))
+                tex_coords.append(' '.join(values[1:]))
             elif values[0] == 'mtllib':
                 self.load_material_library(values[1])
             elif values[0] in ('usemtl', 'usemat'):
@@ -68,6 +200,7 @@ class OBJ:
                 if mesh is not None:
                     group = MaterialGroup(material)
                     mesh.groups.append(group)
+                    faces.append((group, []))
             elif values[0] == 'o':
                 mesh = Mesh(values[1])
                 self.meshes[mesh.name] = mesh
@@ -82,32 +215,137 @@ class OBJ:
                 if group is None:
                     group = MaterialGroup(material)
                     mesh.groups.append(group)
+                    faces.append((group, []))
+
+                face = line.split(None, 1)[1]
+                if '-' in face:
+                    face = _absolute_indices(face, (len(vertices),
+                        len(tex_coords), len(normals)))
+                faces[-1][1].append(face)
+
+        vertices = _parse_floats(vertices, 3)
+        normals = _parse_floats(normals, 3)
+        tex_coords = _parse_floats(tex_coords, 2)
+        for group, lines in faces:
+            group.vertices = _build_vertices(lines, vertices, tex_coords,
+                                             normals)
+
+    def _load_cache(self, filename):
+        '''Load the meshes from the binary cache, return True on success'''
+        try:
+            st = os.stat(filename)
+            fd = open(filename + _CACHE_EXTENSION, 'rb')
+        except EnvironmentError:
+            return False
+        try:
+            try:
+                m = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+                magic, version, mtime, size, infosize = \
+                    _cache_header.unpack_from(m, 0)
+                if magic != _CACHE_MAGIC or version != _CACHE_VERSION or \
+                   mtime != st.st_mtime or size != st.st_size:
+                    return False
+                info = json.loads(m[_cache_header.size:
+                                    _cache_header.size + infosize])
+            finally:
+                fd.close()
+        except Exception:
+            pymt_logger.warning('OBJ: invalid cache for %s' % filename)
+            return False
+
+        for mtllib in info['mtllib']:
+            self.load_material_library(mtllib)
+        default_material = None
+        for meshinfo in info['meshes']:
+            mesh = Mesh(meshinfo['name'])
+            if meshinfo['named']:
+                self.meshes[mesh.name] = mesh
+            self.mesh_list.append(mesh)
+            for groupinfo in meshinfo['groups']:
+                material = None
+                if groupinfo['material'] == 'default':
+                    if default_material is None:
+                        default_material = Material('')
+                    material = default_material
+                elif groupinfo['material'] is not None:
+                    material = self.materials.get(groupinfo['material'])
+                    if material is None:
+                        warnings.warn('Unknown material: %s' %
+                                      groupinfo['material'])
+                group = MaterialGroup(material)
+                group.vertices = numpy.frombuffer(m, dtype='f',
+                    count=groupinfo['count'], offset=groupinfo['offset'])
+                mesh.groups.append(group)
+        return True
+
+    def _save_cache(self, filename):
+        '''Save the meshes in the binary cache'''
+        meshes = []
+        offset = None
+        datas = []
+        for mesh in self.mesh_list:
+            groups = []
+            for group in mesh.groups:
+                material = group.material
+                if material is None:
+                    name = None
+                elif self.materials.get(material.name) is material:
+                    name = material.name
+                else:
+                    name = 'default'
+                data = numpy.ascontiguousarray(group.vertices, dtype='f')
+                groups.append({'material': name, 'count': len(data)})
+                datas.append(data)
+            meshes.append({'name': mesh.name,
+                           'named': self.meshes.get(mesh.name) is mesh,
+                           'groups': groups})
+        info = {'mtllib': self._mtllibs, 'meshes': meshes}
 
-                # For fan triangulation, remember first and latest vertices
-                v1 = None
-                vlast = None
-                points = []
-                for i, v in enumerate(values[1:]):
-                    v_index, t_index, n_index = \
-                            (map(int, [j or 0 for j in v.split('/')]) + [0, 0])[:3]
-                    if v_index < 0:
-                        v_index += len(vertices) - 1
-                    if t_index < 0:
-                        t_index += len(tex_coords) - 1
-                    if n_index < 0:
-                        n_index += len(normals) - 1
-                    vertex = tex_coords[t_index] + \
-                            normals[n_index] + \
-                            vertices[v_index]
-
-                    if i >= 3:
-                        # Triangulate
-                        group.vertices += v1 + vlast
-                    group.vertices += vertex
-
-                    if i == 0:
-                        v1 = vertex
-                    vlast = vertex
+        # the offsets depend of the size of the description, compute them
+        # until the description doesn't change anymore.
+        while True:
+            infodata = json.dumps(info)
+            offset = _align(_cache_header.size + len(infodata))
+            changed = False
+            for meshinfo in meshes:
+                for groupinfo in meshinfo['groups']:
+                    if groupinfo.get('offset') != offset:
+                        groupinfo['offset'] = offset
+                        changed = True
+                    offset = _align(offset + groupinfo['count'] * 4)
+            if not changed:
+                break
+
+        cachename = filename + _CACHE_EXTENSION
+        tmpfilename = None
+        try:
+            st = os.stat(filename)
+            osfd, tmpfilename = tempfile.mkstemp(
+                dir=os.path.dirname(os.path.abspath(filename)),
+                prefix='.tmp')
+            fd = os.fdopen(osfd, 'wb')
+            try:
+                fd.write(_cache_header.pack(_CACHE_MAGIC, _CACHE_VERSION,
+                         st.st_mtime, st.st_size, len(infodata)))
+                fd.write(infodata)
+                for data in datas:
+                    fd.write('\0' * (-fd.tell() % _CACHE_ALIGN))
+                    fd.write(data.tostring())
+            finally:
+                fd.close()
+            # mkstemp create the file readable only by us, the cache must be
+            # readable by the other users of the model
+            os.chmod(tmpfilename, 0644)
+            if os.path.exists(cachename):
+                os.unlink(cachename)
+            os.rename(tmpfilename, cachename)
+            tmpfilename = None
+        except EnvironmentError:
+            pymt_logger.debug('OBJ: unable to write the cache %s' %
+                              cachename)
+        finally:
+            if tmpfilename is not None and os.path.exists(tmpfilename):
+                os.unlink(tmpfilename)
 
     def open_material_file(self, filename):
         '''Override for loading from archive/network etc.'''
@@ -116,6 +354,7 @@ class OBJ:
     def load_material_library(self, filename):
         material = None
         file = self.open_material_file(filename)
+        self._mtllibs.append(filename)
 
         for line in file:
             if line.startswith('#'):
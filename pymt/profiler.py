@@ -0,0 +1,352 @@
+'''
+Profiler: find where the time of a frame goes
+
+The frame profiler measure each phase of a frame (clock, input, window events,
+update, draw and flip), and the time spent in the `on_update`, `on_draw` and
+touch events of every widget. The last frames are kept in a ring buffer ::
+
+    from pymt.profiler import FrameProfiler
+
+    profiler = FrameProfiler(frames=600)
+    profiler.start()
+
+    # ... run the application for a while, then
+
+    for stat in profiler.get_stats()[:10]:
+        print stat['name'], stat['event'], stat['self'] * 1000.
+
+    profiler.export_chrome_trace('trace.json')
+
+The time of a widget event is split into the total time (children included)
+and the self time (without the events dispatched to the children). Widgets are
+grouped by class with :func:`FrameProfiler.get_stats`, or by id with
+`by='id'`.
+
+The recorded frames can be saved in JSON with :func:`FrameProfiler.export_json`
+or in the Chrome trace format with :func:`FrameProfiler.export_chrome_trace`.
+Open the trace in chrome://tracing to see every frame. The events of each
+widget appear in the trace only if the profiler is created with `trace=True`.
+
+The easiest way to use the profiler is the `profiler` module ::
+
+    python myapp.py -m profiler:output=trace.json,budget=16
+
+.. note::
+
+    The profiler is installed by replacing
+    :func:`~pymt.event.EventDispatcher.dispatch_event`, and restore the
+    original one when it's stopped : it cost nothing if not started.
+'''
+
+__all__ = ('FrameProfiler', 'getProfiler', 'PROFILED_EVENTS')
+
+from collections import deque
+from timeit import default_timer
+try:
+    import json
+except ImportError:
+    import simplejson as json
+from pymt.logger import pymt_logger
+from pymt.event import EventDispatcher
+from pymt.clock import getClock
+
+#: Events measured by default
+PROFILED_EVENTS = ('on_update', 'on_draw', 'on_touch_down', 'on_touch_move',
+                   'on_touch_up')
+
+# profiler currently started
+_active_profiler = None
+
+def getProfiler():
+    '''Return the started profiler, or None'''
+    return _active_profiler
+
+
+class _Frame(object):
+    '''(internal) Measures of one frame'''
+
+    __slots__ = ('index', 'start', 'duration', 'phases', 'counters',
+                 'widgets', 'spans')
+
+    def __init__(self, index, start):
+        self.index = index
+        self.start = start
+        self.duration = 0
+        # list of (name, start, duration)
+        self.phases = []
+        self.counters = {}
+        # (class name, widget id, event) -> [count, total, self]
+        self.widgets = {}
+        # list of (class name, widget id, event, start, duration), only
+        # filled when the profiler trace the events.
+        self.spans = []
+
+    def to_dict(self):
+        widgets = []
+        for (name, id, event), (count, total, selftime) in \
+                self.widgets.iteritems():
+            widgets.append({'name': name, 'id': id, 'event': event,
+                            'count': count, 'total': total,
+                            'self': selftime})
+        return {
+            'index': self.index,
+            'start': self.start,
+            'duration': self.duration,
+            'phases': [{'name': name, 'start': start, 'duration': duration}
+                       for name, start, duration in self.phases],
+            'counters': self.counters,
+            'widgets': widgets
+        }
+
+
+class FrameProfiler(object):
+    '''Measure the time of the frames and of the widget events.
+
+    :Parameters:
+        `frames` : int, default to 300
+            Number of frames kept in the ring buffer.
+        `trace` : bool, default to False
+            If True, every widget event is recorded, for the Chrome trace.
+        `events` : list, default to PROFILED_EVENTS
+            Name of the events to measure.
+        `budget` : float, default to None
+            Time budget of a frame, in seconds. If a frame take more time, a
+            warning is logged with the widget that take the most time.
+    '''
+
+    def __init__(self, frames=300, trace=False, events=PROFILED_EVENTS,
+                 budget=None):
+        self.frames = deque(maxlen=frames)
+        self.trace = trace
+        self.events = frozenset(events)
+        self.budget = budget
+        self._frame = None
+        self._index = 0
+        self._last = 0
+        # children time of the events currently dispatched
+        self._stack = []
+        self._last_warning = 0
+        self._dispatch_event = None
+
+    @property
+    def started(self):
+        '''True if the profiler is started'''
+        return _active_profiler is self
+
+    def start(self):
+        '''Start the profiler. Only one profiler can be started.'''
+        global _active_profiler
+        if _active_profiler is self:
+            return
+        if _active_profiler is not None:
+            _active_profiler.stop()
+        _active_profiler = self
+
+        dispatch_event = EventDispatcher.dispatch_event
+        self._dispatch_event = dispatch_event
+        events = self.events
+        profiler = self
+        def profiled_dispatch_event(widget, event_type, *largs):
+            if profiler._frame is None or event_type not in events:
+                return dispatch_event(widget, event_type, *largs)
+            return profiler._dispatch(widget, event_type, largs)
+        EventDispatcher.dispatch_event = profiled_dispatch_event
+
+    def stop(self):
+        '''Stop the profiler, the recorded frames are kept.'''
+        global _active_profiler
+        if _active_profiler is not self:
+            return
+        _active_profiler = None
+        EventDispatcher.dispatch_event = self._dispatch_event
+        self._frame = None
+
+    def clear(self):
+        '''Remove all the recorded frames'''
+        self.frames.clear()
+
+    def begin_frame(self):
+        '''Start the measure of a new frame. Called by the event loop.'''
+        self._index += 1
+        self._last = now = default_timer()
+        self._frame = _Frame(self._index, now)
+        self._stack = []
+
+    def phase(self, name):
+        '''Record the time since the last phase (or the beginning of the
+        frame) as the phase `name`'''
+        frame = self._frame
+        if frame is None:
+            return
+        now = default_timer()
+        frame.phases.append((name, self._last, now - self._last))
+        self._last = now
+
+    def count(self, name, value=1):
+        '''Add `value` to the counter `name` of the current frame'''
+        frame = self._frame
+        if frame is None:
+            return
+        counters = frame.counters
+        counters[name] = counters.get(name, 0) + value
+
+    def end_frame(self):
+        '''End the measure of the current frame, and store it in the ring
+        buffer'''
+        frame = self._frame
+        if frame is None:
+            return
+        self._frame = None
+        frame.duration = default_timer() - frame.start
+        frame.counters['clock_callbacks'] = getClock().get_callbacks_count()
+        self.frames.append(frame)
+        budget = self.budget
+        if budget is not None and frame.duration > budget:
+            self._warn_budget(frame)
+
+    def get_frame_stats(self):
+        '''Return a dict with the number of frames, the average and maximum
+        duration of the frames, and the average duration of each phase.'''
+        frames = self.frames
+        if not frames:
+            return {'frames': 0, 'average': 0, 'max': 0, 'phases': {}}
+        phases = {}
+        for frame in frames:
+            for name, start, duration in frame.phases:
+                phases[name] = phases.get(name, 0) + duration
+        count = float(len(frames))
+        durations = [frame.duration for frame in frames]
+        for name in phases:
+            phases[name] /= count
+        return {'frames': len(frames), 'average': sum(durations) / count,
+                'max': max(durations), 'phases': phases}
+
+    def get_stats(self, by='class', event=None):
+        '''Return the time spent in the widget events of the recorded frames,
+        as a list of dict with `name`, `event`, `count`, `total`, `self` and
+        `max` keys, sorted by self time.
+
+        :Parameters:
+            `by` : str, default to 'class'
+                'class' to group the widgets by class name, 'id' to group them
+                by id. With 'id', the widgets without id are ignored.
+            `event` : str, default to None
+                If set, only this event is returned.
+        '''
+        if by not in ('class', 'id'):
+            raise ValueError('by must be "class" or "id"')
+        stats = {}
+        for frame in self.frames:
+            for (name, id, event_type), (count, total, selftime) in \
+                    frame.widgets.iteritems():
+                if event is not None and event_type != event:
+                    continue
+                if by == 'id':
+                    if id is None:
+                        continue
+                    name = id
+                key = (name, event_type)
+                stat = stats.get(key)
+                if stat is None:
+                    stats[key] = {'name': name, 'event': event_type,
+                                  'count': count, 'total': total,
+                                  'self': selftime, 'max': selftime}
+                else:
+                    stat['count'] += count
+                    stat['total'] += total
+                    stat['self'] += selftime
+                    stat['max'] = max(stat['max'], selftime)
+        stats = stats.values()
+        stats.sort(key=lambda x: x['self'], reverse=True)
+        return stats
+
+    def to_json(self):
+        '''Return the recorded frames as a JSON string'''
+        return json.dumps({'frames': [x.to_dict() for x in self.frames]})
+
+    def to_chrome_trace(self):
+        '''Return the recorded frames in the Chrome trace format, as a JSON
+        string'''
+        events = []
+        frames = self.frames
+        if frames:
+            origin = frames[0].start
+        def us(t):
+            return int((t - origin) * 1000000)
+        for frame in frames:
+            events.append({'name': 'frame', 'cat': 'frame', 'ph': 'X',
+                           'ts': us(frame.start),
+                           'dur': int(frame.duration * 1000000),
+                           'pid': 1, 'tid': 1,
+                           'args': {'index': frame.index}})
+            for name, start, duration in frame.phases:
+                events.append({'name': name, 'cat': 'phase', 'ph': 'X',
+                               'ts': us(start),
+                               'dur': int(duration * 1000000),
+                               'pid': 1, 'tid': 1})
+            for name, id, event_type, start, duration in frame.spans:
+                events.append({'name': '%s.%s' % (name, event_type),
+                               'cat': 'widget', 'ph': 'X',
+                               'ts': us(start),
+                               'dur': int(duration * 1000000),
+                               'pid': 1, 'tid': 1, 'args': {'id': id}})
+            events.append({'name': 'counters', 'ph': 'C',
+                           'ts': us(frame.start), 'pid': 1, 'tid': 1,
+                           'args': frame.counters})
+        return json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'})
+
+    def export_json(self, filename):
+        '''Save the recorded frames in JSON'''
+        with open(filename, 'w') as fd:
+            fd.write(self.to_json())
+
+    def export_chrome_trace(self, filename):
+        '''Save the recorded frames in the Chrome trace format'''
+        with open(filename, 'w') as fd:
+            fd.write(self.to_chrome_trace())
+
+    def _dispatch(self, widget, event_type, largs):
+        stack = self._stack
+        stack.append(0)
+        start = default_timer()
+        try:
+            return self._dispatch_event(widget, event_type, *largs)
+        finally:
+            duration = default_timer() - start
+            selftime = duration - stack.pop()
+            if stack:
+                stack[-1] += duration
+            frame = self._frame
+            if frame is not None:
+                name = widget.__class__.__name__
+                id = getattr(widget, 'id', None)
+                key = (name, id, event_type)
+                stat = frame.widgets.get(key)
+                if stat is None:
+                    frame.widgets[key] = [1, duration, selftime]
+                else:
+                    stat[0] += 1
+                    stat[1] += duration
+                    stat[2] += selftime
+                if self.trace:
+                    frame.spans.append((name, id, event_type, start,
+                                        duration))
+
+    def _warn_budget(self, frame):
+        # don't flood the log if all the frames are too long
+        if frame.start - self._last_warning < 1:
+            return
+        self._last_warning = frame.start
+        worst = None
+        for key, stat in frame.widgets.iteritems():
+            if worst is None or stat[2] > worst[1][2]:
+                worst = (key, stat)
+        message = 'Profiler: frame %d took %.1fms (budget is %.1fms)' % (
+            frame.index, frame.duration * 1000., self.budget * 1000.)
+        if worst is not None:
+            (name, id, event_type), (count, total, selftime) = worst
+            if id is not None:
+                name = '%s#%s' % (name, id)
+            message += ', %s.%s took %.1fms in %d calls' % (
+                name, event_type, selftime * 1000., count)
+        pymt_logger.warning(message)
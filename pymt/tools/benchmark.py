@@ -39,6 +39,28 @@ class bench_core_label:
             o.append(Label(label=x))
 
 
+class bench_graphx_label_cache:
+    '''Graphx: get cached label (100 labels) 1000 times'''
+    def __init__(self):
+        self.labels = [MTLabel(label='label %d' % x) for x in xrange(100)]
+        for x in self.labels:
+            getLabel(x.label, **x.kwargs)
+    def run(self):
+        labels = self.labels
+        for x in xrange(1000):
+            for label in labels:
+                getLabel(label.label, **label.kwargs)
+
+class bench_graphx_cssrectangle:
+    '''Graphx: draw css rectangle (100 buttons) 1000 times'''
+    def __init__(self):
+        self.buttons = [MTButton(pos=(x, x)) for x in xrange(100)]
+    def run(self):
+        buttons = self.buttons
+        for x in xrange(1000):
+            for b in buttons:
+                drawCSSRectangle(pos=b.pos, size=b.size, style=b.style)
+
 class bench_widget_creation:
     '''Widget: creation (10000 MTWidget)'''
     def run(self):
@@ -114,7 +114,7 @@ class AnimationBase(object):
             kwargs = {}
             attr = getattr(self.widget, prop)
             try:
-                if type(attr) == dict and type(value) == dict:
+                if isinstance(attr, dict) and isinstance(value, dict):
                     for k, v in value.items():
                         attr[k] = v
                 else:
@@ -30,6 +30,7 @@ __all__ = (
 
 from pymt.logger import pymt_logger
 from pymt.cache import Cache
+from pymt.utils import StyleDict
 from pymt.parser import *
 from pymt import pymt_data_dir, pymt_home_dir
 import os
@@ -39,9 +40,6 @@ import logging
 import re
 import weakref
 
-# Register CSS cache
-Cache.register('pymt.css', limit=500, timeout=60)
-
 #: Instance of the CSS sheet
 pymt_sheet = None
 
@@ -116,17 +114,58 @@ css_keyword_convert = {
 }
 
 class CSSSheet(object):
+    '''Rules of the CSS, and style of the widgets.
+
+    The style of a widget depends only on his class, his `cls` and his `id`.
+    It's computed once for each combination, from the selectors ordered by
+    specificity, and kept until the rules of one of this selectors change.
+    '''
     def __init__(self):
+        self.reset()
+
+    def reset(self):
         self._rule = ''
         self._content = ''
         self._state = 'rule'
         self._css = {}
-
-    def reset(self):
+        # text of the rules, to detect the changes
+        self._raw = {}
+        self._old_raw = None
+        # selectors changed since the last pop_changes()
+        self._changed = set()
+        # (class, cls, id) -> (selectors, style)
+        self._compiled = {}
+
+    def clear_rules(self):
+        '''Remove all the rules, but keep the computed styles. The rules
+        can be parsed again, then :func:`pop_changes` return the selectors
+        that really changed.'''
         self._rule = ''
         self._content = ''
         self._state = 'rule'
+        if self._old_raw is None:
+            self._old_raw = self._raw
         self._css = {}
+        self._raw = {}
+
+    def pop_changes(self):
+        '''Return the selectors changed since the last call, and forget the
+        styles that use them.'''
+        changed = self._changed
+        self._changed = set()
+        old_raw = self._old_raw
+        if old_raw is not None:
+            self._old_raw = None
+            raw = self._raw
+            for selector in set(old_raw).union(raw):
+                if old_raw.get(selector) != raw.get(selector):
+                    changed.add(selector)
+        if changed:
+            compiled = self._compiled
+            for key, (selectors, style) in compiled.items():
+                if not selectors.isdisjoint(changed):
+                    del compiled[key]
+        return changed
 
     def parse_text(self, text):
         '''Parse a CSS text, and inject in the current sheet'''
@@ -149,6 +188,10 @@ class CSSSheet(object):
         for line in text.split('\n'):
             self._parse_line(line)
 
+        # not in a reload, forget the styles of the changed rules now
+        if self._old_raw is None:
+            self.pop_changes()
+
     def _parse_line(self, line):
         '''Parse a line, and inject into rules or content, depend on current
         parser state'''
@@ -196,57 +239,84 @@ class CSSSheet(object):
             return sname.strip(), value
 
         rules = [x.strip() for x in rulestr.split(',') if x.strip() != '']
-        keys = [extract(x.strip()) for x in contentstr.split(';') if x.strip() != '']
+        contents = [x.strip() for x in contentstr.split(';') if x.strip() != '']
+        keys = [extract(x) for x in contents]
         for rule in rules:
             if rule in self._css:
                 self._css[rule].update(dict(keys[:]))
+                raw = self._raw[rule] + tuple(contents)
             else:
                 self._css[rule] = dict(keys[:])
-
-    def get_style(self, widget):
-        '''Return the style of a widget'''
+                raw = tuple(contents)
+            if self._old_raw is None and self._raw.get(rule) != raw:
+                self._changed.add(rule)
+            self._raw[rule] = raw
+
+    def get_selectors(self, widget, with_id=True):
+        '''Return all the selectors that can match a widget, from the lowest
+        to the highest specificity :
+
+            * <objectname>, from the '*' to the class of the widget
+            * .<classname>
+            * <objectname>.<classname>
+            * #<objectid>
+        '''
         widget_classes = get_widget_parents(widget)
-        widget_classes.append('*')
-        styles = {}
+        selectors = ['*']
+        selectors.extend(reversed(widget_classes))
 
-        # 
-        # TODO rework this part to match
-        # #<objectid>  uniq
-        # <objectname> uniq
-        # .<class>     multiple
-        #
-
-        # match <objectname>
-        for cls in reversed(widget_classes):
-            for r, v in self._css.items():
-                if r == cls:
-                    styles.update(v)
-
-        # match .<classname>
         widget_cls = widget.cls
         if type(widget_cls) in (unicode, str):
             widget_cls = [widget.cls]
         if type(widget_cls) in (list, tuple):
             for kcls in widget_cls:
                 cls = '.%s' % kcls
-                if cls in self._css:
-                    styles.update(self._css[cls])
-
-                # match <objectname>.<classname>
+                selectors.append(cls)
                 for name in reversed(widget_classes):
-                    lcls = '%s%s' % (name, cls)
-                    for r, v in self._css.items():
-                        if r == lcls:
-                            styles.update(v)
+                    selectors.append('%s%s' % (name, cls))
 
-        # match #<objectname>
-        if hasattr(widget, 'id') and widget.id is not None:
-            widgetid = '#%s' % widget.id
-            if widgetid in self._css:
-                styles.update(self._css[widgetid])
+        widgetid = getattr(widget, 'id', None)
+        if with_id and widgetid is not None:
+            selectors.append('#%s' % widgetid)
+        return selectors
 
+    def get_style(self, widget):
+        '''Return the style of a widget'''
+        styles = {}
+        css = self._css
+        for selector in self.get_selectors(widget):
+            style = css.get(selector)
+            if style is not None:
+                styles.update(style)
         return styles
 
+    def get_compiled_style(self, widget):
+        '''Return the style of a widget, as a :class:`~pymt.utils.StyleDict`
+        shared with the widgets of the same class, cls and id.'''
+        cls = widget.cls
+        if type(cls) is list:
+            cls = tuple(cls)
+        # the id is used only if a rule exist for it
+        widgetid = getattr(widget, 'id', None)
+        if widgetid is not None and not '#%s' % widgetid in self._css:
+            widgetid = None
+        key = (widget.__class__, cls, widgetid)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            selectors = self.get_selectors(widget, widgetid is not None)
+            style = StyleDict()
+            css = self._css
+            for selector in selectors:
+                rule = css.get(selector)
+                if rule is not None:
+                    style.update(rule)
+            compiled = self._compiled[key] = (frozenset(selectors), style)
+        return compiled[1]
+
+    def is_affected(self, widget, selectors):
+        '''Return True if one of the `selectors` can match the widget'''
+        return not selectors.isdisjoint(self.get_selectors(widget))
+
 def get_truncated_classname(name):
     '''Return the css-ized name of a class
     (remove the MT prefix, and all in lowercase)'''
@@ -284,7 +354,8 @@ def css_get_widget_id(widget):
     return idwidget
 
 def css_get_style(widget):
-    '''Return a dict() with all the style for the widget.
+    '''Return a :class:`~pymt.utils.StyleDict` with all the style for the
+    widget.
 
     :Parameters:
         `widget`: class
@@ -297,14 +368,9 @@ def css_get_style(widget):
     if not ref in _css_widgets:
         _css_widgets.add(ref)
 
-    idwidget = css_get_widget_id(widget)
-    styles = Cache.get('pymt.css', idwidget)
-    if styles is not None:
-        return styles
-
-    styles = pymt_sheet.get_style(widget)
-    Cache.append('pymt.css', idwidget, styles)
-    return styles
+    if not hasattr(widget, 'cls'):
+        widget.__setattr__('cls', '')
+    return pymt_sheet.get_compiled_style(widget)
 
 def css_add_sheet(text, _reload=False):
     '''Add a css text to use.
@@ -345,18 +411,28 @@ def css_add_keyword(keyword, convertfunc):
     css_keyword_convert[keyword] = convertfunc
 
 def css_reload():
+    '''Parse again all the css, and update the style of the widgets
+    matched by the changed rules'''
     pymt_logger.debug('CSS: Reloading CSS in progress')
-    pymt_sheet.reset()
+    pymt_sheet.clear_rules()
     for callback, args in _css_sources[:]:
         callback(*args, _reload=True)
-    Cache.remove('pymt.css')
+    changed = pymt_sheet.pop_changes()
+    if not changed:
+        pymt_logger.info('CSS: CSS Reloaded, no changes')
+        return
+    # the rectangles are cached by style, drop the old ones
+    Cache.remove('pymt.cssrect')
+    count = 0
     for r in _css_widgets.copy():
         o = r()
         if o is None:
             _css_widgets.remove(r)
             continue
-        o.reload_css()
-    pymt_logger.info('CSS: CSS Reloaded')
+        if pymt_sheet.is_affected(o, changed):
+            o.reload_css()
+            count += 1
+    pymt_logger.info('CSS: CSS Reloaded, %d widgets updated' % count)
 
 # Autoload the default css + user css
 if 'PYMT_DOC' not in os.environ:
@@ -0,0 +1,163 @@
+'''
+Spatial index: find quickly the children under a point
+
+A container with lot of children (like a photo wall with thousands of
+MTScatter) must walk all his children to find the one under a touch. A
+spatial index store the bounding box of every children in a uniform grid, so
+only the children in the touched cell are tested.
+
+You can activate it on any widget or on the window ::
+
+    wall = MTWidget(spatial_index=True)
+    for filename in photos:
+        wall.add_widget(MTScatterImage(filename=filename))
+
+    # or, for the window
+    getWindow().spatial_index = True
+
+The index is updated when a child is moved, resized or transformed. The
+dispatch order is the same as without index : the last added child is tested
+first.
+
+.. warning::
+
+    With a spatial index, on_touch_down and on_touch_move are dispatched only
+    to the children that have the touch in their bounding box. Don't use it if
+    some children need to receive touches outside of their bounding box (like
+    MTScatterPlane). The children must be added and removed with
+    add_widget() / remove_widget().
+'''
+
+__all__ = ('SpatialIndex', )
+
+from math import floor
+
+class SpatialIndex(object):
+    '''Uniform grid index of bounding boxes.
+
+    :Parameters:
+        `cell_size` : int, default to 128
+            Size of a cell in the grid.
+        `max_cells` : int, default to 64
+            Object covering more than `max_cells` cells are not stored in the
+            grid, but in a separate list tested on every query.
+    '''
+
+    __slots__ = ('cell_size', 'max_cells', '_cells', '_large', '_entries',
+                 '_top', '_bottom')
+
+    def __init__(self, cell_size=128, max_cells=64):
+        self.cell_size = float(cell_size)
+        self.max_cells = max_cells
+        # (cx, cy) -> set of objects
+        self._cells = {}
+        # objects too big for the grid
+        self._large = set()
+        # object -> [order, x1, y1, x2, y2, cells]
+        self._entries = {}
+        # order of the top and bottom objects
+        self._top = 0
+        self._bottom = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, obj):
+        return obj in self._entries
+
+    def add(self, obj, bbox, front=True):
+        '''Add an object in the index, with his bounding box
+        ((x, y), (width, height)). If `front` is True, the object will be
+        returned before the others in query(), otherwise after.'''
+        if obj in self._entries:
+            self.remove(obj)
+        if front:
+            self._top += 1
+            order = self._top
+        else:
+            self._bottom -= 1
+            order = self._bottom
+        entry = [order, 0, 0, 0, 0, None]
+        self._entries[obj] = entry
+        self._insert(obj, entry, bbox)
+
+    def update(self, obj, bbox):
+        '''Update the bounding box of an object'''
+        entry = self._entries.get(obj)
+        if entry is None:
+            return
+        (x, y), (w, h) = bbox
+        if entry[1] == x and entry[2] == y and \
+           entry[3] == x + w and entry[4] == y + h:
+            return
+        self._discard(obj, entry)
+        self._insert(obj, entry, bbox)
+
+    def remove(self, obj):
+        '''Remove an object from the index'''
+        entry = self._entries.pop(obj, None)
+        if entry is None:
+            return
+        self._discard(obj, entry)
+
+    def clear(self):
+        '''Remove all the objects from the index'''
+        self._cells = {}
+        self._large = set()
+        self._entries = {}
+        self._top = self._bottom = 0
+
+    def query(self, x, y):
+        '''Return the objects having (x, y) in their bounding box, from the
+        front to the back.'''
+        cs = self.cell_size
+        candidates = self._cells.get((int(floor(x / cs)), int(floor(y / cs))))
+        entries = self._entries
+        result = []
+        if candidates:
+            for obj in candidates:
+                entry = entries[obj]
+                if entry[1] <= x <= entry[3] and entry[2] <= y <= entry[4]:
+                    result.append((entry[0], obj))
+        for obj in self._large:
+            entry = entries[obj]
+            if entry[1] <= x <= entry[3] and entry[2] <= y <= entry[4]:
+                result.append((entry[0], obj))
+        if len(result) > 1:
+            result.sort(reverse=True)
+        return [obj for order, obj in result]
+
+    def _insert(self, obj, entry, bbox):
+        (x, y), (w, h) = bbox
+        x2, y2 = x + w, y + h
+        entry[1:5] = min(x, x2), min(y, y2), max(x, x2), max(y, y2)
+        cs = self.cell_size
+        cx1, cy1 = int(floor(entry[1] / cs)), int(floor(entry[2] / cs))
+        cx2, cy2 = int(floor(entry[3] / cs)), int(floor(entry[4] / cs))
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > self.max_cells:
+            entry[5] = None
+            self._large.add(obj)
+            return
+        cells = self._cells
+        keys = []
+        for cx in xrange(cx1, cx2 + 1):
+            for cy in xrange(cy1, cy2 + 1):
+                key = (cx, cy)
+                keys.append(key)
+                if key in cells:
+                    cells[key].add(obj)
+                else:
+                    cells[key] = set((obj, ))
+        entry[5] = keys
+
+    def _discard(self, obj, entry):
+        keys = entry[5]
+        if keys is None:
+            self._large.discard(obj)
+            return
+        cells = self._cells
+        for key in keys:
+            cell = cells[key]
+            cell.discard(obj)
+            if not cell:
+                del cells[key]
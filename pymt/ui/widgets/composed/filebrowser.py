@@ -1,30 +1,173 @@
 '''
 File browser: a filebrowser view + a popup file browser
+
+The directories are listed in a thread, and the entries are given to the view
+in chunks, on the next frames : opening a directory with thousands of files
+doesn't block the application. Only the widgets of the visible entries are
+created (see :class:`~pymt.ui.widgets.composed.kineticlist.KineticSource`).
+The listings are kept in the `pymt.filebrowser` cache, and used again while
+the modification time of the directory is the same.
 '''
 
 __all__ = (
     'MTFileBrowser', 'MTFileBrowserView',
     'MTFileEntryView', 'MTFileListEntryView',
-    'MTFileIconEntryView'
+    'MTFileIconEntryView', 'DirectoryScanner'
 )
 
 import os
 import re
+import stat
 import pymt
+try:
+    import threading
+except ImportError:
+    import dummy_threading as threading
+try:
+    # python 3.5
+    from os import scandir as _scandir
+except ImportError:
+    try:
+        # scandir module, for older python
+        from scandir import scandir as _scandir
+    except ImportError:
+        _scandir = None
 from pymt.utils import is_color_transparent, curry
+from pymt.cache import Cache
+from pymt.clock import getClock
 from pymt.loader import Loader
 from pymt.graphx import drawCSSRectangle, set_color, drawLabel, drawRoundedRectangle,\
                        getLabel
 from pymt.ui.factory import MTWidgetFactory
 from pymt.ui.widgets.label import MTLabel
 from pymt.ui.widgets.button import MTToggleButton
-from kineticlist import MTKineticList, MTKineticItem
+from kineticlist import MTKineticList, MTKineticItem, KineticSource
 from popup import MTPopup
 
 
 # Search icons in data/icons/filetype
 icons_filetype_dir = os.path.join(pymt.pymt_data_dir, 'icons', 'filetype')
 
+# path -> (modification time, list of (name, is_dir))
+Cache.register('pymt.filebrowser', limit=20, timeout=300)
+
+def _listdir(path):
+    '''(internal) Yield (name, is_dir) for each entry of a directory. With
+    scandir, the type of the entry is often known without any stat call.'''
+    if _scandir is not None:
+        for entry in _scandir(path):
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            yield entry.name, is_dir
+        return
+    for name in os.listdir(path):
+        try:
+            is_dir = stat.S_ISDIR(os.stat(os.path.join(path, name)).st_mode)
+        except OSError:
+            is_dir = False
+        yield name, is_dir
+
+def _get_mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class DirectoryScanner(object):
+    '''List a directory in a thread. The entries (name, is_dir) are
+    available in chunks with :func:`pop_entries`. When the listing is
+    complete, it's stored in the `pymt.filebrowser` cache.
+
+    :Parameters:
+        `path` : str
+            Directory to list
+        `chunk_size` : int, default to 500
+            Number of entries in a chunk
+    '''
+
+    def __init__(self, path, chunk_size=500):
+        self.path = path
+        self.chunk_size = chunk_size
+        #: True when all the entries are listed (or an error happened)
+        self.done = False
+        #: OSError raised by the listing, if any
+        self.error = None
+        self.cancelled = False
+        self._mtime = _get_mtime(path)
+        self._entries = []
+        self._pending = []
+        self._stored = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self.run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    @staticmethod
+    def get_listing(path):
+        '''Return the cached entries of `path`, or None if the directory is
+        not in the cache or has been modified.'''
+        listing = Cache.get('pymt.filebrowser', path)
+        if listing is None or listing[0] != _get_mtime(path):
+            return None
+        return listing[1]
+
+    def run(self):
+        chunk = []
+        try:
+            try:
+                for entry in _listdir(self.path):
+                    if self.cancelled:
+                        return
+                    chunk.append(entry)
+                    if len(chunk) >= self.chunk_size:
+                        self._push(chunk)
+                        chunk = []
+            except OSError, e:
+                pymt.pymt_logger.warning('FileBrowser: unable to list %s: %s' %
+                                         (self.path, e))
+                self.error = e
+        finally:
+            self._push(chunk, done=True)
+
+    def _push(self, chunk, done=False):
+        self._lock.acquire()
+        try:
+            self._entries.extend(chunk)
+            self._pending.extend(chunk)
+            if done:
+                self.done = True
+        finally:
+            self._lock.release()
+
+    def pop_entries(self):
+        '''Return a tuple (entries, done) with the entries listed since the
+        last call. Must be called from the main thread.'''
+        self._lock.acquire()
+        try:
+            entries = self._pending
+            self._pending = []
+            done = self.done
+        finally:
+            self._lock.release()
+        # the cache is not thread safe, store the listing from here
+        if done and not self._stored and self.error is None and \
+           not self.cancelled and self._mtime is not None:
+            self._stored = True
+            Cache.append('pymt.filebrowser', self.path,
+                         (self._mtime, self._entries))
+        return entries, done
+
+    def cancel(self):
+        '''Stop the listing'''
+        self.cancelled = True
+
+    def join(self, timeout=None):
+        '''Wait the end of the listing'''
+        self._thread.join(timeout)
+
 class FileTypeFactory:
     '''
     FileType Factory: Maintains a Dictionary of all filetypes and its icons.
@@ -57,20 +200,36 @@ class FileTypeFactory:
             return FileTypeFactory.__filetypes__['unknown']
 
 class MTFileEntryView(MTKineticItem):
-    '''Base view class for every file entry'''
+    '''Base view class for every file entry. The entries are reused for
+    other files when the view is scrolled, see :func:`set_entry`.'''
+
+    #: Size of the entries, used to layout them before their creation
+    item_size = (100, 100)
+
+    #: Number of entries in a row, if the browser don't set it
+    w_limit = 1
+
     def __init__(self, **kwargs):
         super(MTFileEntryView, self).__init__(**kwargs)
         self.type_image = None
-        self.filename   = kwargs.get('filename')
         self.browser    = kwargs.get('browser')
-        self.label_txt  = kwargs.get('label')
         self.selected   = False
-
+        self.set_entry(kwargs.get('label'), kwargs.get('filename'),
+                       kwargs.get('is_dir'))
+
+    def set_entry(self, label, filename, is_dir=None):
+        '''Show another file in this entry. If `is_dir` is None, the
+        filesystem is checked.'''
+        if is_dir is None:
+            is_dir = os.path.isdir(filename)
+        self.label_txt  = label
+        self.filename   = filename
+        self.is_dir     = is_dir
         self.get_image_for_filename()
 
     def get_image_for_filename(self):
         '''Return image for current filename'''
-        if os.path.isdir(self.filename):
+        if self.is_dir:
             self.type_image = FileTypeFactory.get('folder')
         else:
             ext = self.label_txt.split('.')[-1]
@@ -88,14 +247,18 @@ class MTFileEntryView(MTKineticItem):
 
 class MTFileListEntryView(MTFileEntryView):
     '''A list-view for file entries'''
+
+    item_size = (200, 25)
+
     def __init__(self, **kwargs):
         super(MTFileListEntryView, self).__init__(**kwargs)
         self.height         = 25
+        self.font_size = self.style['font-size']
+
+    def get_image_for_filename(self):
+        super(MTFileListEntryView, self).get_image_for_filename()
         self.image          = Loader.image(self.type_image)
         self.image.scale    = 0.5
-        if self.browser._w_limit is None:
-            self.browser.w_limit    = 1
-        self.font_size = self.style['font-size']
 
     def draw(self):
         pos = self.image.width, self.y
@@ -116,13 +279,34 @@ class MTFileListEntryView(MTFileEntryView):
 
 
 class MTFileIconEntryView(MTFileEntryView):
-    '''An icon-view for file entries'''
+    '''An icon-view for file entries. If the `thumbnails` option of the
+    browser is activated, the images are shown instead of their icon.'''
+
+    item_size = (80, 80)
+
+    w_limit = 4
+
+    #: Extensions of the files shown as thumbnails
+    thumbnail_extensions = ('jpg', 'jpeg', 'png', 'bmp')
+
+    #: Maximum size of the thumbnails
+    thumbnail_size = 64
+
     def __init__(self, **kwargs):
         super(MTFileIconEntryView, self).__init__(**kwargs)
-        self.size           = (80, 80)
-        self.image          = Loader.image(self.type_image)
-        if self.browser._w_limit is None:
-            self.browser.w_limit = 4
+        self.size           = self.item_size
+
+    def get_image_for_filename(self):
+        super(MTFileIconEntryView, self).get_image_for_filename()
+        ext = self.label_txt.split('.')[-1].lower()
+        if not self.is_dir and ext in self.thumbnail_extensions and \
+           getattr(self.browser, 'thumbnails', False):
+            # only the visible entries exist, the thumbnails of the
+            # hidden files are never loaded.
+            self.image      = Loader.image(self.filename, priority=1,
+                                           max_size=self.thumbnail_size)
+        else:
+            self.image      = Loader.image(self.type_image)
 
     def draw(self):
         if self.selected:
@@ -153,12 +337,20 @@ class MTFileBrowserView(MTKineticList):
             Allow multiple selection of files
         `invert_order` : bool, default to False
             Indicates whether the order the files are displayed in should be reversed
+        `thumbnails` : bool, default to False
+            Show the images as thumbnails, loaded with the
+            :class:`~pymt.loader.Loader`
+        `chunk_size` : int, default to 500
+            Number of entries added to the view at once while a directory is
+            listed
 
     :Events:
         `on_path_change` : (str)
             Fired when path changed
         `on_selection_change` : list of str
             Fired when selection change
+        `on_scan_complete` : (str)
+            Fired when all the entries of the path are in the view
     '''
     def __init__(self, **kwargs):
         kwargs.setdefault('deletable', False)
@@ -169,92 +361,131 @@ class MTFileBrowserView(MTKineticList):
         kwargs.setdefault('view', MTFileIconEntryView)
         kwargs.setdefault('filters', [])
         kwargs.setdefault('multipleselection', False)
+        kwargs.setdefault('thumbnails', False)
+        kwargs.setdefault('chunk_size', 500)
 
         self._w_limit = kwargs.get('w_limit', None)
+        if self._w_limit is None:
+            kwargs['w_limit'] = kwargs.get('view').w_limit
+        kwargs['source'] = KineticSource(factory=self._create_entry,
+                                         update=self._update_entry,
+                                         item_size=kwargs.get('view').item_size)
 
         super(MTFileBrowserView, self).__init__(**kwargs)
 
         self.register_event_type('on_path_change')
         self.register_event_type('on_selection_change')
+        self.register_event_type('on_scan_complete')
 
         self._selection     = []
         self._path          = '(invalid path)'
+        self._scanner       = None
+        # sorted (is_file, name, filename) of the path, without '..'
+        self._entries       = []
         self.show_hidden    = kwargs.get('show_hidden')
         self.view           = kwargs.get('view')
         self.filters        = kwargs.get('filters')
         self.multipleselection = kwargs.get('multipleselection')
         self.invert_order = kwargs.get('invert_order', False)
+        self.thumbnails     = kwargs.get('thumbnails')
+        self.chunk_size     = kwargs.get('chunk_size')
 
         # only at the end, set path to the user path
         self.path           = kwargs.get('path')
 
     def update(self):
         '''Update the content of view. You must call this function after
-        any change of a property. (except path.)'''
-        # remove all actual entries
+        any change of a property. (except path.)
+
+        The listing of the path is used from the cache if the directory has
+        not been modified, or done in a thread.'''
+        self._stop_scan()
+        # remove all actual entries, and the widgets of the previous view
         self.clear()
+        self._pool = []
         self.selection = []
+        self._entries = []
+        if self._w_limit is None:
+            self.w_limit = self.view.w_limit
+        self.source.item_size = self.view.item_size
+
+        listing = DirectoryScanner.get_listing(self.path)
+        if listing is not None:
+            self._add_entries(listing)
+            self.dispatch_event('on_scan_complete', self.path)
+            return
+        self._update_source()
+        self._scanner = DirectoryScanner(self.path, self.chunk_size)
+        getClock().schedule_interval(self._poll_scan, 0)
 
-        children = []
-        listfiles = os.listdir(self.path)
-        listfiles.sort()
-
-        # add each file from directory
-        # only files are filtred with filters
-        for name in reversed(listfiles):
-            filename = os.path.join(self.path, name)
-
+    def _stop_scan(self):
+        if self._scanner is None:
+            return
+        self._scanner.cancel()
+        self._scanner = None
+        getClock().unschedule(self._poll_scan)
+
+    def _poll_scan(self, *largs):
+        '''(internal) Add the entries found by the scanner since the last
+        frame'''
+        scanner = self._scanner
+        if scanner is None:
+            return False
+        entries, done = scanner.pop_entries()
+        if entries:
+            self._add_entries(entries)
+        if done:
+            self._scanner = None
+            self.dispatch_event('on_scan_complete', self.path)
+            return False
+
+    def _add_entries(self, entries):
+        '''(internal) Add a list of (name, is_dir) to the view'''
+        path = self.path
+        filters = self.filters
+        show_hidden = self.show_hidden
+        items = self._entries
+        for name, is_dir in entries:
             # filter on hidden file if requested
-            if not self.show_hidden:
-                if name != '..' and name[0] == '.':
-                    continue
-
-            if os.path.isdir(filename):
+            if not show_hidden and name[0] == '.':
                 continue
-
-            # filtering
-            if len(self.filters):
-                match = False
-                for filter in self.filters:
+            # filtering, only files are filtred with filters
+            if not is_dir and filters:
+                for filter in filters:
                     if re.match(filter, name):
-                        match = True
-                if not match:
+                        break
+                else:
                     continue
+            items.append((not is_dir, name, os.path.join(path, name)))
+        # directories first, then files. The list is already sorted, except
+        # the new entries: the sort is fast.
+        items.sort()
+        self._update_source()
 
-            # add this file as new file.
-            children.append(self.view(
-                label=name, filename=filename,
-                browser=self, size=self.size
-            ))
-
-        # second time, do directories
-        for name in reversed(listfiles):
-            filename = os.path.join(self.path, name)
-
-            # filter on hidden file if requested
-            if not self.show_hidden:
-                if name != '..' and name[0] == '.':
-                    continue
-
-            if not os.path.isdir(filename):
-                continue
-
-            # add this file as new file.
-            children.append(self.view(
-                label=name, filename=filename,
-                browser=self, size=self.size
-            ))
-
+    def _update_source(self):
         # add always "to parent"
-        children.append(self.view(
-            label='..', filename=os.path.join(self.path, '../'),
-            browser=self, size=self.size
-        ))
-
-        # attach handlers
-        for child in children:
-            child.push_handlers(on_press=curry(self._on_file_selected, child))
-            self.add_widget(child, front=self.invert_order)
+        parent = (False, '..', os.path.join(self.path, '../'))
+        if self.invert_order:
+            items = self._entries[::-1]
+            items.append(parent)
+        else:
+            items = [parent] + self._entries
+        self.source.set_items(items)
+
+    def _create_entry(self, item):
+        '''(internal) Create the widget of an entry'''
+        is_file, name, filename = item
+        child = self.view(label=name, filename=filename, is_dir=not is_file,
+                          browser=self, size=self.view.item_size)
+        child.push_handlers(on_press=curry(self._on_file_selected, child))
+        child.selected = filename in self._selection
+        return child
+
+    def _update_entry(self, child, item):
+        '''(internal) Show another entry in a widget'''
+        is_file, name, filename = item
+        child.set_entry(name, filename, not is_file)
+        child.selected = filename in self._selection
 
     def _get_path(self):
         return self._path
@@ -277,7 +508,7 @@ class MTFileBrowserView(MTKineticList):
     def _on_file_selected(self, fileview, touch):
         # auto change for directory
         filename = fileview.filename
-        if os.path.isdir(filename) and touch.is_double_tap:
+        if fileview.is_dir and touch.is_double_tap:
             # Enter that directory
             self.path = filename
             # Forget about any selection we did before
@@ -319,6 +550,9 @@ class MTFileBrowserView(MTKineticList):
     def on_path_change(self, path):
         pass
 
+    def on_scan_complete(self, path):
+        pass
+
 
 class MTFileBrowserToggle(MTToggleButton):
     '''Internal Button for FileBrowser'''
@@ -357,6 +591,8 @@ class MTFileBrowser(MTPopup):
             Indicates the default view that is used to display icons and filenames
         `invert_order` : bool, default to False
             Indicates whether the order the files are displayed in should be reversed
+        `thumbnails` : bool, default to False
+            Show the images as thumbnails
 
     :Events:
         `on_select`
@@ -373,6 +609,7 @@ class MTFileBrowser(MTPopup):
         kwargs.setdefault('view', MTFileIconEntryView)
         kwargs.setdefault('invert_order', False)
         kwargs.setdefault('show_toggles', True)
+        kwargs.setdefault('thumbnails', False)
         super(MTFileBrowser, self).__init__(**kwargs)
 
         self.register_event_type('on_select')
@@ -384,7 +621,8 @@ class MTFileBrowser(MTPopup):
         # File View
         self.view = MTFileBrowserView(size_hint=(1,1), filters=kwargs.get('filters'),
                 multipleselection=kwargs.get('multipleselection'), view=kwargs.get('view'),
-                invert_order=kwargs.get('invert_order'))
+                invert_order=kwargs.get('invert_order'),
+                thumbnails=kwargs.get('thumbnails'))
         self.view.push_handlers(on_path_change=self._on_path_change)
         self.add_widget(self.view, True)
 
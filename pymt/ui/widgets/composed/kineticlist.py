@@ -1,13 +1,34 @@
 '''
 Kinetic List: Custom list with kinetic interaction
+
+For a long list (thousands of items), don't add the widgets yourself : give
+the items to a :class:`KineticSource`. Only the widgets of the visible items
+are created, and they are reused for other items when the list is scrolled ::
+
+    source = KineticSource(items=['item %d' % x for x in xrange(20000)],
+                           item_size=(200, 40))
+    klist = MTKineticList(size=(220, 400), source=source)
+
+A custom factory and update function can be used to create other widgets ::
+
+    def create(item):
+        return MTKineticImage(filename=item)
+
+    def update(widget, item):
+        widget.filename = item
+
+    source = KineticSource(items=filenames, factory=create, update=update,
+                           item_size=(128, 128))
 '''
 
 __all__ = (
     'MTKineticList', 'MTKineticObject',
-    'MTKineticItem', 'MTKineticImage'
+    'MTKineticItem', 'MTKineticImage',
+    'KineticSource'
 )
 
 import pymt
+from bisect import bisect_left, bisect_right
 from OpenGL.GL import *
 from ....utils import boundary
 from ....graphx import set_color, drawRectangle
@@ -63,6 +84,13 @@ class MTKineticList(MTStencilContainer):
         `trigger_distance` : int, default to 3
             Maximum trigger distance to dispatch event on children
             (this mean if you move too much, trigger will not happen.)
+        `source` : KineticSource, default to None
+            If set, the list is virtualized : the widgets are created by the
+            source, only for the visible items. Don't use add_widget() on a
+            virtualized list.
+        `overscan` : int, default to 1
+            Number of rows created before and after the visible rows, for a
+            virtualized list.
 
     :Styles:
         `bg-color` : color
@@ -91,6 +119,8 @@ class MTKineticList(MTStencilContainer):
         kwargs.setdefault('searchable', True)
         kwargs.setdefault('trigger_distance', 3)
         kwargs.setdefault('align', 'center')
+        kwargs.setdefault('source', None)
+        kwargs.setdefault('overscan', 1)
 
         super(MTKineticList, self).__init__(**kwargs)
 
@@ -108,6 +138,8 @@ class MTKineticList(MTStencilContainer):
         self.h_limit    = kwargs.get('h_limit')
         self.align      = kwargs.get('align')
         self.trigger_distance = kwargs.get('trigger_distance')
+        self.source     = kwargs.get('source')
+        self.overscan   = kwargs.get('overscan')
 
         if self.w_limit and self.h_limit:
             raise Exception('You cannot limit both axes')
@@ -130,6 +162,17 @@ class MTKineticList(MTStencilContainer):
         self._scrollbar_index = 0
         self._scrollbar_size = 0
 
+        # Virtualized list: index -> widget of the visible items, widget ->
+        # index, and widgets ready to be reused.
+        self._bound = {}
+        self._indices = {}
+        self._pool = []
+        # position and size of each row, calculated only when the items or
+        # the size change.
+        self._rows = [0]
+        self._rows_size = []
+        self._rows_key = None
+
         # create the UI part.
         self._create_ui()
 
@@ -186,6 +229,9 @@ class MTKineticList(MTStencilContainer):
         pass
 
     def clear(self):
+        if self.source is not None:
+            self._release_all()
+            self.source.set_items([])
         self.children = SafeList()
         self.pchildren = SafeList()
         self.xoffset = self.yoffset = 0
@@ -195,6 +241,15 @@ class MTKineticList(MTStencilContainer):
         self.pchildren.append(widget)
 
     def remove_widget(self, widget):
+        if self.source is not None:
+            # a deleted item: remove it from the source
+            index = self._indices.get(widget)
+            if index is None:
+                return
+            self.source.remove(index)
+            self.dispatch_event('on_delete', widget)
+            self._release(widget)
+            return
         super(MTKineticList, self).remove_widget(widget)
         if widget in self.pchildren:
             self.pchildren.remove(widget)
@@ -241,6 +296,9 @@ class MTKineticList(MTStencilContainer):
 
     def search(self, pattern, attr):
         '''Apply a search pattern to the current set of children'''
+        if self.source is not None:
+            self.source.search(pattern, attr)
+            return
         result = self.filter(pattern, attr)
         self.children.clear()
         for item in result:
@@ -248,6 +306,9 @@ class MTKineticList(MTStencilContainer):
 
     def endsearch(self):
         '''Resets the children set to the full set'''
+        if self.source is not None:
+            self.source.search('')
+            return
         self.children.clear()
         for item in self.pchildren:
             self.children.append(item)
@@ -267,6 +328,13 @@ class MTKineticList(MTStencilContainer):
         return total
 
     def goto_head(self):
+        if self.source is not None:
+            self._update_rows()
+            if not self.h_limit:
+                self.yoffset = -self._last_content_size + self.height
+            else:
+                self.xoffset = -self._last_content_size + self.width
+            return
         if not self.h_limit:
             self.yoffset = -self._get_total_width(self.children, 'height')/self.w_limit + self.size[1] - 100
         else:
@@ -274,6 +342,9 @@ class MTKineticList(MTStencilContainer):
 
     def do_layout(self):
         '''Apply layout to all the items'''
+        if self.source is not None:
+            self._do_virtual_layout()
+            return
 
         t = index = 0
 
@@ -363,6 +434,153 @@ class MTKineticList(MTStencilContainer):
             # Increment index
             index += 1
 
+    def _update_rows(self):
+        '''(internal) Calculate the position of the rows of a virtualized
+        list, if the items or the size have changed.'''
+        source = self.source
+        key = (source.version, self.width, self.height, self.w_limit,
+               self.h_limit, self.padding_x, self.padding_y)
+        if key == self._rows_key:
+            return
+        self._rows_key = key
+
+        # the index of the widgets may have changed
+        self._release_all()
+
+        if self.w_limit:
+            limit, axis, padding = self.w_limit, 1, self.padding_y
+        else:
+            limit, axis, padding = self.h_limit, 0, self.padding_x
+        count = len(source)
+        get_item_size = source.get_item_size
+        rows = [0]
+        rows_size = []
+        size = 0
+        for i in xrange(0, count, limit):
+            h = max([get_item_size(z)[axis]
+                     for z in xrange(i, min(i + limit, count))])
+            rows_size.append(h)
+            size += h + padding
+            rows.append(size)
+        self._rows = rows
+        self._rows_size = rows_size
+        self._last_content_size = size
+
+    def _do_virtual_layout(self):
+        '''(internal) Same as do_layout(), but only for the visible rows'''
+        self._update_rows()
+
+        source      = self.source
+        count       = len(source)
+        inverse     = 0
+        limit       = self.w_limit
+        axis        = 0
+        w2          = self.width / 2.
+        xoffset     = self.xoffset
+        sx          = self.x
+        y           = self.y + self.yoffset
+        padding_x   = self.padding_x
+        padding_y   = self.padding_y
+        start       = self.y
+        length      = self.height
+        width       = self.width
+
+        # inverse
+        if not self.w_limit:
+            inverse     = 1
+            limit       = self.h_limit
+            axis        = 1
+            w2          = self.height / 2.
+            xoffset     = self.yoffset
+            sx          = self.y
+            y           = self.x + self.xoffset
+            padding_x   = self.padding_y
+            padding_y   = self.padding_x
+            start       = self.x
+            length      = self.width
+            width       = self.height
+
+        # search the visible rows
+        y += padding_y
+        rows = self._rows
+        nrows = len(self._rows_size)
+        first = max(0, bisect_right(rows, start - y) - 1 - self.overscan)
+        last = min(nrows, bisect_left(rows, start + length - y) +
+                   self.overscan)
+
+        # release the widgets that are not visible anymore
+        first_index = first * limit
+        last_index = min(last * limit, count)
+        for index, widget in self._bound.items():
+            if index < first_index or index >= last_index:
+                self._release(widget)
+
+        get_item_size = source.get_item_size
+        for row in xrange(first, last):
+            t = row * limit
+            indices = xrange(t, min(t + limit, count))
+            ry = y + rows[row]
+
+            # reset x for this row.
+            if self.align == 'center':
+                total = 0
+                for index in indices:
+                    total += get_item_size(index)[axis] + padding_x
+                x = sx + w2 + xoffset - total / 2.
+            elif self.align == 'left':
+                x = 0
+            elif self.align == 'right':
+                x = width - get_item_size(t)[axis] - xoffset
+
+            for index in indices:
+                child = self._get_widget(index)
+                if not inverse:
+                    child.kx = x + padding_x
+                    child.ky = ry
+                else:
+                    child.ky = x + padding_x
+                    child.kx = ry
+                x += get_item_size(index)[axis] + padding_x
+
+    def _get_widget(self, index):
+        '''(internal) Return the widget of an item, create or reuse one if
+        needed'''
+        widget = self._bound.get(index)
+        if widget is not None:
+            return widget
+        if self._pool:
+            widget = self._pool.pop()
+            self.source.update_widget(widget, index)
+        else:
+            widget = self.source.create_widget(index)
+        widget.size = self.source.get_item_size(index)
+        if isinstance(widget, MTKineticObject):
+            widget.xoffset = widget.yoffset = 0
+            if widget.deletable:
+                if self.deletable and self.db.get_state() == 'down':
+                    widget.show_delete()
+                else:
+                    widget.db_alpha = 0
+                    widget.db.hide()
+        self._bound[index] = widget
+        self._indices[widget] = index
+        super(MTKineticList, self).add_widget(widget)
+        return widget
+
+    def _release(self, widget):
+        '''(internal) Remove a widget from the list, and keep it for another
+        item'''
+        index = self._indices.pop(widget, None)
+        if index is None:
+            return
+        del self._bound[index]
+        super(MTKineticList, self).remove_widget(widget)
+        self._pool.append(widget)
+
+    def _release_all(self):
+        for widget in self._bound.values():
+            self._release(widget)
+
     def on_touch_down(self, touch):
         if not self.collide_point(touch.x, touch.y):
             return
@@ -655,6 +873,124 @@ class MTKineticImage(MTImageButton, MTKineticObject):
         if self.deletable and self.db.visible and self.db.on_touch_down(touch):
             return True
 
+class KineticSource(object):
+    '''Items of a virtualized :class:`MTKineticList`. The source create the
+    widgets of the visible items, and update them to show another item when
+    they are reused.
+
+    :Parameters:
+        `items` : list, default to []
+            List of items. An item can be anything, it's passed to the
+            factory.
+        `factory` : callable, default to None
+            Function called with an item, that return a new widget. By
+            default, a MTKineticItem is created with the item as label.
+        `update` : callable, default to None
+            Function called with (widget, item) to show another item in a
+            widget created by the factory. By default, the label of the
+            widget is changed.
+        `item_size` : tuple, default to (100, 100)
+            Size of the widgets.
+        `text` : callable, default to None
+            Function called with (item, attr) to get the text used for the
+            search. By default, the `attr` key of a dict or attribute of an
+            object is used, or the item itself.
+    '''
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('items', [])
+        kwargs.setdefault('factory', None)
+        kwargs.setdefault('update', None)
+        kwargs.setdefault('item_size', (100, 100))
+        kwargs.setdefault('text', None)
+        super(KineticSource, self).__init__()
+        self.factory    = kwargs.get('factory')
+        self.update     = kwargs.get('update')
+        self.item_size  = kwargs.get('item_size')
+        self.text       = kwargs.get('text')
+        #: Incremented each time the items change
+        self.version    = 0
+        self.items      = []
+        # index of the items matching the search, None if no search is done
+        self._view      = None
+        self._pattern   = ''
+        self._attr      = 'label'
+        self.set_items(kwargs.get('items'))
+
+    def __len__(self):
+        if self._view is None:
+            return len(self.items)
+        return len(self._view)
+
+    def set_items(self, items):
+        '''Replace all the items'''
+        self.items = list(items)
+        self._apply_search()
+
+    def append(self, item):
+        '''Add an item at the end'''
+        self.items.append(item)
+        self._apply_search()
+
+    def remove(self, index):
+        '''Remove the item at `index` (in the search result)'''
+        if self._view is not None:
+            index = self._view[index]
+        del self.items[index]
+        self._apply_search()
+
+    def get_item(self, index):
+        '''Return the item at `index` (in the search result)'''
+        if self._view is None:
+            return self.items[index]
+        return self.items[self._view[index]]
+
+    def get_item_size(self, index):
+        '''Return the size of the widget of an item. Override it if the
+        items don't have the same size.'''
+        return self.item_size
+
+    def get_text(self, item, attr):
+        '''Return the text of an item used for the search'''
+        if self.text is not None:
+            return self.text(item, attr)
+        if isinstance(item, dict):
+            return item.get(attr, '')
+        return getattr(item, attr, item)
+
+    def create_widget(self, index):
+        '''Create the widget of an item'''
+        item = self.get_item(index)
+        if self.factory is not None:
+            return self.factory(item)
+        return MTKineticItem(label=str(item), size=self.get_item_size(index))
+
+    def update_widget(self, widget, index):
+        '''Update a widget to show another item'''
+        item = self.get_item(index)
+        if self.update is not None:
+            self.update(widget, item)
+        else:
+            widget.label = str(item)
+
+    def search(self, pattern, attr='label'):
+        '''Keep only the items with `pattern` in their text. An empty pattern
+        show all the items.'''
+        self._pattern = pattern
+        self._attr = attr
+        self._apply_search()
+
+    def _apply_search(self):
+        pattern, attr = self._pattern, self._attr
+        if not pattern:
+            self._view = None
+        else:
+            get_text = self.get_text
+            self._view = [i for i, item in enumerate(self.items)
+                          if pattern in str(get_text(item, attr))]
+        self.version += 1
+
+
 MTWidgetFactory.register('MTKineticObject', MTKineticObject)
 MTWidgetFactory.register('MTKineticList', MTKineticList)
 MTWidgetFactory.register('MTKineticItem', MTKineticItem)
@@ -1,12 +1,45 @@
 '''
 Abstract layout: layout base for implementation
+
+A layout is done in two passes :
+
+    * measure: the minimum size of the layouts is calculated, from the
+      bottom to the top of the tree (:func:`MTAbstractLayout.update_minimum_size`)
+    * arrange: the children are positioned and resized, from the top to the
+      bottom of the tree (:func:`MTAbstractLayout.do_layout`)
+
+When a layout change (a child is added, a child change his size or size hint,
+the layout is moved or resized...), it's only marked as invalid, and his
+parent layouts are marked too. The tree is done once per frame, before the
+drawing, starting from the top layout. The minimum size of a layout is
+calculated again only if one of his children have changed.
 '''
-__all__ = ['MTAbstractLayout']
+__all__ = ['MTAbstractLayout', 'flush_layouts']
 
 from ..widget import MTWidget
 from ...animation import Animation, AnimationAlpha
 from ....graphx import set_color, drawRectangle
 
+# top layouts of the invalidated trees
+_dirty_roots = set()
+
+def flush_layouts(max_pass=4):
+    '''Do the layout pass of all the invalidated layouts. This is called by
+    the window on each frame, before the drawing.
+
+    :Parameters:
+        `max_pass` : int, default to 4
+            If layouts are invalidated during the pass (by an on_layout
+            handler for example), a new pass is done, up to `max_pass`. The
+            remaining layouts will be done on the next frame.
+    '''
+    while _dirty_roots and max_pass > 0:
+        max_pass -= 1
+        roots = list(_dirty_roots)
+        _dirty_roots.clear()
+        for layout in roots:
+            layout.do_layout_pass()
+
 class MTAbstractLayout(MTWidget):
     '''Abstract layout. Base class used to implement layout.
 
@@ -44,8 +77,15 @@ class MTAbstractLayout(MTWidget):
         self.animation_duration = kwargs.get('animation_duration')
         self.auto_layout        = kwargs.get('auto_layout')
         self.bg_color           = kwargs.get('bg_color')
+        # the layout must be done
         self.need_update        = False
         self.need_update_set    = False
+        # the minimum size must be calculated
+        self._need_measure      = False
+        # a children layout must be done
+        self._need_visit        = False
+        # ignore the changes of the children, done by our do_layout()
+        self._arranging         = False
 
 
         self.register_event_type('on_layout')
@@ -79,15 +119,94 @@ class MTAbstractLayout(MTWidget):
 
     def add_widget(self, widget, front=True, do_layout=None):
         super(MTAbstractLayout, self).add_widget(widget, front=front)
+        # the size of the layout is available just after the add
         self.update_minimum_size()
         if do_layout or (not do_layout and self.auto_layout):
-            self.need_update = True
+            self.invalidate()
 
     def remove_widget(self, widget, do_layout=None):
         super(MTAbstractLayout, self).remove_widget(widget)
         self.need_layout = True
         if do_layout or (not do_layout and self.auto_layout):
-            self.need_update = True
+            self.invalidate()
+
+    def invalidate(self, measure=True):
+        '''Mark the layout to be done on the next layout pass, and mark the
+        parent layouts.
+
+        :Parameters:
+            `measure` : bool, default to True
+                If True, the minimum size of the layout and of his parents
+                will be calculated again.
+        '''
+        self.need_update = True
+        if measure:
+            self._need_measure = True
+        node = self
+        parent = self.parent
+        while isinstance(parent, MTAbstractLayout):
+            # the parent is doing his layout, and will check his children
+            # after.
+            if parent._arranging:
+                parent._need_visit = True
+                return
+            if measure:
+                # the minimum size of the parent depend of our minimum size
+                if parent._need_measure:
+                    return
+                parent._need_measure = True
+                parent.need_update = True
+            elif parent._need_visit or parent.need_update:
+                return
+            parent._need_visit = True
+            node = parent
+            parent = parent.parent
+        _dirty_roots.add(node)
+
+    def child_invalidated(self, child):
+        '''Called by a child when his size or size hint have changed'''
+        if self._arranging:
+            return
+        if isinstance(child, MTAbstractLayout):
+            # a layout use his minimum size, not his size
+            self.invalidate(measure=False)
+            return
+        hint_x, hint_y = child.size_hint
+        self.invalidate(measure=hint_x is None or hint_y is None)
+
+    def do_layout_pass(self):
+        '''Do the measure and the arrange pass of the layout and of the
+        invalidated children layouts.'''
+        _dirty_roots.discard(self)
+        if self._need_measure:
+            self._measure()
+        self._arrange()
+
+    def _measure(self):
+        for child in self.children:
+            if isinstance(child, MTAbstractLayout) and child._need_measure:
+                child._measure()
+        self._need_measure = False
+        self.update_minimum_size()
+
+    def _arrange(self):
+        need_update = self.need_update
+        self.need_update = self._need_visit = False
+        if need_update:
+            self._arranging = True
+            try:
+                self.do_layout()
+            finally:
+                self._arranging = False
+            # the children invalidated by do_layout() are checked now
+            self._need_visit = False
+        for child in self.children[:]:
+            if not isinstance(child, MTAbstractLayout):
+                continue
+            if child._need_measure:
+                child._measure()
+            if child.need_update or child._need_visit:
+                child._arrange()
 
     def reposition_child(self, child, **kwargs):
         if self.animation_type and len(kwargs):
@@ -119,13 +238,15 @@ class MTAbstractLayout(MTWidget):
 
     def on_update(self):
         super(MTAbstractLayout, self).on_update()
-        if self.need_update:
-            self.need_update = False
-            self.update_minimum_size()
-            self.do_layout()
+        # the children layouts are done by the top layout
+        if isinstance(self.parent, MTAbstractLayout):
+            return
+        if self.need_update or self._need_visit or self._need_measure:
+            self.do_layout_pass()
 
     def update(self):
-        self.need_update = True
+        '''Mark the layout to be done again, without measure'''
+        self.invalidate(measure=False)
 
     def on_layout(self):
         pass
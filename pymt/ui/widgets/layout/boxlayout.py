@@ -47,7 +47,7 @@ class MTBoxLayout(MTAbstractLayout):
             return
         elif orientation in ['horizontal', 'vertical']:
             self._orientation = orientation
-            self.do_layout()
+            self.invalidate()
         else:
             raise ValueError("'%s' is not a valid orientation for BoxLayout!  Allowed values are: 'horizontal' and 'vertical'." % orientation)
     orientation = property(_get_orientation, _set_orientation, doc="Orientation of widget inside layout, can be `horizontal` or `vertical`")
@@ -291,6 +291,7 @@ class MTScatter(MTWidget):
             self._transform_gl = self._transform.T.tolist() #for openGL
             self._transform_inv_gl = self._transform.T.tolist() #for openGL
             self.dispatch_event('on_transform')
+            self._update_parent_index()
 
     def update_transformation(self):
         if not self._touches:
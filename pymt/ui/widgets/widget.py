@@ -14,10 +14,11 @@ from ...event import EventDispatcher
 from ...logger import pymt_logger
 from ...base import getCurrentTouches
 from ...input import Touch
-from ...utils import SafeList
+from ...utils import SafeList, StyleDict
 from ..animation import Animation, AnimationAlpha
 from ..factory import MTWidgetFactory
 from ..colors import css_get_style
+from ..spatialindex import SpatialIndex
 from ...graphx import set_color, drawCSSRectangle
 
 _id_2_widget = {}
@@ -60,6 +61,9 @@ class MTWidget(EventDispatcher):
             Add inline CSS
         `cls` : str, default is ''
             CSS class of this widget
+        `spatial_index` : bool, default is False
+            Use a spatial index to dispatch touch down/move only to the
+            children under the touch. Check :mod:`pymt.ui.spatialindex`.
 
     :Events:
         `on_update` ()
@@ -84,7 +88,7 @@ class MTWidget(EventDispatcher):
                  '_parent_window_source', '_parent_window',
                  '_parent_layout_source', '_parent_layout',
                  '_size_hint', '_id', '_parent',
-                 '_visible', '_inline_style',
+                 '_visible', '_inline_style', '_spatial_index',
                  '__animationcache__',
                  '__weakref__')
 
@@ -106,6 +110,7 @@ class MTWidget(EventDispatcher):
         kwargs.setdefault('draw_children', True)
         kwargs.setdefault('cls', '')
         kwargs.setdefault('style', {})
+        kwargs.setdefault('spatial_index', False)
 
         self._id = None
         if 'id' in kwargs:
@@ -119,11 +124,13 @@ class MTWidget(EventDispatcher):
 
         self.__animationcache__   = set()
         self._parent              = None
+        self._spatial_index       = None
         self.children             = SafeList()
         self._visible             = None
         self._size_hint           = kwargs.get('size_hint')
         self.visible              = kwargs.get('visible')
         self.draw_children        = kwargs.get('draw_children')
+        self.spatial_index        = kwargs.get('spatial_index')
 
         # cache for get_parent_window()
         self._parent_layout         = None
@@ -150,7 +157,7 @@ class MTWidget(EventDispatcher):
             self.height = kwargs.get('height')
 
         # apply css
-        self.style = {}
+        self.style = StyleDict()
         self._cls = ''
         self._inline_style = kwargs.get('style')
         # loading is done here automaticly
@@ -210,11 +217,46 @@ class MTWidget(EventDispatcher):
         if self._size_hint == size_hint:
             return False
         self._size_hint = size_hint
+        self._update_parent_layout()
     def _get_size_hint(self):
         return self._size_hint
     size_hint = property(_get_size_hint, _set_size_hint,
                          doc='size_hint is used by layouts to determine size behaviour during layout')
 
+    def _set_spatial_index(self, value):
+        if bool(value) == (self._spatial_index is not None):
+            return
+        if not value:
+            self._spatial_index = None
+            return
+        self._spatial_index = index = SpatialIndex()
+        for w in self.children:
+            index.add(w, w.bbox)
+    def _get_spatial_index(self):
+        return self._spatial_index is not None
+    spatial_index = property(_get_spatial_index, _set_spatial_index,
+                             doc='bool: use a spatial index for touch dispatch')
+
+    @property
+    def bbox(self):
+        '''Return the bounding box of the widget in parent space
+        ((x, y), (width, height))'''
+        return self.pos, self.size
+
+    def _update_parent_index(self):
+        '''Update the bounding box of the widget in the spatial index of his
+        parent, if any'''
+        index = getattr(self._parent, '_spatial_index', None)
+        if index is not None:
+            index.update(self, self.bbox)
+
+    def _update_parent_layout(self):
+        '''Tell the parent layout, if any, that the size or the size hint of
+        the widget have changed'''
+        invalidated = getattr(self._parent, 'child_invalidated', None)
+        if invalidated is not None:
+            invalidated(self)
+
     def apply_css(self, styles):
         '''Called at __init__ time to applied css attribute in current class.
         '''
@@ -222,7 +264,7 @@ class MTWidget(EventDispatcher):
 
     def reload_css(self):
         '''Called when css want to be reloaded from scratch'''
-        self.style = {}
+        self.style = StyleDict()
         style = css_get_style(widget=self)
         self.apply_css(style)
         if len(self._inline_style):
@@ -356,6 +398,8 @@ class MTWidget(EventDispatcher):
             self.children.append(w)
         else:
             self.children.insert(0,w)
+        if self._spatial_index is not None:
+            self._spatial_index.add(w, w.bbox, front=front)
         try:
             w.parent = self
         except:
@@ -370,6 +414,8 @@ class MTWidget(EventDispatcher):
         '''Remove a widget from the children list'''
         if w in self.children:
             self.children.remove(w)
+            if self._spatial_index is not None:
+                self._spatial_index.remove(w)
 
     def on_animation_complete(self, *largs):
         pass
@@ -389,12 +435,20 @@ class MTWidget(EventDispatcher):
             c.dispatch_event('on_move', x, y)
 
     def on_touch_down(self, touch):
-        for w in reversed(self.children[:]):
+        if self._spatial_index is not None:
+            children = self._spatial_index.query(touch.x, touch.y)
+        else:
+            children = reversed(self.children[:])
+        for w in children:
             if w.dispatch_event('on_touch_down', touch):
                 return True
 
     def on_touch_move(self, touch):
-        for w in reversed(self.children[:]):
+        if self._spatial_index is not None:
+            children = self._spatial_index.query(touch.x, touch.y)
+        else:
+            children = reversed(self.children[:])
+        for w in children:
             if w.dispatch_event('on_touch_move', touch):
                 return True
 
@@ -431,36 +485,45 @@ class MTWidget(EventDispatcher):
     def _set_pos(self, x):
         if super(MTWidget, self)._set_pos(x):
             self.dispatch_event('on_move', *self._pos)
+            self._update_parent_index()
             return True
     pos = property(EventDispatcher._get_pos, _set_pos)
 
     def _set_x(self, x):
         if super(MTWidget, self)._set_x(x):
             self.dispatch_event('on_move', *self._pos)
+            self._update_parent_index()
             return True
     x = property(EventDispatcher._get_x, _set_x)
 
     def _set_y(self, x):
         if super(MTWidget, self)._set_y(x):
             self.dispatch_event('on_move', *self._pos)
+            self._update_parent_index()
             return True
     y = property(EventDispatcher._get_y, _set_y)
 
     def _set_size(self, x):
         if super(MTWidget, self)._set_size(x):
             self.dispatch_event('on_resize', *self._size)
+            self._update_parent_index()
+            self._update_parent_layout()
             return True
     size = property(EventDispatcher._get_size, _set_size)
 
     def _set_width(self, x):
         if super(MTWidget, self)._set_width(x):
             self.dispatch_event('on_resize', *self._size)
+            self._update_parent_index()
+            self._update_parent_layout()
             return True
     width = property(EventDispatcher._get_width, _set_width)
 
     def _set_height(self, x):
         if super(MTWidget, self)._set_height(x):
             self.dispatch_event('on_resize', *self._size)
+            self._update_parent_index()
+            self._update_parent_layout()
             return True
     height = property(EventDispatcher._get_height, _set_height)
 
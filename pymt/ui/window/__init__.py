@@ -14,7 +14,7 @@ __all__ = ['BaseWindow', 'MTWindow', 'MTDisplay']
 import os
 from OpenGL.GL import *
 import pymt
-from ...utils import SafeList
+from ...utils import SafeList, StyleDict
 from ...logger import pymt_logger
 from ...base import getCurrentTouches, setWindow, touch_event_listeners
 from ...clock import getClock
@@ -23,7 +23,9 @@ from ...modules import pymt_modules
 from ...event import EventDispatcher
 from ..colors import css_get_style
 from ..factory import MTWidgetFactory
+from ..spatialindex import SpatialIndex
 from ..widgets import MTWidget
+from ..widgets.layout.abstractlayout import flush_layouts
 
 class BaseWindow(EventDispatcher):
     '''BaseWindow is a abstract window widget, for any window implementation.
@@ -106,7 +108,7 @@ class BaseWindow(EventDispatcher):
         setWindow(self)
 
         # apply styles for window
-        self.style = {}
+        self.style = StyleDict()
         style = css_get_style(widget=self)
         self.apply_css(style)
 
@@ -118,6 +120,7 @@ class BaseWindow(EventDispatcher):
         self.children = SafeList()
         self.parent = self
         self.visible = True
+        self._spatial_index = None
 
         # add view
         if 'view' in kwargs:
@@ -198,7 +201,7 @@ class BaseWindow(EventDispatcher):
 
     def reload_css(self):
         '''Called when css want to be reloaded from scratch'''
-        self.style = {}
+        self.style = StyleDict()
         style = css_get_style(widget=self)
         self.apply_css(style)
         if len(self._inline_style):
@@ -250,9 +253,25 @@ class BaseWindow(EventDispatcher):
             glHint(GL_LINE_SMOOTH_HINT, hint)
             glEnable(GL_LINE_SMOOTH)
 
+    def _set_spatial_index(self, value):
+        if bool(value) == (self._spatial_index is not None):
+            return
+        if not value:
+            self._spatial_index = None
+            return
+        self._spatial_index = index = SpatialIndex()
+        for w in self.children:
+            index.add(w, w.bbox)
+    def _get_spatial_index(self):
+        return self._spatial_index is not None
+    spatial_index = property(_get_spatial_index, _set_spatial_index,
+                             doc='bool: use a spatial index for touch dispatch')
+
     def add_widget(self, w):
         '''Add a widget on window'''
         self.children.append(w)
+        if self._spatial_index is not None:
+            self._spatial_index.add(w, w.bbox)
         w.parent = self
 
     def remove_widget(self, w):
@@ -260,6 +279,8 @@ class BaseWindow(EventDispatcher):
         if not w in self.children:
             return
         self.children.remove(w)
+        if self._spatial_index is not None:
+            self._spatial_index.remove(w)
         w.parent = None
 
     def clear(self):
@@ -338,6 +359,9 @@ class BaseWindow(EventDispatcher):
         for w in self.children[:]:
             w.dispatch_event('on_update')
 
+        # do the layouts invalidated during the update
+        flush_layouts()
+
     def on_draw(self):
         '''Event called when window we are drawing window.
         This function are cleaning the buffer with bg-color css,
@@ -361,14 +385,22 @@ class BaseWindow(EventDispatcher):
     def on_touch_down(self, touch):
         '''Event called when a touch is down'''
         touch.scale_for_screen(*self.size)
-        for w in reversed(self.children[:]):
+        if self._spatial_index is not None:
+            children = self._spatial_index.query(touch.x, touch.y)
+        else:
+            children = reversed(self.children[:])
+        for w in children:
             if w.dispatch_event('on_touch_down', touch):
                 return True
 
     def on_touch_move(self, touch):
         '''Event called when a touch move'''
         touch.scale_for_screen(*self.size)
-        for w in reversed(self.children[:]):
+        if self._spatial_index is not None:
+            children = self._spatial_index.query(touch.x, touch.y)
+        else:
+            children = reversed(self.children[:])
+        for w in children:
             if w.dispatch_event('on_touch_move', touch):
                 return True
 
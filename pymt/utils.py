@@ -5,7 +5,7 @@ Utils: generic toolbox
 __all__ = ('intersection', 'difference', 'curry', 'strtotuple',
            'get_color_from_hex', 'get_color_for_pyglet', 'get_random_color',
            'is_color_transparent', 'boundary', 'connect',
-           'deprecated', 'SafeList',
+           'deprecated', 'SafeList', 'freeze', 'StyleDict',
            'serialize_numpy', 'deserialize_numpy',
            'interpolate')
 
@@ -160,6 +160,60 @@ class SafeList(list):
         return iter(self)
 
 
+def freeze(obj):
+    '''Return an hashable version of `obj`, to be used as a key in a cache.
+    The dict are converted to frozenset, and the list to tuple.'''
+    t = type(obj)
+    if t is StyleDict:
+        return obj.key
+    if isinstance(obj, dict):
+        return frozenset([(k, freeze(v)) for k, v in obj.iteritems()])
+    if isinstance(obj, (list, tuple)):
+        return tuple([freeze(v) for v in obj])
+    return obj
+
+
+class StyleDict(dict):
+    '''Dict used for the style of the widgets. The `key` property is an
+    hashable version of the style, computed once and cleared when the style
+    is changed. It's used to search the style in the caches.
+
+    ..warning ::
+        The key is not updated if a value inside the style is changed (like
+        style['bg-color'][3] = 0.5), you must set the value again.
+    '''
+    __slots__ = ('_key', )
+
+    def __init__(self, *largs, **kwargs):
+        super(StyleDict, self).__init__(*largs, **kwargs)
+        self._key = None
+
+    @property
+    def key(self):
+        '''Hashable version of the style'''
+        if self._key is None:
+            self._key = frozenset([(k, freeze(v))
+                                   for k, v in self.iteritems()])
+        return self._key
+
+    def _changed(method):
+        def changed(self, *largs, **kwargs):
+            self._key = None
+            return method(self, *largs, **kwargs)
+        changed.__name__ = method.__name__
+        changed.__doc__ = method.__doc__
+        return changed
+
+    __setitem__ = _changed(dict.__setitem__)
+    __delitem__ = _changed(dict.__delitem__)
+    clear = _changed(dict.clear)
+    pop = _changed(dict.pop)
+    popitem = _changed(dict.popitem)
+    setdefault = _changed(dict.setdefault)
+    update = _changed(dict.update)
+    del _changed
+
+
 def serialize_numpy(obj):
     import numpy
     from StringIO import StringIO
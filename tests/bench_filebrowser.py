@@ -0,0 +1,55 @@
+'''
+Bench filebrowser
+
+This bench measure the time spent in the main thread to open a directory of
+10000 files with MTFileBrowserView : the time blocked in the path change, and
+the time of the frames until the whole listing is in the view (the first
+layout create the visible widgets). Then the same directory is opened again.
+
+With Python 2.7.18 on linux2 :
+
+Listing and widgets of all the entries created in the path change :
+    open: blocked=9.585s, frames=0 (0.000s)
+    open again: blocked=10.135s, frames=0 (0.000s)
+
+Listing in a thread, widgets only for the visible entries, listing cache :
+    open: blocked=0.000s, frames=2 (0.090s)
+    open again: blocked=0.017s, frames=0 (0.000s)
+
+'''
+
+import os
+import time
+import shutil
+import tempfile
+
+os.environ['PYMT_SHADOW_WINDOW'] = '0'
+import pymt
+from pymt import MTFileBrowserView
+
+def measure(name, view, path):
+    view._path = None
+    start = time.time()
+    view.path = path
+    blocked = time.time() - start
+    frames = 0
+    busy = 0
+    while getattr(view, '_scanner', None) is not None:
+        time.sleep(0.01)
+        start = time.time()
+        view._poll_scan(0)
+        view.do_layout()
+        busy += time.time() - start
+        frames += 1
+    print '%s: blocked=%.3fs, frames=%d (%.3fs)' % (
+        name, blocked, frames, busy)
+
+path = tempfile.mkdtemp()
+try:
+    for x in xrange(10000):
+        open(os.path.join(path, 'file%05d.jpg' % x), 'w').close()
+    view = MTFileBrowserView(size=(400, 400))
+    measure('open', view, path)
+    measure('open again', view, path)
+finally:
+    shutil.rmtree(path)
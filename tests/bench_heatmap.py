@@ -0,0 +1,71 @@
+'''
+Bench heatmap
+
+This bench measure the time spent in the main thread by the heatmap module
+to record 2000 touch down, and the time needed to write them in the
+database. Then it compute the density of 200000 touches on a 64x64 grid.
+
+With Python 2.7.18 on linux2 :
+
+One INSERT and commit per touch, in the main thread :
+    record: main thread=1.403s, written after 1.403s
+
+Records queued for a writer thread, written in one transaction (the writer
+is stopped just after the records) :
+    record: main thread=0.010s, written after 0.018s
+    density: sql=0.268s, python=0.472s
+
+'''
+
+import os
+import time
+import shutil
+import sqlite3
+import tempfile
+
+os.environ['PYMT_SHADOW_WINDOW'] = '0'
+import pymt
+from pymt.modules import heatmap
+
+class Touch(object):
+    def __init__(self, id, sx, sy):
+        self.id, self.sx, self.sy, self.time_start = id, sx, sy, time.time()
+
+path = tempfile.mkdtemp()
+cwd = os.getcwd()
+os.chdir(path)
+try:
+    touches = [Touch(x, (x % 97) / 97., (x % 89) / 89.) for x in xrange(2000)]
+    start = time.time()
+    w = heatmap.HeatMap()
+    for touch in touches:
+        w.on_touch_down(touch)
+    main = time.time() - start
+    writer = getattr(w, 'writer', None)
+    if writer is not None:
+        writer.stop()
+    print 'record: main thread=%.3fs, written after %.3fs' % (
+        main, time.time() - start)
+
+    if hasattr(heatmap, 'get_density'):
+        db = sqlite3.connect(w.filename)
+        db.executemany('INSERT INTO heatmap (x, y, time) VALUES (?, ?, 0)',
+                       (((x % 997) / 997., (x % 991) / 991.)
+                        for x in xrange(200000)))
+        db.commit()
+        db.close()
+
+        start = time.time()
+        heatmap.get_density(w.filename, bins=(64, 64))
+        sql = time.time() - start
+
+        start = time.time()
+        db = sqlite3.connect(w.filename)
+        grid = [[0] * 64 for x in xrange(64)]
+        for x, y in db.execute('SELECT x, y FROM heatmap'):
+            grid[min(63, int(y * 64))][min(63, int(x * 64))] += 1
+        db.close()
+        print 'density: sql=%.3fs, python=%.3fs' % (sql, time.time() - start)
+finally:
+    os.chdir(cwd)
+    shutil.rmtree(path)
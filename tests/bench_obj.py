@@ -0,0 +1,72 @@
+'''
+Bench obj
+
+This bench measure the time needed to load a big Wavefront OBJ file.
+
+The test case is constructed like this :
+  - a generated grid of 317 * 317 vertices, with texture coordinates and
+    normals, and 100000 quads (200000 triangles)
+  - the file is loaded without cache, then 2 times with the cache (the first
+    load create the cache)
+  - arrays is the time to create the arrays used for the drawing, done at
+    the first draw
+
+With Python 2.7.18 on linux2 :
+
+Parsing line by line in python lists (no cache) :
+    load without cache: 199712 triangles, Time=3.371s, arrays=1.743s
+
+Parsing with numpy, and binary cache memory mapped :
+    load without cache: 199712 triangles, Time=0.866s, arrays=0.000s
+    load create cache: 199712 triangles, Time=0.825s, arrays=0.000s
+    load with cache: 199712 triangles, Time=0.000s, arrays=0.000s
+
+The triangles are the same, only their order inside a material group can
+change (they are grouped by polygon size).
+'''
+
+import os
+import time
+import shutil
+import tempfile
+
+os.environ['PYMT_SHADOW_WINDOW'] = '0'
+import pymt
+from pymt.obj import OBJ
+
+def generate(filename, size=317):
+    with open(filename, 'w') as fd:
+        for y in xrange(size):
+            for x in xrange(size):
+                fd.write('v %f %f %f\n' % (x, y, (x * y) % 7 / 7.))
+                fd.write('vt %f %f\n' % (x / float(size), y / float(size)))
+                fd.write('vn 0.0 0.0 1.0\n')
+        for y in xrange(size - 1):
+            for x in xrange(size - 1):
+                a = y * size + x + 1
+                b, c, d = a + 1, a + size + 1, a + size
+                fd.write('f %d/%d/%d %d/%d/%d %d/%d/%d %d/%d/%d\n' % (
+                    a, a, a, b, b, b, c, c, c, d, d, d))
+
+directory = tempfile.mkdtemp()
+try:
+    filename = os.path.join(directory, 'grid.obj')
+    generate(filename)
+    print 'obj file of %d bytes' % os.path.getsize(filename)
+
+    for name, cache in (('without cache', False), ('create cache', True),
+                        ('with cache', True)):
+        start = time.time()
+        obj = OBJ(filename, cache=cache)
+        t = time.time() - start
+        start = time.time()
+        for mesh in obj.mesh_list:
+            for group in mesh.groups:
+                group.build_array()
+        tarray = time.time() - start
+        triangles = sum([len(group.vertices) / 24
+                         for mesh in obj.mesh_list for group in mesh.groups])
+        print 'load %s: %d triangles, Time=%.3fs, arrays=%.3fs' % (
+            name, triangles, t, tarray)
+finally:
+    shutil.rmtree(directory)
@@ -0,0 +1,78 @@
+'''
+Bench recordvideo
+
+This bench measure the time spent in the on_flip of the window to record 100
+frames of 640x480 in PNG, and the time until all the files are written. The
+readback is replaced by a copy of a gradient image.
+
+With Python 2.7.18 on linux2 :
+
+Save in on_flip, with pygame :
+    on_flip: Time=2.298s
+    written: Time=3.983s
+
+Ring of 4 buffers, 2 threads writing :
+    on_flip: Time=0.040s (0 dropped)
+    written: Time=1.760s
+
+'''
+
+import os
+import time
+import shutil
+import tempfile
+import numpy
+
+os.environ['PYMT_SHADOW_WINDOW'] = '0'
+import pymt
+from pymt.modules import recordvideo
+
+width, height, count = 640, 480, 100
+pixels = numpy.empty((height, width, 3), dtype=numpy.uint8)
+pixels[:, :, 0] = numpy.arange(width) * 255 / width
+pixels[:, :, 1] = (numpy.arange(height) * 255 / height)[:, None]
+pixels[:, :, 2] = 128
+data = pixels.tostring()
+
+def glReadPixels(x, y, w, h, format, type, array=None):
+    if array is None:
+        return data
+    array[:] = pixels
+
+class FakeWindow(object):
+    size = (width, height)
+    width, height = size
+
+recordvideo.glReadPixels = glReadPixels
+recordvideo.glReadBuffer = lambda mode: None
+pymt.getWindow = lambda: FakeWindow
+
+directory = tempfile.mkdtemp()
+prefix = os.path.join(directory, 'img_')
+try:
+    if hasattr(recordvideo, 'FrameRecorder'):
+        recorder = recordvideo.FrameRecorder(
+            recordvideo.ImageWriter(prefix, 'png'), width, height)
+        on_flip = recorder.on_flip
+    else:
+        recordvideo.dump_prefix = prefix
+        recordvideo.dump_format = 'png'
+        on_flip = recordvideo.window_flip_and_save
+
+    t_flip = 0
+    start = time.time()
+    for x in xrange(count):
+        t = time.time()
+        on_flip()
+        t_flip += time.time() - t
+        # an application frame
+        time.sleep(1 / 60.)
+    if hasattr(recordvideo, 'FrameRecorder'):
+        recorder.stop()
+        print 'on_flip: Time=%.3fs (%d dropped)' % (t_flip, recorder.dropped)
+    else:
+        print 'on_flip: Time=%.3fs' % t_flip
+    print 'written: Time=%.3fs' % (time.time() - start)
+    print '%d files' % len(os.listdir(directory))
+finally:
+    shutil.rmtree(directory)
@@ -0,0 +1,46 @@
+'''
+Bench style keys
+
+This bench measure the cache lookup done at each frame by the widgets, for
+the labels (getLabel()) and the css background (drawCSSRectangle()). The
+label and the rectangle are already in the cache : only the cache key and
+the lookup are measured (the display list of the rectangle is not compiled
+without a window).
+
+The test case is constructed like this :
+  - 100 MTButton, with their style and label parameters
+  - 1000 frames : each button get his label and draw his background
+
+With Python 2.7.18 on linux2 :
+
+Cache id formatted with str() / '%s' (whole style dict at each call) :
+    getLabel: 15.22us per call
+    drawCSSRectangle: 52.69us per call
+
+Hashable keys, the key of the style is computed once by the StyleDict :
+    getLabel: 10.84us per call
+    drawCSSRectangle: 8.57us per call
+'''
+
+import os
+import time
+
+os.environ['PYMT_SHADOW_WINDOW'] = '0'
+import pymt
+from pymt import MTButton, getLabel, drawCSSRectangle
+
+buttons = [MTButton(label='button %d' % x, pos=(x, x)) for x in xrange(100)]
+
+def bench(name, fn):
+    for button in buttons:
+        fn(button)
+    start = time.time()
+    for x in xrange(1000):
+        for button in buttons:
+            fn(button)
+    t = time.time() - start
+    print '%s: %.2fus per call' % (name, t * 10.)
+
+bench('getLabel', lambda b: getLabel(b.label, **b.kwargs))
+bench('drawCSSRectangle', lambda b: drawCSSRectangle(
+    pos=b.pos, size=b.size, style=b.style, state='down'))
@@ -0,0 +1,57 @@
+'''
+Bench svg
+
+This bench measure the time needed to load all the icons of
+pymt/data/icons/svg (37 files) with squirtle, from the files, and from the
+disk cache of the tessellated meshes. The in-process cache is cleared before
+each load.
+
+With Python 2.7.18 on linux2 :
+
+Display list compiled with glBegin/glVertex3f, quadratic merge of the near
+vertices :
+    parse: Time=0.407s
+
+Flat vertex / color arrays, merge with a spatial hash :
+    parse: Time=0.149s
+    disk cache: Time=0.003s
+
+'''
+
+import os
+import glob
+import time
+import shutil
+import tempfile
+
+os.environ['PYMT_SHADOW_WINDOW'] = '0'
+import pymt
+from pymt.lib import squirtle
+
+filenames = glob.glob(os.path.join(pymt.pymt_data_dir, 'icons', 'svg', '*.svg'))
+
+def clear():
+    for name in ('_disp_list_cache', '_mesh_cache'):
+        getattr(squirtle.SVG, name, {}).clear()
+
+def measure(name, count=5):
+    start = time.time()
+    for x in xrange(count):
+        clear()
+        for filename in filenames:
+            squirtle.SVG(filename)
+    print '%s: Time=%.3fs' % (name, (time.time() - start) / count)
+
+squirtle.SVG.cache_dir = None
+measure('parse')
+
+if hasattr(squirtle.SVG, 'generate_arrays'):
+    cache_dir = tempfile.mkdtemp()
+    try:
+        squirtle.SVG.cache_dir = cache_dir
+        clear()
+        for filename in filenames:
+            squirtle.SVG(filename)
+        measure('disk cache')
+    finally:
+        shutil.rmtree(cache_dir)
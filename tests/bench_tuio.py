@@ -0,0 +1,75 @@
+'''
+Bench tuio
+
+This bench measure the time spent in the main thread to receive and dispatch
+TUIO frames, with the default mode (socket in a separate process, messages
+decoded one by one) and the batch mode (socket polled from the main thread,
+bundles decoded in one pass, superseded set messages dropped).
+
+The test case is constructed like this :
+  - a local UDP sender send 50 TUIO frames between two updates
+  - each frame is a bundle with an alive message, 10 set messages and a
+    fseq message (10 touches moving)
+  - 100 updates are measured
+
+With Python 2.7.18 on linux2 :
+
+    default: Time=1.162, 11.621ms per update, 50000 touch events
+    batch: Time=0.344, 3.435ms per update, 1000 touch events
+
+In batch mode, only the last position of each touch is dispatched on each
+update, the 49 others set messages of a touch are dropped.
+
+'''
+
+import os
+import sys
+import time
+import socket
+
+os.environ['PYMT_SHADOW_WINDOW'] = '0'
+import pymt
+import osc
+from pymt.input.providers.tuio import TuioTouchProvider
+
+touches = 10
+frames = 50
+updates = 100
+
+def create_frame(fseq):
+    bundle = osc.createBundle()
+    osc.appendToBundle(bundle, '/tuio/2Dcur', ['alive'] + range(touches))
+    for x in xrange(touches):
+        osc.appendToBundle(bundle, '/tuio/2Dcur', ['set', x,
+            (x + fseq % 100) / 200., 0.5, 0., 0., 0.])
+    osc.appendToBundle(bundle, '/tuio/2Dcur', ['fseq', fseq])
+    return bundle.message
+
+def bench(name, args, port):
+    provider = TuioTouchProvider('bench', '127.0.0.1:%d%s' % (port, args))
+    provider.start()
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    # wait for the socket
+    time.sleep(1)
+
+    events = [0]
+    def dispatch(event, touch):
+        events[0] += 1
+
+    fseq = 1
+    total = 0
+    for x in xrange(updates):
+        for y in xrange(frames):
+            sender.sendto(create_frame(fseq), ('127.0.0.1', port))
+            fseq += 1
+        time.sleep(0.02)
+        start = time.time()
+        provider.update(dispatch)
+        total += time.time() - start
+
+    provider.stop()
+    print '%s: Time=%.3f, %.3fms per update, %d touch events' % (
+        name, total, total * 1000. / updates, events[0])
+
+bench('default', '', 3340)
+bench('batch', ',batch', 3341)
@@ -0,0 +1,23 @@
+'''
+Animation
+'''
+
+from init import test, import_pymt_no_window
+
+def unittest_animation_style():
+    import_pymt_no_window()
+    import time
+    from pymt import MTWidget, Animation, getClock
+
+    widget = MTWidget()
+    style = widget.style
+    keys = sorted(style.keys())
+    widget.do(Animation(duration=.05, style={'bg-color': (1., 0., 0., 1.)}))
+    for x in xrange(20):
+        time.sleep(.01)
+        getClock().tick()
+
+    # the animated keys are updated in the style of the widget
+    test(widget.style is style)
+    test(sorted(widget.style.keys()) == keys)
+    test(list(widget.style['bg-color']) == [1., 0., 0., 1.])
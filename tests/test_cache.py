@@ -0,0 +1,51 @@
+'''
+Cache
+'''
+
+from init import test, import_pymt_no_window
+
+def unittest_cache_limit():
+    import_pymt_no_window()
+    from pymt import Cache
+    evicted = []
+    def on_evict(key, obj):
+        evicted.append(key)
+    Cache.register('test.limit', limit=2, on_evict=on_evict)
+    Cache.append('test.limit', 'a', 1)
+    Cache.append('test.limit', 'b', 2)
+    test(Cache.get('test.limit', 'a') == 1)
+    Cache.append('test.limit', 'c', 3)
+    test(evicted == ['b'])
+    test(Cache.get('test.limit', 'b') is None)
+    test(Cache.get('test.limit', 'c') == 3)
+    stats = Cache.get_stats('test.limit')
+    test(stats['count'] == 2)
+    test(stats['hits'] == 2)
+    test(stats['misses'] == 1)
+    test(stats['evictions'] == 1)
+
+def unittest_cache_size_limit():
+    import_pymt_no_window()
+    from pymt import Cache
+    Cache.register('test.size', size_limit=10, sizeof=len)
+    Cache.append('test.size', 'a', 'aaaaa')
+    Cache.append('test.size', 'b', 'bbbbb')
+    test(Cache.get_stats('test.size')['size'] == 10)
+    Cache.append('test.size', 'c', 'cc')
+    test(Cache.get('test.size', 'a') is None)
+    test(Cache.get_stats('test.size')['size'] == 7)
+
+def unittest_cache_remove():
+    import_pymt_no_window()
+    from pymt import Cache
+    evicted = []
+    def on_evict(key, obj):
+        evicted.append(key)
+    Cache.register('test.remove', on_evict=on_evict)
+    Cache.append('test.remove', 'a', 1)
+    Cache.append('test.remove', 'b', 2)
+    Cache.remove('test.remove', 'a')
+    test(evicted == ['a'])
+    Cache.remove('test.remove')
+    test(evicted == ['a', 'b'])
+    test(Cache.get_stats('test.remove')['count'] == 0)
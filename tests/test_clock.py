@@ -0,0 +1,53 @@
+'''
+Clock scheduling
+'''
+
+from init import test, import_pymt_no_window
+
+def unittest_clock_schedule():
+    import_pymt_no_window()
+    from pymt.clock import Clock
+    clock = Clock()
+    calls = []
+    def callback(dt):
+        calls.append(dt)
+    clock.schedule_once(callback, 0)
+    clock.schedule_interval(callback, 0)
+    test(clock.get_events_count() == 2)
+    clock.tick()
+    test(len(calls) == 2)
+    test(clock.get_events_count() == 1)
+    clock.tick()
+    test(len(calls) == 3)
+
+def unittest_clock_cancel():
+    import_pymt_no_window()
+    from pymt.clock import Clock
+    clock = Clock()
+    calls = []
+    def callback(dt):
+        calls.append(dt)
+    event = clock.schedule_interval(callback, 0)
+    clock.schedule_once(callback, 1000)
+    event.cancel()
+    clock.tick()
+    test(len(calls) == 0)
+    test(clock.get_events_count() == 1)
+    clock.unschedule(callback)
+    test(clock.get_events_count() == 0)
+
+def unittest_clock_order():
+    import_pymt_no_window()
+    import time
+    from pymt.clock import Clock
+    clock = Clock()
+    calls = []
+    def first(dt):
+        calls.append('first')
+    def second(dt):
+        calls.append('second')
+    clock.schedule_once(second, 0.002)
+    clock.schedule_once(first, 0.001)
+    time.sleep(0.01)
+    clock.tick()
+    test(calls == ['first', 'second'])
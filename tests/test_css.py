@@ -45,3 +45,105 @@ def unittest_css_multiclass():
     ''')
     l = MTLabel(label = 'test', cls=('test1', 'test2'))
     test(l.style['font-size'] == 24)
+
+def unittest_css_style_key():
+    import_pymt_no_window()
+    from pymt import MTWidget
+    from pymt.utils import StyleDict, freeze
+    w = MTWidget(id='my')
+    x = MTWidget(id='my')
+    test(isinstance(w.style, StyleDict))
+    test(w.style.key == x.style.key)
+    test(freeze(dict(w.style)) == w.style.key)
+    key = x.style.key
+    x.style['bg-color'] = [0, 0, 0, 0]
+    test(x.style.key != key)
+    x.style.update({'bg-color': w.style['bg-color']})
+    test(x.style.key == key)
+    hash(key)
+
+def unittest_css_rectangle_cache():
+    import_pymt_no_window()
+    import os
+    import tempfile
+    from pymt import MTWidget, drawCSSRectangle, css_reload, css_add_file
+    from pymt.cache import Cache
+    w = MTWidget(size=(50, 20))
+    Cache.remove('pymt.cssrect')
+    # the position is not in the cache
+    for x in xrange(10):
+        drawCSSRectangle(pos=(x, x), size=w.size, style=w.style)
+    test(len(Cache._objects['pymt.cssrect']) == 1)
+    displaylist = Cache._objects['pymt.cssrect'].values()[0].object
+    drawCSSRectangle(pos=(0, 0), size=(60, 20), style=w.style)
+    test(len(Cache._objects['pymt.cssrect']) == 2)
+    # the display lists are released when the css is changed
+    css_reload()
+    test(len(Cache._objects['pymt.cssrect']) == 2)
+    filename = tempfile.mktemp(suffix='.css')
+    with open(filename, 'w') as fd:
+        fd.write('.rectcache { border-radius: 5; }')
+    css_add_file(filename)
+    with open(filename, 'w') as fd:
+        fd.write('.rectcache { border-radius: 6; }')
+    css_reload()
+    os.unlink(filename)
+    test(len(Cache._objects['pymt.cssrect']) == 0)
+    test(displaylist.dl is None)
+
+def unittest_css_rectangle_nested():
+    import_pymt_no_window()
+    from pymt import MTWidget, drawCSSRectangle, GlDisplayList
+    from pymt.cache import Cache
+    w = MTWidget(size=(50, 20))
+    Cache.remove('pymt.cssrect')
+    drawCSSRectangle(size=w.size, style=w.style)
+    displaylist = Cache._objects['pymt.cssrect'].values()[0].object
+    called = []
+    displaylist.draw = lambda: called.append(True)
+    drawCSSRectangle(size=w.size, style=w.style)
+    test(len(called) == 1)
+    # the cached list is not called from another list: it can be released
+    # before the other one
+    outer = GlDisplayList()
+    with outer:
+        drawCSSRectangle(size=w.size, style=w.style)
+    test(len(called) == 1)
+    test(len(Cache._objects['pymt.cssrect']) == 1)
+
+def unittest_css_reload():
+    import_pymt_no_window()
+    import os
+    import tempfile
+    from pymt import MTWidget, MTButton, css_add_file, css_reload
+    filename = tempfile.mktemp(suffix='.css')
+    def write(value):
+        with open(filename, 'w') as fd:
+            fd.write('.reloadtest { border-radius: %d; }' % value)
+    write(5)
+    css_add_file(filename)
+    a = MTButton(cls='reloadtest')
+    b = MTWidget(cls=('other', 'reloadtest'))
+    c = MTButton()
+    test(a.style['border-radius'] == 5)
+    test(b.style['border-radius'] == 5)
+
+    # only the widgets matching the changed rules are reloaded
+    reloaded = []
+    original = MTWidget.reload_css
+    def reload_css(self):
+        reloaded.append(self)
+        original(self)
+    MTWidget.reload_css = reload_css
+    try:
+        css_reload()
+        test(reloaded == [])
+        write(7)
+        css_reload()
+    finally:
+        MTWidget.reload_css = original
+        os.unlink(filename)
+    test(len(reloaded) == 2 and c not in reloaded)
+    test(a.style['border-radius'] == 7)
+    test(b.style['border-radius'] == 7)
+    test(MTButton(cls='reloadtest').style['border-radius'] == 7)
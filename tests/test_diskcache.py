@@ -0,0 +1,63 @@
+'''
+Disk cache of decoded images
+'''
+
+from init import test, import_pymt_no_window
+
+def unittest_diskcache_entries():
+    import_pymt_no_window()
+    import shutil
+    import tempfile
+    from pymt.core.image import ImageData, ImageDiskCache
+    directory = tempfile.mkdtemp()
+    try:
+        cache = ImageDiskCache(directory, size_limit=1000)
+        image = ImageData(4, 2, 'RGBA', 'x' * 32)
+        cache.set('a', image, 'etag')
+        data, etag = cache.get('a')
+        test(etag == 'etag')
+        test((data.width, data.height, data.mode) == (4, 2, 'RGBA'))
+        test(data.data == image.data)
+        test(cache.get('b') is None)
+
+        # the least recently used entries are removed
+        for key in 'bcdefghijklmn':
+            cache.set(key, image)
+        test(cache.get_size() <= 1000)
+        test(cache.get('n') is not None)
+        test(cache.get('a') is None)
+    finally:
+        shutil.rmtree(directory)
+
+def unittest_diskcache_downscale():
+    import_pymt_no_window()
+    from pymt.core.image import ImageData
+    image = ImageData(4, 2, 'RGB', ''.join(chr(x) for x in xrange(24)))
+    small = image.downscale(2)
+    test((small.width, small.height) == (2, 1))
+    # average of the first 2x2 block
+    test(ord(small.data[0]) == (0 + 3 + 12 + 15) / 4 + 1)
+    test(image.downscale(4) is image)
+
+def unittest_diskcache_imageloader():
+    import_pymt_no_window()
+    import os
+    import shutil
+    import tempfile
+    from pymt import pymt_data_dir
+    from pymt.core.image import ImageLoader, ImageDiskCache
+    directory = tempfile.mkdtemp()
+    old_cache = ImageLoader.disk_cache
+    try:
+        ImageLoader.disk_cache = ImageDiskCache(directory)
+        filename = os.path.join(pymt_data_dir, 'loader.png')
+        image = ImageLoader.load(filename, max_size=16, disk_cache=True)
+        test(max(image.size) <= 16)
+        test(len(os.listdir(directory)) == 1)
+        cached = ImageLoader.load(filename, max_size=16, disk_cache=True)
+        test(cached.__class__.__name__ == 'ImageLoaderData')
+        test(cached.size == image.size)
+        test(cached._data.data == image._data.data)
+    finally:
+        ImageLoader.disk_cache = old_cache
+        shutil.rmtree(directory)
@@ -0,0 +1,68 @@
+'''
+File browser
+'''
+
+from init import test, import_pymt_no_window
+
+def _wait_scan(view):
+    if view._scanner is not None:
+        view._scanner.join()
+        view._poll_scan(0)
+
+def unittest_filebrowser_scan():
+    import_pymt_no_window()
+    import os
+    import shutil
+    import tempfile
+    from pymt import MTFileBrowserView, MTFileListEntryView
+
+    path = tempfile.mkdtemp()
+    try:
+        for x in xrange(2000):
+            open(os.path.join(path, 'file%04d.txt' % x), 'w').close()
+        open(os.path.join(path, 'image.png'), 'w').close()
+        open(os.path.join(path, '.hidden'), 'w').close()
+        os.mkdir(os.path.join(path, 'zdir'))
+        os.mkdir(os.path.join(path, 'adir'))
+
+        completed = []
+        view = MTFileBrowserView(size=(300, 400), view=MTFileListEntryView,
+                                 chunk_size=100)
+        view.push_handlers(on_scan_complete=completed.append)
+        view.path = path
+        test(view._scanner is not None)
+        _wait_scan(view)
+        test(completed == [path])
+        test(view._scanner is None)
+
+        # parent, directories, then files
+        source = view.source
+        test(len(source) == 2004)
+        names = [source.get_item(x)[1] for x in xrange(len(source))]
+        test(names[:4] == ['..', 'adir', 'zdir', 'file0000.txt'])
+        test(names[-1] == 'image.png')
+        test('.hidden' not in names)
+
+        # only the visible entries have a widget
+        view.do_layout()
+        test(len(view.children) < 30)
+        child = [c for c in view.children if c.label_txt == 'adir'][0]
+        test(child.is_dir)
+
+        # the listing is cached, the filters are applied without scanning
+        view.filters = [r'.*\.png']
+        view.update()
+        test(view._scanner is None)
+        test(len(view.source) == 4)
+        test(completed == [path, path])
+
+        # a modified directory is listed again
+        open(os.path.join(path, 'new.png'), 'w').close()
+        os.utime(path, (0, 0))
+        view.update()
+        test(view._scanner is not None)
+        _wait_scan(view)
+        names = [view.source.get_item(x)[1] for x in xrange(len(view.source))]
+        test(names == ['..', 'adir', 'zdir', 'image.png', 'new.png'])
+    finally:
+        shutil.rmtree(path)
@@ -0,0 +1,96 @@
+'''
+Gesture recognition
+'''
+
+from init import test, import_pymt_no_window
+
+def _random_gesture(random, strokes=1):
+    from pymt import Gesture
+    g = Gesture()
+    for s in xrange(strokes):
+        x, y = random.random(), random.random()
+        points = []
+        for i in xrange(random.randint(5, 20)):
+            x += random.random() - .5
+            y += random.random() - .5
+            points.append((x, y))
+        g.add_stroke(points)
+    g.normalize()
+    return g
+
+def unittest_gesture_find():
+    import_pymt_no_window()
+    import random
+    from pymt import GestureDatabase
+    random.seed(42)
+    gdb = GestureDatabase()
+    for x in xrange(200):
+        gdb.add_gesture(_random_gesture(random, random.choice((1, 2))))
+    for x in xrange(10):
+        candidate = _random_gesture(random, random.choice((1, 2)))
+        for rotation_invariant in (True, False):
+            # compare with the python implementation
+            best = None
+            bestscore = -2
+            for g in gdb.db:
+                score = g.get_score(candidate, rotation_invariant)
+                if score < bestscore:
+                    continue
+                bestscore = score
+                best = g
+            result = gdb.find(candidate, -2, rotation_invariant)
+            test(result[1] is best)
+            test(abs(result[0] - bestscore) < 1e-9)
+
+def unittest_gesture_add_after_find():
+    import_pymt_no_window()
+    import random
+    from pymt import GestureDatabase
+    random.seed(42)
+    gdb = GestureDatabase()
+    gdb.add_gesture(_random_gesture(random))
+    candidate = _random_gesture(random)
+    gdb.find(candidate)
+    gdb.add_gesture(candidate)
+    result = gdb.find(candidate)
+    test(result[1] is candidate)
+    test(abs(result[0] - 1.) < 1e-9)
+
+def unittest_gesture_file():
+    import_pymt_no_window()
+    import os
+    import random
+    import tempfile
+    from pymt import GestureDatabase
+    random.seed(42)
+    gdb = GestureDatabase()
+    for x in xrange(20):
+        g = _random_gesture(random, random.choice((1, 2)))
+        g.label = 'gesture%d' % x
+        gdb.add_gesture(g)
+    candidate = _random_gesture(random)
+    expected = gdb.find(candidate, -2)
+
+    fd, filename = tempfile.mkstemp(suffix='.gdb')
+    os.close(fd)
+    try:
+        gdb.save(filename)
+        loaded = GestureDatabase()
+        loaded.load(filename)
+        test(len(loaded.db) == 20)
+        result = loaded.find(candidate, -2)
+        test(result[1].label == expected[1].label)
+        test(abs(result[0] - expected[0]) < 1e-5)
+
+        # streaming append
+        candidate.label = 'candidate'
+        loaded.add_gesture(candidate)
+        loaded.db.close()
+        loaded = GestureDatabase()
+        loaded.load(filename)
+        test(len(loaded.db) == 21)
+        result = loaded.find(candidate)
+        test(result[1].label == 'candidate')
+        loaded.db.close()
+    finally:
+        os.unlink(filename)
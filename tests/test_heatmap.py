@@ -0,0 +1,89 @@
+'''
+Heatmap module
+'''
+
+from init import test, import_pymt_no_window
+
+class _Touch(object):
+    def __init__(self, id, sx, sy):
+        self.id, self.sx, self.sy, self.time_start = id, sx, sy, 1.
+
+def unittest_heatmap_writer():
+    import_pymt_no_window()
+    import os
+    import shutil
+    import sqlite3
+    import tempfile
+    from pymt.modules.heatmap import HeatMapWriter, get_density
+
+    path = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(path, 'heatmap.db')
+        # an old database, with only the touch down
+        db = sqlite3.connect(filename)
+        db.execute('CREATE TABLE heatmap (x NUMERIC, y NUMERIC, time NUMERIC)')
+        db.execute('INSERT INTO heatmap VALUES (0.1, 0.1, 0.)')
+        db.commit()
+        db.close()
+
+        writer = HeatMapWriter(filename, interval=.05, queue_size=100)
+        writer.push('down', _Touch(1, .9, .1))
+        writer.push('move', _Touch(1, .9, .6))
+        writer.push('up', _Touch(1, 1., 1.))
+        for x in xrange(200):
+            writer.push('down', _Touch(2, .3, .8))
+        writer.stop()
+
+        db = sqlite3.connect(filename)
+        rows = db.execute('SELECT event, COUNT(*) FROM heatmap '
+                          'GROUP BY event').fetchall()
+        db.close()
+        rows = dict(rows)
+        test(rows['move'] == 1)
+        test(rows['up'] == 1)
+        test(rows['down'] == 1 + 1 + 200 - writer.dropped)
+
+        grid = get_density(filename, bins=(10, 5))
+        test(grid.shape == (5, 10))
+        test(grid.sum() == rows['down'])
+        test(grid[0, 1] == 1)
+        test(grid[0, 9] == 1)
+        test(grid[4, 3] == 200 - writer.dropped)
+        grid = get_density(filename, bins=(10, 5), events=('up', 'move'))
+        test(grid.sum() == 2)
+        test(grid[4, 9] == 1)
+    finally:
+        shutil.rmtree(path)
+
+def unittest_heatmap_exit():
+    import_pymt_no_window()
+    import os
+    import sys
+    import shutil
+    import sqlite3
+    import tempfile
+    import subprocess
+
+    # the application exit without stopping the writer: the records waiting
+    # for the next write must not be lost
+    script = '\n'.join((
+        'import os, sys',
+        'os.environ["PYMT_SHADOW_WINDOW"] = "0"',
+        'from pymt.modules.heatmap import HeatMapWriter',
+        'class Touch(object):',
+        '    id, sx, sy, time_start = 1, .5, .5, 1.',
+        'writer = HeatMapWriter(sys.argv[1], interval=60)',
+        'for x in xrange(10):',
+        '    writer.push("down", Touch())'))
+    path = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(path, 'heatmap.db')
+        subprocess.check_call([sys.executable, '-c', script, filename],
+                              stdout=open(os.devnull, 'w'),
+                              stderr=subprocess.STDOUT)
+        db = sqlite3.connect(filename)
+        count = db.execute('SELECT COUNT(*) FROM heatmap').fetchone()[0]
+        db.close()
+        test(count == 10)
+    finally:
+        shutil.rmtree(path)
@@ -0,0 +1,64 @@
+'''
+HIDInput provider
+'''
+
+from init import test, import_pymt_no_window
+
+def _events(frames):
+    # encode frames of {id: (x, y)} as evdev events
+    import struct
+    from pymt.input.providers import hidinput as hid
+    data = []
+    for frame in frames:
+        for tid, (x, y) in sorted(frame.items()):
+            for code, value in ((hid.ABS_MT_TRACKING_ID, tid),
+                                (hid.ABS_MT_POSITION_X, x),
+                                (hid.ABS_MT_POSITION_Y, y)):
+                data.append(struct.pack('LLHHi', 0, 0, hid.EV_ABS, code, value))
+            data.append(struct.pack('LLHHi', 0, 0, hid.EV_SYN,
+                                    hid.SYN_MT_REPORT, 0))
+        data.append(struct.pack('LLHHi', 0, 0, hid.EV_SYN, hid.SYN_REPORT, 0))
+    return ''.join(data)
+
+def unittest_hidinput_frames():
+    import_pymt_no_window()
+    import os
+    import collections
+    from pymt.input.providers import hidinput as hid
+
+    provider = hid.HIDInputTouchProvider('hid', '/dev/null')
+    provider.touches = {}
+    provider.touches_sent = set()
+    queue = provider.queue = collections.deque()
+    ranges = {hid.ABS_MT_POSITION_X: (0, 2048),
+              hid.ABS_MT_POSITION_Y: (0, 2048),
+              hid.ABS_MT_PRESSURE: (0, 255)}
+
+    data = _events([{1: (1024, 512)},
+                    {1: (2048, 0), 2: (0, 0)},
+                    {2: (1024, 1024)},
+                    {}])
+    rfd, wfd = os.pipe()
+    os.write(wfd, data)
+    os.close(wfd)
+    # read a few events at once, to have several reads
+    count = hid.read_events_count
+    hid.read_events_count = 5
+    try:
+        provider._read_events(rfd, queue, ranges)
+    finally:
+        hid.read_events_count = count
+        os.close(rfd)
+
+    # one immutable snapshot per frame
+    test(len(queue) == 4)
+    test(type(queue[1]) is tuple)
+    test(dict(queue[0][0]) == {'id': 1, 'x': 0.5, 'y': 0.75})
+
+    events = []
+    provider.update(lambda t, touch: events.append((t, touch.id, touch.sx, touch.sy)))
+    test(len(queue) == 0)
+    test(events == [('down', 1, 1., 1.), ('move', 1, 1., 1.),
+                    ('down', 2, .5, .5), ('move', 2, .5, .5),
+                    ('up', 1, 1., 1.), ('up', 2, .5, .5)])
+    test(provider.touches == {})
@@ -0,0 +1,29 @@
+'''
+Input coalescing in the event loop
+'''
+
+from init import test, import_pymt_no_window
+
+def unittest_input_coalesce():
+    import_pymt_no_window()
+    from pymt import Touch
+    from pymt.base import TouchEventLoop
+
+    class TestTouch(Touch):
+        def depack(self, args):
+            self.sx, self.sy = args
+            super(TestTouch, self).depack(args)
+
+    loop = TouchEventLoop()
+    a = TestTouch('test', 1, (0, 0))
+    b = TestTouch('test', 2, (0, 0))
+    loop._dispatch_input('down', a)
+    for x in xrange(10):
+        a.move((x, x))
+        loop._dispatch_input('move', a)
+    loop._dispatch_input('down', b)
+    loop._dispatch_input('up', a)
+    events = [x for x in loop.input_events if x is not None]
+    test(events == [('down', a), ('move', a), ('down', b), ('up', a)])
+    test(len(a.history) == 10)
+    test(a.history[-1] == (9, 9, 0.0))
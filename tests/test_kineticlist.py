@@ -0,0 +1,77 @@
+'''
+Kinetic list
+'''
+
+from init import test, import_pymt_no_window
+
+def _create_list(count):
+    from pymt import MTKineticList, MTKineticItem, KineticSource
+
+    created = []
+    def factory(item):
+        widget = MTKineticItem(label=item)
+        created.append(widget)
+        return widget
+
+    source = KineticSource(items=['item %d' % x for x in xrange(count)],
+                           factory=factory, item_size=(100, 40))
+    klist = MTKineticList(size=(120, 400), source=source, padding_y=0,
+                          deletable=False, searchable=False, title=None)
+    return klist, source, created
+
+def unittest_kineticlist_virtual():
+    import_pymt_no_window()
+
+    klist, source, created = _create_list(20000)
+    klist.do_layout()
+
+    # only the visible rows + overscan are created
+    test(len(klist.children) == 11)
+    test(len(created) == 11)
+    test(klist._last_content_size == 20000 * 40)
+    labels = sorted([w.label for w in klist.children])
+    test('item 0' in labels)
+    test('item 10' in labels)
+    test('item 11' not in labels)
+    child = [w for w in klist.children if w.label == 'item 1'][0]
+    test(child.ky == klist.y + 40)
+
+    # scroll: widgets are reused
+    klist.yoffset = -40 * 1000
+    klist.do_layout()
+    labels = [w.label for w in klist.children]
+    test(len(klist.children) == 12)
+    test(len(created) == 12)
+    test('item 1000' in labels)
+    test('item 0' not in labels)
+    child = [w for w in klist.children if w.label == 'item 1000'][0]
+    test(child.ky == klist.y)
+
+def unittest_kineticlist_virtual_search():
+    import_pymt_no_window()
+
+    klist, source, created = _create_list(2000)
+    klist.do_layout()
+
+    klist.apply_filter('item 19')
+    klist.do_layout()
+    # item 19, 190-199, 1900-1999
+    test(len(source) == 111)
+    test(klist._last_content_size == 111 * 40)
+    labels = [w.label for w in klist.children]
+    test(len(labels) == 11)
+    test(min(labels) == 'item 19')
+
+    klist.endsearch()
+    klist.do_layout()
+    test(len(source) == 2000)
+
+    # delete an item
+    child = [w for w in klist.children if w.label == 'item 3'][0]
+    klist.remove_widget(child)
+    klist.do_layout()
+    test(len(source) == 1999)
+    labels = [w.label for w in klist.children]
+    test('item 3' not in labels)
+    test('item 11' in labels)
+    test(len(created) == 11)
@@ -0,0 +1,45 @@
+'''
+Core label
+'''
+
+from init import test, import_pymt_no_window
+
+def unittest_label_wrap():
+    import_pymt_no_window()
+    from pymt import Label
+
+    wrapped = []
+    class CountedLabel(Label):
+        def _wrap_paragraph(self, paragraph, uw, cache):
+            wrapped.append(paragraph)
+            return super(CountedLabel, self)._wrap_paragraph(
+                paragraph, uw, cache)
+
+    text = 'hello world, a long line to wrap\n\nsecond paragraph'
+    label = CountedLabel(text, size=(80, None))
+    # the measure and real pass share the layout
+    test(len(wrapped) == 3)
+    lines = label._get_layout()
+    test(len(lines) == 6)
+    for size, glyphs in lines:
+        test(size[0] <= 80)
+    # the empty paragraph keep the height of a line
+    test(lines[3][1] == [])
+    test(lines[3][0][1] == lines[0][0][1])
+    test(label.height == sum([size[1] for size, glyphs in lines]))
+    test(''.join(lines[0][1]).startswith('hello '))
+
+    # only the edited paragraph is wrapped again
+    del wrapped[:]
+    label.label = text.replace('second', '2nd')
+    test(wrapped == ['2nd paragraph'])
+
+def unittest_label_cache_style():
+    import_pymt_no_window()
+    from pymt import getLabel
+
+    # dict parameters, like a style, are part of the cache key
+    style = {'font-size': 12, 'color': [1, 1, 1, 1]}
+    label = getLabel('hi', style=style)
+    test(getLabel('hi', style=dict(style)) is label)
+    test(getLabel('hi', style={'font-size': 14}) is not label)
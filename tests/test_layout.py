@@ -39,3 +39,38 @@ def _test_boxlayout(orientation):
         m.add_widget(MTWidget(size=(10,10)))
     test(sw(m.size) == (190, 10))
 
+
+def unittest_layout_nested_pass():
+    import_pymt_no_window()
+    from pymt import MTBoxLayout, MTWidget
+
+    calls = []
+    root = MTBoxLayout(orientation='vertical', spacing=0)
+    root.push_handlers(on_layout=lambda: calls.append(root))
+    rows = []
+    for x in xrange(2):
+        row = MTBoxLayout(spacing=0)
+        row.push_handlers(on_layout=lambda: calls.append(row))
+        for y in xrange(2):
+            row.add_widget(MTWidget(size=(10, 10)))
+        root.add_widget(row)
+        rows.append(row)
+
+    # the whole tree is done in one update of the top layout
+    root.dispatch_event('on_update')
+    test(len(calls) == 3)
+    test(not root.need_update)
+    test(not rows[0].need_update)
+    test(rows[0].y == 10)
+    test(rows[0].children[0].pos == (10, 10))
+
+    # nothing to do
+    root.dispatch_event('on_update')
+    test(len(calls) == 3)
+
+    # a widget change his size: the minimum size of his parents change
+    rows[0].children[0].size = (30, 20)
+    root.dispatch_event('on_update')
+    test(root.minimum_size == (40, 30))
+    test(root.height == 30)
+    test(rows[0].height == 20)
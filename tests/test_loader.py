@@ -0,0 +1,64 @@
+'''
+Asynchronous image loader
+'''
+
+from init import test, import_pymt_no_window
+
+class _FakeImage(object):
+    # loaded data, without texture
+    texture = None
+    width = height = 1
+
+def _create_loader():
+    from pymt.loader import Loader
+    loader = Loader.__class__()
+    loader.max_upload_per_frame = 2
+    # don't start the workers, the test run the queue
+    loader._start_wanted = False
+    loader.start = lambda: None
+    return loader
+
+def _load_all(loader):
+    loader._condition.acquire()
+    try:
+        requests = []
+        request = loader._pop_request()
+        while request is not None:
+            requests.append(request)
+            request = loader._pop_request()
+    finally:
+        loader._condition.release()
+    for request in requests:
+        loader._load(request)
+    return [request.filename for request in requests]
+
+def unittest_loader_priority():
+    import_pymt_no_window()
+    loader = _create_loader()
+    load = lambda filename: _FakeImage()
+    images = [loader.image('test_priority_%d' % x, load_callback=load)
+              for x in xrange(4)]
+    images.append(loader.image('test_priority_1', load_callback=load,
+                               priority=10))
+    test(_load_all(loader) == ['test_priority_1', 'test_priority_3',
+                               'test_priority_2', 'test_priority_0'])
+
+    # the upload is limited on each update
+    loader._update()
+    test(len([x for x in images if x.loaded]) == 3)
+    loader._update()
+    test(len([x for x in images if x.loaded]) == 5)
+
+def unittest_loader_cancel():
+    import_pymt_no_window()
+    import gc
+    loader = _create_loader()
+    load = lambda filename: _FakeImage()
+    image = loader.image('test_cancel_0', load_callback=load)
+    loader.image('test_cancel_1', load_callback=load)
+    gc.collect()
+    test(_load_all(loader) == ['test_cancel_0'])
+    loader._update()
+    test(image.loaded)
+    test(loader._clients == {})
+    test(loader._requests == {})
@@ -0,0 +1,86 @@
+'''
+MJPEG server module
+'''
+
+from init import test, import_pymt_no_window
+
+def unittest_mjpegserver_stream():
+    import_pymt_no_window()
+    import threading
+    from pymt.modules import mjpegserver
+
+    encoded = []
+    def encode_jpeg(data, width, height, size=None, quality=75):
+        encoded.append((data, size, quality))
+        return 'jpeg:%s:%s:%d' % (data, size, quality)
+
+    old_encode = mjpegserver.encode_jpeg
+    mjpegserver.encode_jpeg = encode_jpeg
+    stream = mjpegserver.MjpegStream(workers=2)
+    try:
+        # no frame
+        test(stream.get_jpeg(0, timeout=.01) is None)
+        test(stream.waiting == 0)
+
+        # the clients waiting get the frame published after them
+        results = []
+        def client(quality):
+            results.append(stream.get_jpeg(0, quality=quality))
+        clients = [threading.Thread(target=client, args=(q, ))
+                   for q in (75, 75, 75, 50)]
+        for thread in clients:
+            thread.start()
+        while stream.waiting < 4:
+            pass
+        stream.publish('a', 2, 2)
+        for thread in clients:
+            thread.join()
+        # encoded once per quality
+        test(len(encoded) == 2)
+        test(sorted(results) == [(1, 'jpeg:a:None:50')] + [(1, 'jpeg:a:None:75')] * 3)
+
+        # a slow client skip the frames
+        stream.publish('b', 2, 2)
+        stream.publish('c', 2, 2)
+        test(stream.get_jpeg(1, size=(1, 1)) == (3, 'jpeg:c:(1, 1):75'))
+        test(encoded[-1] == ('c', (1, 1), 75))
+        test(len(encoded) == 3)
+        test(stream.get_jpeg(3, timeout=.01) is None)
+    finally:
+        stream.stop()
+        mjpegserver.encode_jpeg = old_encode
+
+def unittest_mjpegserver_http():
+    import_pymt_no_window()
+    import socket
+    from pymt.modules import mjpegserver
+
+    old_encode = mjpegserver.encode_jpeg
+    mjpegserver.encode_jpeg = lambda data, w, h, size, quality: \
+            'jpeg%d' % quality
+    stream = mjpegserver.MjpegStream(workers=1)
+    server = mjpegserver.MjpegServerThread(
+        {'ip': '127.0.0.1', 'port': '0', 'fps': '', 'size': '',
+         'quality': '75'}, stream)
+    server.daemon = True
+    server.start()
+    try:
+        sockets = []
+        for quality in (75, 20):
+            s = socket.create_connection(server.httpd.server_address)
+            s.sendall('GET /?quality=%d HTTP/1.0\r\n\r\n' % quality)
+            sockets.append(s)
+        while stream.waiting < 2:
+            pass
+        stream.publish('x', 1, 1)
+        for s, quality in zip(sockets, (75, 20)):
+            data = ''
+            while not data.endswith('jpeg%d\r\n' % quality):
+                data += s.recv(4096)
+            test('multipart/x-mixed-replace' in data)
+            test('Content-Length: %d' % len('jpeg%d' % quality) in data)
+            s.close()
+    finally:
+        stream.stop()
+        server.stop()
+        mjpegserver.encode_jpeg = old_encode
@@ -0,0 +1,55 @@
+'''
+Wavefront OBJ loader
+'''
+
+from init import test, import_pymt_no_window
+
+_obj = '''# test
+v 0 0 0
+v 1 0 0
+v 1 1 0
+v 0 1 0
+vt 0 0
+vt 1 1
+vn 0 0 1
+o first
+f 1/1/1 2/2/1 3/1/1 4/2/1
+f -4//1 -2//1 -1//1
+o second
+f 1 2 3
+'''
+
+def unittest_obj_parse():
+    import_pymt_no_window()
+    import os
+    import shutil
+    import tempfile
+    import numpy
+    from pymt.obj import OBJ
+
+    directory = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(directory, 'test.obj')
+        with open(filename, 'w') as fd:
+            fd.write(_obj)
+        for x in xrange(2):
+            obj = OBJ(filename)
+            # second loop is loaded from the cache
+            test(os.path.exists(filename + '.pymtcache'))
+            # readable by the other users
+            test(os.stat(filename + '.pymtcache').st_mode & 0777 == 0644)
+            test([m.name for m in obj.mesh_list] == ['first', 'second'])
+            test(obj.meshes.keys() == ['first', 'second'] or
+                 obj.meshes.keys() == ['second', 'first'])
+            first = obj.meshes['first'].groups[0].vertices.reshape(-1, 8)
+            # quad triangulated + 1 triangle
+            test(first.shape == (9, 8))
+            # T2F_N3F_V3F
+            rows = [list(row) for row in first]
+            test([1, 1, 0, 0, 1, 1, 0, 0] in rows)
+            # relative indices : 1, 3, 4
+            test(numpy.any(numpy.all(first[:, 5:8] == [0, 1, 0], axis=1)))
+            second = obj.meshes['second'].groups[0].vertices.reshape(-1, 8)
+            test(list(second[2]) == [0, 0, 0, 0, 0, 1, 1, 0])
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,59 @@
+'''
+Paint
+'''
+
+from init import test, import_pymt_no_window
+
+def _interpolate_loop(points, numsteps=None):
+    # the interpolation of paintLine, done point by point
+    from math import sqrt
+    output = []
+    for x1, y1, x2, y2 in zip(points[::2], points[1::2],
+                              points[2::2], points[3::2]):
+        dx, dy = x2 - x1, y2 - y1
+        dist = sqrt(dx * dx + dy * dy)
+        steps = numsteps
+        if steps is None:
+            steps = max(1, int(dist) / 4)
+        for i in xrange(steps):
+            output.append((x1 + dx * (float(i) / steps),
+                           y1 + dy * (float(i) / steps)))
+    return output
+
+def unittest_paint_interpolate():
+    import_pymt_no_window()
+    import random
+    import numpy
+    from pymt import interpolateLine
+
+    points = [random.random() * 500 for x in xrange(200)]
+    points[10:14] = [5, 5, 5, 5]
+    for numsteps in (None, 3):
+        result = interpolateLine(points, numsteps)
+        expected = numpy.array(_interpolate_loop(points, numsteps),
+                               dtype=numpy.float32)
+        test(result.shape == expected.shape)
+        test((result == expected).all())
+
+    test(interpolateLine((1, 2)).shape == (0, 2))
+    test(interpolateLine((0, 0, 20, 0)).tolist() ==
+         [[0, 0], [4, 0], [8, 0], [12, 0], [16, 0]])
+
+def unittest_paint_stroke():
+    import_pymt_no_window()
+    import random
+    from pymt import PaintStroke, interpolateLine
+
+    points = [random.random() * 500 for x in xrange(1000)]
+    stroke = PaintStroke()
+    # added like the moves of a touch
+    for x in xrange(0, len(points), 2):
+        stroke.append(*points[x:x + 2])
+    test(len(stroke) == len(interpolateLine(points)))
+    test((stroke.vertices == interpolateLine(points)).all())
+
+    stroke = PaintStroke(points[:10], numsteps=2)
+    stroke.extend(points[10:])
+    test((stroke.vertices == interpolateLine(points, 2)).all())
+    stroke.clear()
+    test(len(stroke) == 0)
@@ -0,0 +1,100 @@
+'''
+Frame profiler
+'''
+
+from init import test, import_pymt_no_window
+
+def _make_tree():
+    from pymt import MTWidget
+    import time
+
+    class SlowWidget(MTWidget):
+        def draw(self):
+            time.sleep(0.01)
+
+    root = MTWidget(id='profiler_root')
+    slow = SlowWidget(id='profiler_slow')
+    root.add_widget(slow)
+    root.add_widget(MTWidget())
+    return root
+
+def unittest_profiler_stats():
+    import_pymt_no_window()
+    from pymt import EventDispatcher
+    from pymt.profiler import FrameProfiler, getProfiler
+
+    root = _make_tree()
+    original = EventDispatcher.dispatch_event
+    profiler = FrameProfiler(frames=2)
+    profiler.start()
+    test(getProfiler() is profiler)
+    for x in xrange(3):
+        profiler.begin_frame()
+        root.dispatch_event('on_update')
+        profiler.phase('update')
+        root.dispatch_event('on_draw')
+        profiler.phase('draw')
+        profiler.count('input_events', 2)
+        profiler.end_frame()
+    profiler.stop()
+    test(getProfiler() is None)
+    test(EventDispatcher.dispatch_event == original)
+
+    # ring buffer
+    test(len(profiler.frames) == 2)
+    test(profiler.frames[-1].index == 3)
+    test(profiler.frames[-1].counters['input_events'] == 2)
+
+    frame_stats = profiler.get_frame_stats()
+    test(frame_stats['phases']['draw'] >= 0.01)
+    test(frame_stats['phases']['update'] < 0.01)
+
+    # the slow widget is the first, and the self time of the root exclude
+    # his children
+    stats = profiler.get_stats(event='on_draw')
+    test(stats[0]['name'] == 'SlowWidget')
+    test(stats[0]['count'] == 2)
+    test(stats[0]['self'] >= 0.02)
+    root_stat = [x for x in stats if x['name'] == 'MTWidget'][0]
+    test(root_stat['count'] == 4)
+    test(root_stat['self'] < 0.01)
+    test(root_stat['total'] >= 0.02)
+
+    ids = [x['name'] for x in profiler.get_stats(by='id', event='on_draw')]
+    test(ids == ['profiler_slow', 'profiler_root'])
+
+    # not profiled outside of a frame
+    profiler.start()
+    root.dispatch_event('on_draw')
+    profiler.stop()
+    test(profiler.get_stats(event='on_draw')[0]['count'] == 2)
+
+def unittest_profiler_export():
+    import_pymt_no_window()
+    import json
+    from pymt.profiler import FrameProfiler
+
+    root = _make_tree()
+    profiler = FrameProfiler(trace=True)
+    profiler.start()
+    profiler.begin_frame()
+    root.dispatch_event('on_draw')
+    profiler.phase('draw')
+    profiler.end_frame()
+    profiler.stop()
+
+    data = json.loads(profiler.to_json())
+    test(len(data['frames']) == 1)
+    test(len(data['frames'][0]['widgets']) == 3)
+
+    trace = json.loads(profiler.to_chrome_trace())
+    names = [x['name'] for x in trace['traceEvents']]
+    test('frame' in names)
+    test('draw' in names)
+    test('counters' in names)
+    test(names.count('MTWidget.on_draw') == 2)
+    test('SlowWidget.on_draw' in names)
+    slow = [x for x in trace['traceEvents']
+            if x['name'] == 'SlowWidget.on_draw'][0]
+    test(slow['dur'] >= 10000)
+    test(slow['args']['id'] == 'profiler_slow')
@@ -0,0 +1,177 @@
+'''
+Record video module
+'''
+
+from init import test, import_pymt_no_window
+
+def unittest_recordvideo_raw():
+    import_pymt_no_window()
+    import os
+    import time
+    import tempfile
+    from pymt.modules.recordvideo import FrameRecorder, RawWriter, read_raw
+
+    fd, filename = tempfile.mkstemp(suffix='.raw')
+    os.close(fd)
+    try:
+        recorder = FrameRecorder(RawWriter(filename, 3, 2), 3, 2, buffers=2)
+        # rows from the bottom to the top. The 2 buffers are reused.
+        frames = [chr(x) * 9 + chr(x + 1) * 9 for x in xrange(0, 20, 2)]
+        for data in frames:
+            while not recorder.capture(data):
+                time.sleep(.001)
+        recorder.stop()
+
+        result = list(read_raw(filename))
+        test(len(result) == 10)
+        test([x[0] for x in result] == range(10))
+        index, timestamp, pixels = result[3]
+        test(pixels.shape == (2, 3, 3))
+        # stored from the top to the bottom
+        test((pixels[0] == 7).all())
+        test((pixels[1] == 6).all())
+    finally:
+        os.unlink(filename)
+
+def unittest_recordvideo_drop():
+    import_pymt_no_window()
+    import threading
+    from pymt.modules.recordvideo import FrameRecorder
+
+    class BlockedWriter(object):
+        ordered = False
+        def __init__(self):
+            self.event = threading.Event()
+            self.written = []
+        def write(self, index, timestamp, pixels):
+            self.event.wait()
+            self.written.append((index, pixels.tostring()))
+        def close(self):
+            pass
+
+    writer = BlockedWriter()
+    recorder = FrameRecorder(writer, 1, 1, buffers=3, workers=2)
+    results = [recorder.capture(chr(x) * 3) for x in xrange(5)]
+    # the application is never blocked: the frames without buffer are dropped
+    test(results == [True] * 3 + [False] * 2)
+    test(recorder.dropped == 2)
+    test(recorder.captured == 3)
+
+    # the frames waiting are written at stop
+    writer.event.set()
+    recorder.stop()
+    test(sorted(writer.written) == [(x, chr(x) * 3) for x in xrange(3)])
+
+def unittest_recordvideo_png():
+    import_pymt_no_window()
+    import os
+    import tempfile
+    import numpy
+    import pygame
+    from pymt.modules.recordvideo import encode_png
+
+    pixels = numpy.zeros((2, 3, 3), dtype=numpy.uint8)
+    pixels[0] = (255, 0, 0)
+    pixels[1] = (0, 0, 255)
+    fd, filename = tempfile.mkstemp(suffix='.png')
+    try:
+        os.write(fd, encode_png(pixels))
+        os.close(fd)
+        surface = pygame.image.load(filename)
+        test(surface.get_size() == (3, 2))
+        # the first row of the frame is the bottom of the image
+        test(tuple(surface.get_at((0, 1)))[:3] == (255, 0, 0))
+        test(tuple(surface.get_at((2, 0)))[:3] == (0, 0, 255))
+    finally:
+        os.unlink(filename)
+
+def unittest_recordvideo_readback():
+    import_pymt_no_window()
+    import numpy
+    from pymt.modules import recordvideo
+    from pymt.modules.recordvideo import FrameRecorder
+
+    class Writer(object):
+        ordered = True
+        def __init__(self):
+            self.frames = []
+        def write(self, index, timestamp, pixels):
+            self.frames.append(pixels.copy())
+        def close(self):
+            pass
+
+    # emulate the readback of a 5x2 window (15 bytes per row): the rows are
+    # padded to GL_PACK_ALIGNMENT in the array
+    state = {'alignment': 4, 'stack': []}
+    def glPixelStorei(name, value):
+        test(name == recordvideo.GL_PACK_ALIGNMENT)
+        state['alignment'] = value
+    def glPushClientAttrib(mask):
+        state['stack'].append(state['alignment'])
+    def glPopClientAttrib():
+        state['alignment'] = state['stack'].pop()
+    def glReadPixels(x, y, width, height, format, type, array):
+        alignment = state['alignment']
+        stride = (width * 3 + alignment - 1) // alignment * alignment
+        size = stride * (height - 1) + width * 3
+        test(array.nbytes >= size)
+        out = array.reshape(-1)
+        for row in xrange(height):
+            out[row * stride:row * stride + width * 3] = row + 1
+
+    names = ('glPixelStorei', 'glPushClientAttrib', 'glPopClientAttrib',
+             'glReadPixels', 'glReadBuffer')
+    old = dict((name, getattr(recordvideo, name)) for name in names)
+    recordvideo.glPixelStorei = glPixelStorei
+    recordvideo.glPushClientAttrib = glPushClientAttrib
+    recordvideo.glPopClientAttrib = glPopClientAttrib
+    recordvideo.glReadPixels = glReadPixels
+    recordvideo.glReadBuffer = lambda mode: None
+    try:
+        writer = Writer()
+        recorder = FrameRecorder(writer, 5, 2)
+        recorder.on_flip()
+        recorder.stop()
+    finally:
+        for name, value in old.iteritems():
+            setattr(recordvideo, name, value)
+
+    test(len(writer.frames) == 1)
+    test((writer.frames[0][0] == 1).all())
+    test((writer.frames[0][1] == 2).all())
+    # the alignment of the application is restored
+    test(state['alignment'] == 4)
+
+def unittest_recordvideo_exit():
+    import_pymt_no_window()
+    import os
+    import sys
+    import tempfile
+    import subprocess
+    from pymt.modules.recordvideo import read_raw
+
+    # the application exit without stopping the recorder: the frames waiting
+    # are written and the file is closed
+    script = '\n'.join((
+        'import os, sys, time',
+        'os.environ["PYMT_SHADOW_WINDOW"] = "0"',
+        'from pymt.modules.recordvideo import FrameRecorder, RawWriter',
+        'class SlowWriter(RawWriter):',
+        '    def write(self, *largs):',
+        '        time.sleep(.05)',
+        '        RawWriter.write(self, *largs)',
+        'writer = SlowWriter(sys.argv[1], 64, 64)',
+        'recorder = FrameRecorder(writer, 64, 64, buffers=4)',
+        'for x in xrange(4):',
+        '    recorder.capture(chr(x) * 64 * 64 * 3)'))
+    fd, filename = tempfile.mkstemp(suffix='.raw')
+    os.close(fd)
+    try:
+        subprocess.check_call([sys.executable, '-c', script, filename],
+                              stdout=open(os.devnull, 'w'),
+                              stderr=subprocess.STDOUT)
+        frames = list(read_raw(filename))
+        test([x[0] for x in frames] == range(4))
+        test((frames[3][2] == 3).all())
+    finally:
+        os.unlink(filename)
@@ -0,0 +1,38 @@
+'''
+Spatial index for touch dispatch
+'''
+
+from init import test, import_pymt_no_window
+
+def unittest_spatialindex_query():
+    import_pymt_no_window()
+    from pymt import SpatialIndex
+    index = SpatialIndex(cell_size=100)
+    index.add('a', ((0, 0), (50, 50)))
+    index.add('b', ((25, 25), (200, 200)))
+    index.add('c', ((-1000, -1000), (5000, 5000)))
+    test(index.query(10, 10) == ['c', 'a'])
+    test(index.query(30, 30) == ['c', 'b', 'a'])
+    index.add('d', ((0, 0), (10, 10)), front=False)
+    test(index.query(5, 5) == ['c', 'a', 'd'])
+    index.update('a', ((500, 500), (10, 10)))
+    test(index.query(10, 10) == ['c', 'd'])
+    test(index.query(505, 505) == ['c', 'a'])
+    index.remove('c')
+    test(index.query(505, 505) == ['a'])
+    test(len(index) == 3)
+
+def unittest_spatialindex_widget():
+    import_pymt_no_window()
+    from pymt import MTWidget
+    root = MTWidget(spatial_index=True)
+    a = MTWidget(pos=(0, 0), size=(100, 100))
+    b = MTWidget(pos=(50, 50), size=(100, 100))
+    root.add_widget(a)
+    root.add_widget(b)
+    test(root._spatial_index.query(75, 75) == [b, a])
+    a.pos = (500, 500)
+    test(root._spatial_index.query(75, 75) == [b])
+    root.remove_widget(b)
+    test(root._spatial_index.query(75, 75) == [])
+    test(root._spatial_index.query(550, 550) == [a])
@@ -0,0 +1,70 @@
+'''
+Svg
+'''
+
+from init import test, import_pymt_no_window
+
+def unittest_svg_arrays():
+    import_pymt_no_window()
+    import os
+    import shutil
+    import tempfile
+    import pymt
+    from pymt.lib import squirtle
+    from OpenGL.GL import GL_TRIANGLES, GL_LINES
+
+    filename = os.path.join(pymt.pymt_data_dir, 'icons', 'svg', 'circle.svg')
+    cache_dir = tempfile.mkdtemp()
+    old_cache_dir = squirtle.SVG.cache_dir
+    try:
+        squirtle.SVG.cache_dir = cache_dir
+        squirtle.SVG._mesh_cache.clear()
+        svg = squirtle.SVG(filename)
+        test(len(svg.vertices) == len(svg.colors))
+        test(svg.vertices.shape[1] == 2 and svg.colors.shape[1] == 4)
+        # the ranges cover all the vertices, in order
+        first = 0
+        for mode, start, count in svg.ranges:
+            test(mode in (GL_TRIANGLES, GL_LINES))
+            test(start == first)
+            first += count
+        test(first == len(svg.vertices))
+        test(svg.n_tris > 0)
+        test(len(os.listdir(cache_dir)) == 1)
+        cachename = os.path.join(cache_dir, os.listdir(cache_dir)[0])
+        test(os.stat(cachename).st_mode & 0777 == 0644)
+
+        # load from the disk cache, without parsing
+        squirtle.SVG._mesh_cache.clear()
+        parse = squirtle.SVG.parse_doc
+        squirtle.SVG.parse_doc = None
+        try:
+            cached = squirtle.SVG(filename)
+        finally:
+            squirtle.SVG.parse_doc = parse
+        test((cached.width, cached.height) == (svg.width, svg.height))
+        test(cached.ranges == svg.ranges)
+        test((cached.vertices == svg.vertices).all())
+        test((cached.colors == svg.colors).all())
+
+        # an other number of points is an other entry
+        squirtle.SVG(filename, bezier_points=4)
+        test(len(os.listdir(cache_dir)) == 2)
+    finally:
+        squirtle.SVG.cache_dir = old_cache_dir
+        squirtle.SVG._mesh_cache.clear()
+        shutil.rmtree(cache_dir)
+
+def unittest_svg_merge_vertices():
+    import_pymt_no_window()
+    import os
+    import pymt
+    from pymt.lib import squirtle
+
+    filename = os.path.join(pymt.pymt_data_dir, 'icons', 'svg', 'circle.svg')
+    svg = squirtle.SVG(filename)
+    # the duplicated corner is removed before the tessellation
+    square = [(0, 0), (10, 0), (10, 10), (10, 10.00000001), (0, 10), (0, 0)]
+    tris = svg.triangulate([square])
+    test(len(tris) == 6)
+    test(len(set([tuple(x) for x in tris])) == 4)
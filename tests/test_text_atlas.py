@@ -0,0 +1,52 @@
+'''
+Glyph atlas
+'''
+
+from init import test, import_pymt_no_window
+
+def unittest_text_atlas_packing():
+    import_pymt_no_window()
+    from pymt import GlyphAtlas
+
+    atlas = GlyphAtlas(page_size=64, padding=1)
+    glyphs = [atlas.add(20, 10) for x in xrange(4)]
+    test(len(atlas.pages) == 1)
+    test(glyphs[1].tex_coords[0] == 22 / 64.)
+    # the 4th glyph go to the next shelf
+    test(glyphs[3].tex_coords[0] == 1 / 64.)
+    test(glyphs[3].tex_coords[1] == 12 / 64.)
+    # 5 shelves of 3 glyphs in a page
+    for x in xrange(11):
+        atlas.add(20, 10)
+    test(len(atlas.pages) == 1)
+    atlas.add(20, 10)
+    test(len(atlas.pages) == 2)
+    # glyph bigger than a page
+    big = atlas.add(100, 10)
+    test(big.page.width == 128)
+
+def unittest_text_atlas_label():
+    import_pymt_no_window()
+    from pymt import AtlasLabel, GlyphAtlas, Label
+
+    atlas = GlyphAtlas()
+    label = AtlasLabel('hello\nworld !', atlas=atlas)
+    ref = Label('hello\nworld !')
+    test(label.content_size == ref.content_size)
+    test(len(label._meshes) == 1)
+    page, array, count = label._meshes[0]
+    # a quad per visible char
+    test(count == 11 * 4)
+    # each glyph is rasterized once
+    test(len(atlas.fonts.values()[0]) == 8)
+    test(len(page.pending) == 8)
+
+    # same glyphs: nothing to rasterize
+    label.label = 'hello world'
+    test(len(page.pending) == 8)
+    label.label = 'hello world?'
+    test(len(page.pending) == 9)
+
+    # with width constraint
+    label = AtlasLabel('hello world', atlas=atlas, size=(40, None))
+    test(label.content_size[1] > ref.content_size[1] / 2)
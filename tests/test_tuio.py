@@ -0,0 +1,48 @@
+'''
+Tuio batch mode
+'''
+
+from init import test, import_pymt_no_window
+
+def _frame(fseq, touches):
+    import osc
+    bundle = osc.createBundle()
+    osc.appendToBundle(bundle, '/tuio/2Dcur', ['alive'] + touches.keys())
+    for id, (x, y) in touches.iteritems():
+        osc.appendToBundle(bundle, '/tuio/2Dcur', ['set', id, x, y, 0., 0., 0.])
+    osc.appendToBundle(bundle, '/tuio/2Dcur', ['fseq', fseq])
+    return bundle.message
+
+def unittest_tuio_decode():
+    import_pymt_no_window()
+    import osc
+    packet = _frame(1, {3: (0.5, 0.25)})
+    test(osc.decodePacket(packet) == osc.decodeOSC(packet))
+
+def unittest_tuio_batch():
+    import_pymt_no_window()
+    from pymt.input.providers.tuio import TuioTouchProvider
+    provider = TuioTouchProvider('test', '127.0.0.1:3333,batch')
+    test(provider.batch)
+    for oscpath in TuioTouchProvider.__handlers__:
+        provider.touches[oscpath] = {}
+
+    events = []
+    def dispatch(event, touch):
+        events.append((event, touch.id, round(touch.sx, 3)))
+
+    # only the last set of the touch 1 is used
+    provider._update_batch(dispatch, [
+        _frame(1, {1: (0.1, 0.5)}),
+        _frame(2, {1: (0.2, 0.5)}),
+        _frame(3, {1: (0.3, 0.5), 2: (0.5, 0.5)}),
+    ])
+    test(sorted(events) == [('down', 1, 0.3), ('down', 2, 0.5)])
+
+    # late frame is ignored, touch 2 is released
+    del events[:]
+    provider._update_batch(dispatch, [
+        _frame(2, {1: (0.2, 0.5), 2: (0.5, 0.5)}),
+        _frame(4, {1: (0.4, 0.5)}),
+    ])
+    test(events == [('up', 2, 0.5), ('move', 1, 0.4)])